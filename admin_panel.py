@@ -1,4 +1,3 @@
-import os
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
@@ -8,21 +7,29 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from database import (
     is_admin, is_ceo, add_admin, get_all_admins,
-    get_admin_tickets, get_open_tickets, get_closed_tickets
+    get_admin_tickets, get_open_tickets, get_closed_tickets,
+    get_next_ticket
 )
-from analytics import AnalyticsManager
-from keyboards import get_admin_keyboard
+from analytics import analytics_manager, remove_export
+from media import media_registry
+from keyboards import get_admin_keyboard, get_ticket_actions_keyboard
+from ticket_queue import ticket_queue
+from callbacks import callback_router, ReplyTicket, CloseTicket, ExportPeriod, ReportChart
 
 # Создаем роутер
 router = Router()
 
+# Графики отчетов по почасовым агрегатам
+CHART_TITLES = {
+    'heatmap': "Тепловая карта",
+    'trend': "Тренд по дням",
+    'admins': "По администраторам",
+}
+
 # Состояния FSM
 class AdminManagement(StatesGroup):
     waiting_for_admin_id = State()
 
-# Инициализация менеджера аналитики
-analytics_manager = AnalyticsManager()
-
 # Обработчик команды /admin
 @router.message(Command("admin"))
 async def cmd_admin(message: Message):
@@ -39,7 +46,7 @@ async def cmd_admin(message: Message):
     )
 
 # Обработчик просмотра тикетов
-@router.callback_query(lambda c: c.data in ['my_tickets', 'open_tickets', 'closed_tickets'])
+@callback_router.register('my_tickets', 'open_tickets', 'closed_tickets')
 async def process_tickets_view(callback: CallbackQuery):
     if not await is_admin(callback.from_user.id):
         await callback.answer("У вас нет прав администратора")
@@ -65,11 +72,11 @@ async def process_tickets_view(callback: CallbackQuery):
                 [
                     InlineKeyboardButton(
                         text="Ответить",
-                        callback_data=f"reply:{ticket['id']}"
+                        callback_data=ReplyTicket(ticket_id=ticket['id']).pack()
                     ),
                     InlineKeyboardButton(
                         text="Закрыть",
-                        callback_data=f"close:{ticket['id']}"
+                        callback_data=CloseTicket(ticket_id=ticket['id']).pack()
                     )
                 ]
             ]
@@ -87,8 +94,33 @@ async def process_tickets_view(callback: CallbackQuery):
 
     await callback.answer()
 
+# Обработчик получения следующего тикета из очереди
+@callback_router.register('next_ticket')
+async def process_next_ticket(callback: CallbackQuery):
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("У вас нет прав администратора")
+        return
+
+    ticket = await get_next_ticket()
+    if not ticket:
+        await callback.answer("Очередь тикетов пуста")
+        return
+
+    text = (
+        f"Следующий тикет #{ticket['id']} (в очереди: {len(ticket_queue)})\n"
+        f"Приоритет: {ticket['priority']}\n"
+        f"Создан: {ticket['created_at']}\n"
+        f"От: {ticket['user_name']}"
+    )
+
+    await callback.message.answer(
+        text,
+        reply_markup=get_ticket_actions_keyboard(ticket['id'])
+    )
+    await callback.answer()
+
 # Обработчик просмотра аналитики
-@router.callback_query(lambda c: c.data == 'analytics')
+@callback_router.register('analytics')
 async def process_analytics(callback: CallbackQuery):
     if not await is_admin(callback.from_user.id):
         await callback.answer("У вас нет прав администратора")
@@ -112,61 +144,103 @@ async def process_analytics(callback: CallbackQuery):
     text += f"Закрыто вовремя: {sla['on_time_percent']}%\n"
     text += f"Пропущено: {sla['missed_percent']}%\n"
 
+    # Кнопки дополнительных графиков
+    buttons = [
+        [
+            InlineKeyboardButton(text=title, callback_data=ReportChart(kind=kind).pack())
+            for kind, title in CHART_TITLES.items()
+        ]
+    ]
     if await is_ceo(callback.from_user.id):
         # Добавляем кнопки экспорта для CEO
-        keyboard = InlineKeyboardMarkup(
-            inline_keyboard=[
-                [
-                    InlineKeyboardButton(
-                        text="Экспорт (день)",
-                        callback_data="export:day"
-                    ),
-                    InlineKeyboardButton(
-                        text="Экспорт (неделя)",
-                        callback_data="export:week"
-                    ),
-                    InlineKeyboardButton(
-                        text="Экспорт (месяц)",
-                        callback_data="export:month"
-                    )
-                ]
-            ]
-        )
-    else:
-        keyboard = None
+        buttons.append([
+            InlineKeyboardButton(
+                text="Экспорт (день)",
+                callback_data=ExportPeriod(period="day").pack()
+            ),
+            InlineKeyboardButton(
+                text="Экспорт (неделя)",
+                callback_data=ExportPeriod(period="week").pack()
+            ),
+            InlineKeyboardButton(
+                text="Экспорт (месяц)",
+                callback_data=ExportPeriod(period="month").pack()
+            )
+        ])
+    keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
 
     # Отправляем график активности
     chart = await analytics_manager.generate_hourly_chart()
-    await callback.message.answer_photo(
-        photo=chart,
+    await media_registry.send_photo(
+        callback.message.answer_photo,
+        chart.getvalue(),
+        'hourly_activity.png',
         caption=text,
         reply_markup=keyboard
     )
 
     await callback.answer()
 
+# Обработчик графиков отчетов
+@callback_router.register(ReportChart)
+async def process_chart(callback: CallbackQuery, callback_data: ReportChart):
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("У вас нет прав администратора")
+        return
+
+    kind = callback_data.kind
+    if kind == 'heatmap':
+        chart = await analytics_manager.generate_heatmap_chart()
+    elif kind == 'trend':
+        chart = await analytics_manager.generate_trend_chart()
+    elif kind == 'admins':
+        chart = await analytics_manager.generate_admin_chart()
+    else:
+        await callback.answer("Неизвестный график")
+        return
+
+    await media_registry.send_photo(
+        callback.message.answer_photo,
+        chart.getvalue(),
+        f'{kind}.png',
+        caption=CHART_TITLES[kind]
+    )
+    await callback.answer()
+
+# Обработчик создания живой панели
+@callback_router.register('live_dashboard')
+async def process_live_dashboard(callback: CallbackQuery):
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("У вас нет прав администратора")
+        return
+
+    from handlers import dashboard_manager
+    await dashboard_manager.create(callback.message.chat.id)
+    await callback.answer("Панель закреплена и будет обновляться автоматически")
+
 # Обработчик экспорта данных
-@router.callback_query(lambda c: c.data.startswith('export:'))
-async def process_export(callback: CallbackQuery):
+@callback_router.register(ExportPeriod)
+async def process_export(callback: CallbackQuery, callback_data: ExportPeriod):
     if not await is_ceo(callback.from_user.id):
         await callback.answer("У вас нет прав CEO")
         return
 
-    period = callback.data.split(':')[1]
+    period = callback_data.period
     filename = await analytics_manager.export_to_csv(period)
     
-    with open(filename, 'rb') as file:
-        await callback.message.answer_document(
-            document=file,
+    try:
+        await media_registry.send_document(
+            callback.message.answer_document,
+            filename,
             caption=f"Экспорт данных за {period}"
         )
-    
-    # Удаляем временный файл
-    os.remove(filename)
+    finally:
+        # Удаляем временный файл
+        remove_export(filename)
     await callback.answer()
 
 # Управление администраторами (только для CEO)
-@router.callback_query(lambda c: c.data == 'manage_admins')
+@callback_router.register('manage_admins')
 async def process_manage_admins(callback: CallbackQuery, state: FSMContext):
     if not await is_ceo(callback.from_user.id):
         await callback.answer("У вас нет прав CEO")
@@ -192,19 +266,6 @@ async def process_manage_admins(callback: CallbackQuery, state: FSMContext):
     await callback.message.answer(text, reply_markup=keyboard)
     await callback.answer()
 
-# Обработчик добавления админа
-@router.callback_query(lambda c: c.data == 'add_admin')
-async def process_add_admin(callback: CallbackQuery, state: FSMContext):
-    if not await is_ceo(callback.from_user.id):
-        await callback.answer("У вас нет прав CEO")
-        return
-
-    await callback.message.answer(
-        "Отправьте Telegram ID нового администратора:"
-    )
-    await state.set_state(AdminManagement.waiting_for_admin_id)
-    await callback.answer()
-
 # Обработчик получения ID нового админа
 @router.message(AdminManagement.waiting_for_admin_id)
 async def process_admin_id(message: Message, state: FSMContext):
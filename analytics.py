@@ -1,321 +1,336 @@
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')  # Используем не-интерактивный бэкенд
-import matplotlib.pyplot as plt
+import asyncio
 from io import BytesIO
-import aiosqlite
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from functools import wraps
 import os
+import shutil
+import tempfile
+
+from config import ANALYTICS_CACHE_SECONDS, EXPORT_TMP_DIR
+from cache import SingleFlightCache
+from database import (
+    repository, get_live_counters, get_all_admins, refresh_hourly_rollups,
+    get_hourly_rollups, get_weekday_hour_totals, get_admin_closed_totals
+)
+from reports import ReportCharts
+from business_hours import business_calendar
+from events import ticket_events
+from timeutil import utc_now, period_start
+
+# pandas и matplotlib нужны только для редких отчетов CEO, а их импорт
+# занимает сотни мс и десятки МБ памяти - загружаем при первом использовании
+# (matplotlib - в reports.ChartTemplate)
+def load_pandas():
+    """Ленивый импорт pandas"""
+    import pandas as pd
+    return pd
+
+def remove_export(filename: str):
+    """Удаление файла экспорта вместе с его временным каталогом"""
+    export_dir = os.path.dirname(filename)
+    if os.path.basename(export_dir).startswith('tickets_export_'):
+        shutil.rmtree(export_dir, ignore_errors=True)
+    elif os.path.exists(filename):
+        os.remove(filename)
+
+def cached_report(method):
+    """
+    Кэширование результата отчета по (метод, аргументы, версия данных):
+    после любого события по тикетам отчет пересчитывается.
+    Возвращаемые значения общие для всех вызывающих - их нельзя изменять.
+    """
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())), ticket_events.version)
+        return await self.report_cache.get_or_load(key, lambda: method(self, *args, **kwargs))
+    return wrapper
 
 class AnalyticsManager:
     """Класс для управления аналитикой"""
     
-    def __init__(self, db_path: str = 'support_bot.db'):
-        self.db_path = db_path
+    def __init__(self, cache_ttl: float = ANALYTICS_CACHE_SECONDS):
+        self.report_cache = SingleFlightCache(cache_ttl)
+        self.charts = ReportCharts()
+        # Агрегаты досчитываются одним вызовом за раз
+        self._rollup_lock = asyncio.Lock()
 
+    @cached_report
     async def get_tickets_stats(self, period: str = 'day') -> dict:
         """Получение статистики по тикетам за период"""
-        if period == 'day':
-            date_filter = datetime.now() - timedelta(days=1)
-        elif period == 'week':
-            date_filter = datetime.now() - timedelta(weeks=1)
-        elif period == 'month':
-            date_filter = datetime.now() - timedelta(days=30)
-        else:
-            date_filter = datetime.now() - timedelta(days=1)
-
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            
-            # Общее количество тикетов
-            total_tickets = await db.execute(
-                'SELECT COUNT(*) as count FROM tickets WHERE created_at > ?',
-                (date_filter,)
-            )
-            total = (await total_tickets.fetchone())['count']
-
-            # Тикеты по статусам
-            status_stats = await db.execute('''
-                SELECT status, COUNT(*) as count 
-                FROM tickets 
-                WHERE created_at > ?
-                GROUP BY status
-            ''', (date_filter,))
-            
-            statuses = {row['status']: row['count'] 
-                       for row in await status_stats.fetchall()}
+        # Диапазон по индексу created_at: граница периода в UTC передается параметром
+        rows = await repository.fetchall(
+            '''
+            SELECT status, COUNT(*) as count
+            FROM tickets
+            WHERE created_at > ?
+            GROUP BY status
+            ''',
+            (period_start(period),)
+        )
+        statuses = {row['status']: row['count'] for row in rows}
 
-            return {
-                'total': total,
-                'statuses': statuses,
-                'period': period
-            }
+        return {
+            'total': sum(statuses.values()),
+            'statuses': statuses,
+            'period': period
+        }
 
+    @cached_report
     async def get_admin_stats(self, admin_id: int = None) -> dict:
-        """Получение статистики по администратору"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            
-            if admin_id:
-                # Статистика конкретного админа
-                query = '''
-                    SELECT 
-                        a.username,
-                        COUNT(*) as total_tickets,
-                        SUM(CASE WHEN t.missed_flag = 1 THEN 1 ELSE 0 END) as missed,
-                        AVG(
-                            CASE 
-                                WHEN t.first_response_time IS NOT NULL 
-                                THEN strftime('%s', t.first_response_time) - strftime('%s', t.created_at)
-                                ELSE NULL 
-                            END
-                        ) as avg_response_time
-                    FROM tickets t
-                    JOIN admins a ON t.assigned_admin_id = a.admin_id
-                    WHERE t.assigned_admin_id = ?
-                '''
-                stats = await db.execute(query, (admin_id,))
-            else:
-                # Общая статистика по всем админам
-                query = '''
-                    SELECT 
-                        a.username,
-                        COUNT(*) as total_tickets,
-                        SUM(CASE WHEN t.missed_flag = 1 THEN 1 ELSE 0 END) as missed,
-                        AVG(
-                            CASE 
-                                WHEN t.first_response_time IS NOT NULL 
-                                THEN strftime('%s', t.first_response_time) - strftime('%s', t.created_at)
-                                ELSE NULL 
-                            END
-                        ) as avg_response_time
-                    FROM tickets t
-                    JOIN admins a ON t.assigned_admin_id = a.admin_id
-                    GROUP BY t.assigned_admin_id, a.username
-                '''
-                stats = await db.execute(query)
+        """
+        Получение статистики по администратору: время ответа (секунды) считается
+        в рабочем времени поддержки, разом для всех тикетов
+        """
+        query = '''
+            SELECT
+                t.assigned_admin_id, a.username, t.missed_flag, t.created_at, t.first_response_time
+            FROM tickets t
+            JOIN admins a ON t.assigned_admin_id = a.admin_id
+        '''
+        if admin_id:
+            rows = await repository.fetchall(query + ' WHERE t.assigned_admin_id = ?', (admin_id,))
+        else:
+            rows = await repository.fetchall(query)
+        if not rows:
+            return []
 
-            rows = await stats.fetchall()
-            return [dict(row) for row in rows]
+        pd = load_pandas()
+        df = pd.DataFrame([dict(row) for row in rows])
+        df['response_time'] = business_calendar.minutes_between_many(
+            pd.to_datetime(df['created_at']), pd.to_datetime(df['first_response_time'])
+        ) * 60
+        stats = df.groupby(['assigned_admin_id', 'username']).agg(
+            total_tickets=('missed_flag', 'size'),
+            missed=('missed_flag', 'sum'),
+            avg_response_time=('response_time', 'mean'),
+        ).reset_index()
+        return [
+            {
+                'username': row.username,
+                'total_tickets': int(row.total_tickets),
+                'missed': int(row.missed),
+                'avg_response_time': None if pd.isna(row.avg_response_time) else float(row.avg_response_time),
+            }
+            for row in stats.itertuples()
+        ]
 
     async def generate_hourly_chart(self) -> BytesIO:
         """Генерация графика активности по часам"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            
-            query = '''
-                SELECT 
-                    strftime('%H', created_at) as hour,
-                    COUNT(*) as count
-                FROM tickets
-                GROUP BY hour
-                ORDER BY hour
-            '''
-            data = await db.execute(query)
-            rows = await data.fetchall()
+        # Каждый вызывающий получает свой буфер поверх общего PNG
+        return BytesIO(await self._render_hourly_chart())
 
-            hours = [row['hour'] for row in rows]
-            counts = [row['count'] for row in rows]
+    async def generate_heatmap_chart(self, days: int = 90) -> BytesIO:
+        """Тепловая карта нагрузки: день недели x час"""
+        return BytesIO(await self._render_heatmap_chart(days))
 
-            # Создаем новый график
-            plt.figure(figsize=(12, 6))
-            
-            # Настраиваем стиль
-            plt.style.use('default')  # Используем стандартный стиль
-            
-            # Создаем график
-            bars = plt.bar(hours, counts)
-            
-            # Добавляем значения над столбцами
-            for bar in bars:
-                height = bar.get_height()
-                plt.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{int(height)}',
-                        ha='center', va='bottom')
-            
-            # Настраиваем оси и заголовок
-            plt.title('Активность по часам', pad=20, size=14)
-            plt.xlabel('Час', labelpad=10)
-            plt.ylabel('Количество тикетов', labelpad=10)
-            
-            # Добавляем сетку
-            plt.grid(True, linestyle='--', alpha=0.7)
-            
-            # Настраиваем ось X
-            plt.xticks(range(24))  # Показываем все 24 часа
-            
-            # Добавляем отступы
-            plt.tight_layout()
-            
-            # Сохраняем в буфер
-            buf = BytesIO()
-            plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-            buf.seek(0)
-            plt.close()
-            
-            return buf
+    async def generate_trend_chart(self, days: int = 30, window: int = 7) -> BytesIO:
+        """График тикетов по дням со скользящим средним"""
+        return BytesIO(await self._render_trend_chart(days, window))
+
+    async def generate_admin_chart(self, days: int = 30) -> BytesIO:
+        """График закрытых тикетов по администраторам"""
+        return BytesIO(await self._render_admin_chart(days))
+
+    async def _refresh_rollups(self, days: int = None) -> date:
+        """Досчет почасовых агрегатов; возвращает первый день периода из days дней (None - вся история)"""
+        async with self._rollup_lock:
+            await refresh_hourly_rollups()
+        # Агрегаты хранятся в UTC, как и время тикетов
+        today = utc_now().date()
+        return today - timedelta(days=days - 1) if days else date.min
+
+    @cached_report
+    async def _render_hourly_chart(self) -> bytes:
+        """PNG графика активности по часам"""
+        start = await self._refresh_rollups()
+        rows = await get_weekday_hour_totals(datetime.combine(start, time.min))
+        return self.charts.hourly(rows)
+
+    @cached_report
+    async def _render_heatmap_chart(self, days: int) -> bytes:
+        """PNG тепловой карты нагрузки"""
+        start = await self._refresh_rollups(days)
+        rows = await get_weekday_hour_totals(datetime.combine(start, time.min))
+        return self.charts.heatmap(rows, days)
+
+    @cached_report
+    async def _render_trend_chart(self, days: int, window: int) -> bytes:
+        """PNG графика тикетов по дням"""
+        start = await self._refresh_rollups(days)
+        rows = await get_hourly_rollups(datetime.combine(start, time.min))
+        return self.charts.trend(rows, start, days, window)
+
+    @cached_report
+    async def _render_admin_chart(self, days: int) -> bytes:
+        """PNG графика закрытых тикетов по администраторам"""
+        start = await self._refresh_rollups(days)
+        rows = await get_admin_closed_totals(datetime.combine(start, time.min))
+        names = {admin['admin_id']: admin['username'] for admin in await get_all_admins()}
+        return self.charts.admins(rows, names, days)
 
     async def export_to_csv(self, period: str = 'month') -> str:
         """Экспорт данных в CSV"""
-        # Определяем период и его описание
-        if period == 'day':
-            date_filter = datetime.now() - timedelta(days=1)
-            period_desc = "за последние 24 часа"
-        elif period == 'week':
-            date_filter = datetime.now() - timedelta(weeks=1)
-            period_desc = "за последнюю неделю"
-        elif period == 'month':
-            date_filter = datetime.now() - timedelta(days=30)
-            period_desc = "за последние 30 дней"
-        else:
-            date_filter = datetime.now() - timedelta(days=30)
-            period_desc = "за последние 30 дней"
+        # Описание периода; граница - в UTC, как время в БД
+        period_desc = {
+            'day': "за последние 24 часа",
+            'week': "за последнюю неделю",
+        }.get(period, "за последние 30 дней")
+        date_filter = period_start(period, default='month')
 
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            
-            # Получаем основные данные по тикетам
-            query = '''
-                SELECT 
-                    t.id as "№ Тикета",
-                    t.status as "Статус",
-                    t.priority as "Приоритет",
-                    datetime(t.created_at) as "Создан",
-                    datetime(t.closed_at) as "Закрыт",
-                    datetime(t.first_response_time) as "Первый ответ",
-                    CASE 
-                        WHEN t.missed_flag = 1 THEN 'Да'
-                        ELSE 'Нет'
-                    END as "Пропущен",
-                    CASE 
-                        WHEN t.first_response_time IS NOT NULL 
-                        THEN round((julianday(t.first_response_time) - julianday(t.created_at)) * 24 * 60, 0)
-                        ELSE NULL 
-                    END as "Время ответа (минуты)",
-                    CASE 
-                        WHEN t.closed_at IS NOT NULL 
-                        THEN round((julianday(t.closed_at) - julianday(t.created_at)) * 24 * 60, 0)
-                        ELSE NULL 
-                    END as "Время решения (минуты)",
-                    u.full_name as "Пользователь",
-                    a.username as "Администратор"
-                FROM tickets t
-                LEFT JOIN users u ON t.user_id = u.user_id
-                LEFT JOIN admins a ON t.assigned_admin_id = a.admin_id
-                WHERE t.created_at > ?
-                ORDER BY t.created_at DESC
-            '''
-            
-            cursor = await db.execute(query, (date_filter,))
-            rows = await cursor.fetchall()
-            
-            # Получаем статистику
-            stats_query = '''
-                SELECT 
-                    COUNT(*) as total_tickets,
-                    SUM(CASE WHEN status = 'open' THEN 1 ELSE 0 END) as open_tickets,
-                    SUM(CASE WHEN status = 'closed' THEN 1 ELSE 0 END) as closed_tickets,
-                    SUM(CASE WHEN missed_flag = 1 THEN 1 ELSE 0 END) as missed_tickets,
-                    round(AVG(CASE 
-                        WHEN first_response_time IS NOT NULL 
-                        THEN (julianday(first_response_time) - julianday(created_at)) * 24 * 60
-                        END), 1) as avg_response_time,
-                    round(AVG(CASE 
-                        WHEN closed_at IS NOT NULL 
-                        THEN (julianday(closed_at) - julianday(created_at)) * 24 * 60
-                        END), 1) as avg_resolution_time
-                FROM tickets
-                WHERE created_at > ?
-            '''
-            
-            stats_cursor = await db.execute(stats_query, (date_filter,))
-            stats = dict(await stats_cursor.fetchone())
-            
-            # Создаем DataFrame с данными
-            df = pd.DataFrame([dict(row) for row in rows])
+        # Получаем основные данные по тикетам
+        query = '''
+            SELECT 
+                t.id as "№ Тикета",
+                t.status as "Статус",
+                t.priority as "Приоритет",
+                t.created_at as "Создан",
+                t.closed_at as "Закрыт",
+                t.first_response_time as "Первый ответ",
+                CASE 
+                    WHEN t.missed_flag = 1 THEN 'Да'
+                    ELSE 'Нет'
+                END as "Пропущен",
+                u.full_name as "Пользователь",
+                a.username as "Администратор"
+            FROM tickets t
+            LEFT JOIN users u ON t.user_id = u.user_id
+            LEFT JOIN admins a ON t.assigned_admin_id = a.admin_id
+            WHERE t.created_at > ?
+            ORDER BY t.created_at DESC
+        '''
+        rows = await repository.fetchall(query, (date_filter,))
+        
+        # Получаем статистику
+        stats_query = '''
+            SELECT 
+                COUNT(*) as total_tickets,
+                SUM(CASE WHEN status = 'open' THEN 1 ELSE 0 END) as open_tickets,
+                SUM(CASE WHEN status = 'closed' THEN 1 ELSE 0 END) as closed_tickets,
+                SUM(CASE WHEN missed_flag = 1 THEN 1 ELSE 0 END) as missed_tickets
+            FROM tickets
+            WHERE created_at > ?
+        '''
+        stats = dict(await repository.fetchone(stats_query, (date_filter,)))
+        
+        # Создаем DataFrame с данными
+        pd = load_pandas()
+        df = pd.DataFrame([dict(row) for row in rows])
+        for column in ("Создан", "Закрыт", "Первый ответ"):
+            if column in df:
+                df[column] = pd.to_datetime(df[column]).dt.floor('s')
+
+        # Время ответа и решения - в рабочем времени поддержки, разом для всех тикетов
+        avg_response_time = avg_resolution_time = None
+        if not df.empty:
+            created = pd.to_datetime(df['Создан'])
+            response = pd.Series(
+                business_calendar.minutes_between_many(created, pd.to_datetime(df['Первый ответ']))
+            )
+            resolution = pd.Series(
+                business_calendar.minutes_between_many(created, pd.to_datetime(df['Закрыт']))
+            )
+            position = df.columns.get_loc('Пропущен') + 1
+            df.insert(position, 'Время ответа (рабочие минуты)', response.round(0))
+            df.insert(position + 1, 'Время решения (рабочие минуты)', resolution.round(0))
+            if response.notna().any():
+                avg_response_time = round(float(response.mean()), 1)
+            if resolution.notna().any():
+                avg_resolution_time = round(float(resolution.mean()), 1)
+        
+        # Создаем два DataFrame - для статистики и для данных
+        stats_df = pd.DataFrame([{
+            'Показатель': 'Всего тикетов',
+            'Значение': stats['total_tickets']
+        }, {
+            'Показатель': 'Открытых тикетов',
+            'Значение': stats['open_tickets']
+        }, {
+            'Показатель': 'Закрытых тикетов',
+            'Значение': stats['closed_tickets']
+        }, {
+            'Показатель': 'Пропущенных тикетов',
+            'Значение': stats['missed_tickets']
+        }, {
+            'Показатель': 'Среднее время ответа (рабочие минуты)',
+            'Значение': avg_response_time
+        }, {
+            'Показатель': 'Среднее время решения (рабочие минуты)',
+            'Значение': avg_resolution_time
+        }])
+
+        # Записываем в Excel. Каждый экспорт пишется в свой временный каталог:
+        # одновременные выгрузки за один период не перезаписывают файлы друг друга
+        export_dir = tempfile.mkdtemp(prefix='tickets_export_', dir=EXPORT_TMP_DIR)
+        filename = os.path.join(
+            export_dir, f'tickets_export_{period}_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        )
+        # Время формирования с точностью до минуты (и в свойствах файла): одинаковые
+        # выгрузки дают одинаковые байты и повторно отправляются по file_id
+        generated_at = datetime.now().replace(second=0, microsecond=0)
+        with pd.ExcelWriter(filename, engine='xlsxwriter') as writer:
+            # Записываем заголовок
+            workbook = writer.book
+            workbook.set_properties({'created': generated_at})
+            header_format = workbook.add_format({
+                'bold': True,
+                'font_size': 12,
+                'align': 'center',
+                'valign': 'vcenter'
+            })
             
-            # Создаем файл
-            filename = f'tickets_export_{period}_{datetime.now().strftime("%Y%m%d")}.csv'
+            # Лист со статистикой
+            stats_df.to_excel(writer, sheet_name='Статистика', index=False, startrow=2)
+            worksheet = writer.sheets['Статистика']
+            worksheet.write(0, 0, f'Отчет по тикетам {period_desc}', header_format)
+            worksheet.write(1, 0, f'Сформирован: {generated_at.strftime("%d.%m.%Y %H:%M")}')
+            worksheet.set_column('A:A', 30)  # Ширина первой колонки
+            worksheet.set_column('B:B', 15)  # Ширина второй колонки
             
-            # Создаем два DataFrame - для статистики и для данных
-            stats_df = pd.DataFrame([{
-                'Показатель': 'Всего тикетов',
-                'Значение': stats['total_tickets']
-            }, {
-                'Показатель': 'Открытых тикетов',
-                'Значение': stats['open_tickets']
-            }, {
-                'Показатель': 'Закрытых тикетов',
-                'Значение': stats['closed_tickets']
-            }, {
-                'Показатель': 'Пропущенных тикетов',
-                'Значение': stats['missed_tickets']
-            }, {
-                'Показатель': 'Среднее время ответа (минуты)',
-                'Значение': stats['avg_response_time']
-            }, {
-                'Показатель': 'Среднее время решения (минуты)',
-                'Значение': stats['avg_resolution_time']
-            }])
+            # Лист с деталями
+            if not df.empty:
+                df.to_excel(writer, sheet_name='Детальные данные', index=False)
+                detail_sheet = writer.sheets['Детальные данные']
+                # Устанавливаем ширину колонок
+                for idx, col in enumerate(df.columns):
+                    max_length = max(df[col].astype(str).apply(len).max(), len(col)) + 2
+                    detail_sheet.set_column(idx, idx, max_length)
+        
+        return filename
 
-            # Записываем в Excel
-            filename = f'tickets_export_{period}_{datetime.now().strftime("%Y%m%d")}.xlsx'
-            with pd.ExcelWriter(filename, engine='xlsxwriter') as writer:
-                # Записываем заголовок
-                workbook = writer.book
-                header_format = workbook.add_format({
-                    'bold': True,
-                    'font_size': 12,
-                    'align': 'center',
-                    'valign': 'vcenter'
-                })
-                
-                # Лист со статистикой
-                stats_df.to_excel(writer, sheet_name='Статистика', index=False, startrow=2)
-                worksheet = writer.sheets['Статистика']
-                worksheet.write(0, 0, f'Отчет по тикетам {period_desc}', header_format)
-                worksheet.write(1, 0, f'Сформирован: {datetime.now().strftime("%d.%m.%Y %H:%M:%S")}')
-                worksheet.set_column('A:A', 30)  # Ширина первой колонки
-                worksheet.set_column('B:B', 15)  # Ширина второй колонки
-                
-                # Лист с деталями
-                if not df.empty:
-                    df.to_excel(writer, sheet_name='Детальные данные', index=False)
-                    detail_sheet = writer.sheets['Детальные данные']
-                    # Устанавливаем ширину колонок
-                    for idx, col in enumerate(df.columns):
-                        max_length = max(df[col].astype(str).apply(len).max(), len(col)) + 2
-                        detail_sheet.set_column(idx, idx, max_length)
-            
-            return filename
+    @cached_report
+    async def get_live_counters(self) -> dict:
+        """Текущие счетчики тикетов для живой панели (один проход по таблице)"""
+        return await get_live_counters()
 
+    @cached_report
     async def get_sla_metrics(self) -> dict:
         """Получение метрик SLA"""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            
-            query = '''
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN missed_flag = 0 THEN 1 ELSE 0 END) as on_time,
-                    SUM(CASE WHEN missed_flag = 1 THEN 1 ELSE 0 END) as missed
-                FROM tickets
-                WHERE status = 'closed'
-            '''
-            
-            stats = await db.execute(query)
-            row = await stats.fetchone()
-            
-            total = row['total']
-            if total > 0:
-                on_time_percent = (row['on_time'] / total) * 100
-                missed_percent = (row['missed'] / total) * 100
-            else:
-                on_time_percent = 0
-                missed_percent = 0
+        # Закрытые тикеты из основной таблицы плюс агрегаты архивированных
+        query = '''
+            SELECT 
+                COUNT(*) + (SELECT COALESCE(SUM(tickets), 0) FROM ticket_stats_daily) as total,
+                SUM(CASE WHEN missed_flag = 1 THEN 1 ELSE 0 END) as missed,
+                (SELECT COALESCE(SUM(missed), 0) FROM ticket_stats_daily) as archived_missed
+            FROM tickets
+            WHERE status = 'closed'
+        '''
+        
+        row = await repository.fetchone(query)
+        
+        total = row['total']
+        missed = (row['missed'] or 0) + row['archived_missed']
+        if total > 0:
+            on_time_percent = ((total - missed) / total) * 100
+            missed_percent = (missed / total) * 100
+        else:
+            on_time_percent = 0
+            missed_percent = 0
 
-            return {
-                'total_closed': total,
-                'on_time_percent': round(on_time_percent, 2),
-                'missed_percent': round(missed_percent, 2)
-            }
+        return {
+            'total_closed': total,
+            'on_time_percent': round(on_time_percent, 2),
+            'missed_percent': round(missed_percent, 2)
+        }
+
+# Общий экземпляр для всех модулей: кэш отчетов работает для всех админов
+analytics_manager = AnalyticsManager()
@@ -0,0 +1,135 @@
+import asyncio
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from typing import List
+
+import aiosqlite
+import click
+
+from config import (
+    DB_PATH, BACKUP_DIR, BACKUP_KEEP, BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP, BACKUP_COMPRESS
+)
+
+class BackupManager:
+    """
+    Класс для онлайн-резервного копирования БД через SQLite backup API.
+    Копирование идет пакетами страниц с паузами из одного снимка БД
+    (режим WAL), поэтому писатели не блокируются на время бэкапа.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        backup_dir: str = BACKUP_DIR,
+        keep: int = BACKUP_KEEP,
+        pages_per_step: int = BACKUP_PAGES_PER_STEP,
+        step_sleep: float = BACKUP_STEP_SLEEP,
+        compress: bool = BACKUP_COMPRESS
+    ):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.compress = compress
+        self.prefix = os.path.splitext(os.path.basename(db_path))[0]
+
+    async def create_backup(self) -> str:
+        """Создание снимка БД. Возвращает путь к файлу бэкапа"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.backup_dir, f'{self.prefix}_{stamp}.db')
+
+        async with aiosqlite.connect(self.db_path) as source, aiosqlite.connect(path) as target:
+            # Держим одну транзакцию чтения на все шаги: в режиме WAL писатели
+            # продолжают работать, а бэкап не перезапускается после их коммитов
+            await source.execute('BEGIN')
+            async with source.execute('SELECT COUNT(*) FROM sqlite_master') as cursor:
+                await cursor.fetchall()
+            try:
+                await source.backup(target, pages=self.pages_per_step, sleep=self.step_sleep)
+            finally:
+                await source.rollback()
+
+        if self.compress:
+            # Сжатие выполняется в отдельном потоке, чтобы не блокировать бота
+            await asyncio.to_thread(self._compress, path, path + '.gz')
+            os.remove(path)
+            path += '.gz'
+
+        self.rotate()
+        return path
+
+    def list_backups(self) -> List[str]:
+        """Список бэкапов от старых к новым"""
+        pattern = os.path.join(self.backup_dir, f'{self.prefix}_*.db*')
+        return sorted(glob.glob(pattern))
+
+    def rotate(self):
+        """Удаление старых бэкапов сверх лимита хранения"""
+        backups = self.list_backups()
+        for path in backups[:max(len(backups) - self.keep, 0)]:
+            os.remove(path)
+
+    def restore(self, backup_path: str):
+        """
+        Восстановление БД из бэкапа (бот должен быть остановлен).
+        Снимок проверяется integrity_check до перезаписи рабочей БД.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_path = backup_path
+            if backup_path.endswith('.gz'):
+                source_path = os.path.join(tmp_dir, 'restore.db')
+                with gzip.open(backup_path, 'rb') as src, open(source_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+
+            source = sqlite3.connect(source_path)
+            try:
+                result = source.execute('PRAGMA integrity_check').fetchone()[0]
+                if result != 'ok':
+                    raise ValueError(f"Бэкап поврежден: {result}")
+                target = sqlite3.connect(self.db_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+            finally:
+                source.close()
+
+    @staticmethod
+    def _compress(source_path: str, target_path: str):
+        with open(source_path, 'rb') as src, gzip.open(target_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, length=1024 * 1024)
+
+@click.group()
+def cli():
+    """Резервное копирование базы данных бота"""
+
+@cli.command('backup')
+def backup_command():
+    """Создать бэкап сейчас"""
+    path = asyncio.run(BackupManager().create_backup())
+    click.echo(f"Бэкап создан: {path}")
+
+@cli.command('list')
+def list_command():
+    """Показать доступные бэкапы"""
+    for path in BackupManager().list_backups():
+        click.echo(f"{path}\t{os.path.getsize(path)} байт")
+
+@cli.command('restore')
+@click.argument('backup_path', type=click.Path(exists=True, dir_okay=False))
+@click.confirmation_option(prompt="Текущая БД будет перезаписана. Бот остановлен?")
+def restore_command(backup_path: str):
+    """Восстановить БД из бэкапа (только при остановленном боте)"""
+    BackupManager().restore(backup_path)
+    click.echo(f"БД восстановлена из {backup_path}")
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,102 @@
+"""
+Бенчмарк онлайн-бэкапа: длительность бэкапа и влияние на задержку записи.
+
+Запуск из корня проекта:
+    python benchmarks/bench_backup.py --size-mb 2048
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup import BackupManager  # noqa: E402
+
+async def fill_database(path: str, size_mb: int):
+    """Наполнение тестовой БД тикетами до нужного размера"""
+    payload = 'x' * 2000
+    async with aiosqlite.connect(path) as db:
+        # Как в init_db: бэкап рассчитан на режим WAL
+        await db.execute('PRAGMA journal_mode = WAL')
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                status TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                message_data TEXT
+            )
+        ''')
+        while os.path.getsize(path) < size_mb * 1024 * 1024:
+            await db.executemany(
+                'INSERT INTO tickets (user_id, status, message_data) VALUES (?, "open", ?)',
+                [(i, payload) for i in range(5000)]
+            )
+            await db.commit()
+
+async def measure_writes(path: str, stop: asyncio.Event) -> list:
+    """Задержки одиночных вставок с коммитом, пока не установлен stop"""
+    latencies = []
+    async with aiosqlite.connect(path) as db:
+        while not stop.is_set():
+            started = time.perf_counter()
+            await db.execute(
+                'INSERT INTO tickets (user_id, status, message_data) VALUES (1, "open", "bench")'
+            )
+            await db.commit()
+            latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.01)
+    return latencies
+
+def describe(name: str, latencies: list):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if len(latencies) >= 100 else latencies[-1]
+    print(
+        f"{name}: {len(latencies)} записей, p50 {statistics.median(latencies):.2f} мс, "
+        f"p99 {p99:.2f} мс, max {latencies[-1]:.2f} мс"
+    )
+
+async def main(size_mb: int, baseline_seconds: float, pages: int, compress: bool):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        print(f"Наполнение БД до {size_mb} МБ...")
+        await fill_database(db_path, size_mb)
+
+        stop = asyncio.Event()
+        writer = asyncio.create_task(measure_writes(db_path, stop))
+        await asyncio.sleep(baseline_seconds)
+        stop.set()
+        describe("Без бэкапа", await writer)
+
+        manager = BackupManager(
+            db_path=db_path,
+            backup_dir=os.path.join(tmp_dir, 'backups'),
+            pages_per_step=pages,
+            compress=compress
+        )
+        stop = asyncio.Event()
+        writer = asyncio.create_task(measure_writes(db_path, stop))
+        started = time.perf_counter()
+        path = await manager.create_backup()
+        duration = time.perf_counter() - started
+        stop.set()
+        describe("Во время бэкапа", await writer)
+        print(
+            f"Бэкап: {duration:.2f} с, исходный размер {os.path.getsize(db_path) / 2**20:.1f} МБ, "
+            f"файл {os.path.getsize(path) / 2**20:.1f} МБ"
+        )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=int, default=256)
+    parser.add_argument('--baseline-seconds', type=float, default=5)
+    parser.add_argument('--pages', type=int, default=1024)
+    parser.add_argument('--no-compress', action='store_true')
+    args = parser.parse_args()
+    asyncio.run(main(args.size_mb, args.baseline_seconds, args.pages, not args.no_compress))
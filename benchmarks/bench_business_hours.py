@@ -0,0 +1,61 @@
+"""
+Бенчмарк рабочего времени: время ответа в рабочих минутах для массива тикетов
+по таблицам numpy против перевода каждого тикета по отдельности, и сверка
+результатов.
+
+Запуск из корня проекта:
+    python benchmarks/bench_business_hours.py --tickets 10000 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_pairs(count: int):
+    """Создание тикета за последний год и первый ответ через 0-48 часов"""
+    random.seed(count)
+    now = datetime(2025, 1, 1)
+    starts = [now - timedelta(minutes=random.uniform(0, 365 * 24 * 60)) for _ in range(count)]
+    ends = [start + timedelta(minutes=random.uniform(0, 48 * 60)) for start in starts]
+    return starts, ends
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, nargs='+', default=[10000, 200000])
+    parser.add_argument('--hours', default='mon-fri 09:00-18:00; sat 10:00-15:00')
+    args = parser.parse_args()
+
+    import numpy as np
+    from business_hours import BusinessCalendar
+    calendar = BusinessCalendar(args.hours, 3, ['2024-05-01', '2024-05-09'])
+    # Таблицы строятся один раз при первом использовании
+    started = time.perf_counter()
+    calendar.offsets(np.array([np.datetime64('2024-01-01')]))
+    print(f"build tables: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for count in args.tickets:
+        starts, ends = make_pairs(count)
+
+        started = time.perf_counter()
+        scalar = [calendar.minutes_between(start, end) for start, end in zip(starts, ends)]
+        scalar_time = time.perf_counter() - started
+
+        # В аналитике массивы приходят из pandas, поэтому преобразование не замеряется
+        start_array = np.array(starts, dtype='datetime64[us]')
+        end_array = np.array(ends, dtype='datetime64[us]')
+        started = time.perf_counter()
+        vector = calendar.minutes_between_many(start_array, end_array)
+        vector_time = time.perf_counter() - started
+
+        print(
+            f"{count:>8} tickets: per ticket {scalar_time * 1000:>8.1f} ms, "
+            f"numpy {vector_time * 1000:>6.1f} ms, "
+            f"max diff {np.max(np.abs(vector - np.array(scalar))):.1e} min"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Бенчмарк диспетчеризации callback-запросов: перебор фильтров-лямбд aiogram
+против маршрутизации по префиксу (CallbackRouter), плюс стоимость сборки
+клавиатуры админ-панели с кэшем и без.
+
+Запуск из корня проекта:
+    python benchmarks/bench_callback_dispatch.py --routes 60
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from callbacks import CallbackRouter  # noqa: E402
+from keyboards import get_admin_keyboard  # noqa: E402
+
+class NoNetworkBot(Bot):
+    """Бот без обращений к API: обработчики бенчмарка ничего не отправляют"""
+
+    async def __call__(self, method, request_timeout=None):
+        return True
+
+async def noop(callback: CallbackQuery, **kwargs):
+    return None
+
+def build_linear(prefixes):
+    """Как было: по обработчику с фильтром startswith на каждый префикс"""
+    router = Router()
+    for prefix in prefixes:
+        router.callback_query.register(noop, lambda c, prefix=prefix: c.data.startswith(prefix + ':'))
+    return router
+
+def build_mapped(prefixes):
+    """Маршрутизация по префиксу через словарь"""
+    callback_router = CallbackRouter(name='bench')
+    for prefix in prefixes:
+        factory = type(f'Route_{prefix}', (CallbackData,), {'__annotations__': {'ticket_id': int}}, prefix=prefix)
+        callback_router.register(factory)(noop)
+    return callback_router.router
+
+def make_update(update_id: int, data: str) -> Update:
+    user = User(id=1, is_bot=False, first_name='bench')
+    message = Message(message_id=1, date=datetime.now(), chat=Chat(id=1, type='private'), text='x')
+    return Update(
+        update_id=update_id,
+        callback_query=CallbackQuery(id=str(update_id), from_user=user, chat_instance='c', data=data, message=message)
+    )
+
+async def measure(router: Router, data: str, iterations: int) -> float:
+    """Среднее время обработки одного апдейта (мкс)"""
+    bot = NoNetworkBot('123:abc')
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    updates = [make_update(i, data) for i in range(iterations)]
+    started = time.perf_counter()
+    for update in updates:
+        await dispatcher.feed_update(bot, update)
+    elapsed = time.perf_counter() - started
+    await bot.session.close()
+    return elapsed / iterations * 1e6
+
+async def run(routes: int, iterations: int):
+    prefixes = [f'route{i}' for i in range(routes)]
+    targets = {
+        'first route': f'{prefixes[0]}:1',
+        'last route': f'{prefixes[-1]}:1',
+        'unknown': 'missing:1',
+    }
+
+    print(f"{routes} routes, {iterations} callbacks per case (us per callback)")
+    print(f"{'case':<14} {'startswith':>12} {'prefix map':>12}")
+    for label, data in targets.items():
+        linear = await measure(build_linear(prefixes), data, iterations)
+        mapped = await measure(build_mapped(prefixes), data, iterations)
+        print(f"{label:<14} {linear:>12.1f} {mapped:>12.1f}")
+
+    build = get_admin_keyboard.__wrapped__
+    started = time.perf_counter()
+    for _ in range(iterations):
+        build(is_ceo=True)
+    uncached = (time.perf_counter() - started) / iterations * 1e6
+    started = time.perf_counter()
+    for _ in range(iterations):
+        get_admin_keyboard(is_ceo=True)
+    cached = (time.perf_counter() - started) / iterations * 1e6
+    print(f"\nget_admin_keyboard: {uncached:.1f} us built, {cached:.2f} us cached")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--routes', type=int, default=60)
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.routes, args.iterations))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Бенчмарк графика активности по часам: прежний путь (strftime по каждой строке
+tickets и pyplot с dpi=300) против почасовых агрегатов и переиспользуемой
+фигуры, для нескольких объемов истории.
+
+Запуск из корня проекта:
+    python benchmarks/bench_charts.py --tickets 10000 100000 --runs 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def render_legacy(rows) -> bytes:
+    """Построение графика так, как это делалось до агрегатов"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 6))
+    bars = plt.bar([row['hour'] for row in rows], [row['count'] for row in rows])
+    for bar in bars:
+        plt.text(bar.get_x() + bar.get_width() / 2., bar.get_height(),
+                 f'{int(bar.get_height())}', ha='center', va='bottom')
+    plt.title('Активность по часам', pad=20, size=14)
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.xticks(range(24))
+    plt.tight_layout()
+    buf = BytesIO()
+    plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
+    plt.close()
+    return buf.getvalue()
+
+async def seed(repository, tickets: int, days: int):
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = []
+    for _ in range(tickets):
+        created = now - timedelta(minutes=random.randint(0, days * 24 * 60))
+        closed = created + timedelta(minutes=random.randint(1, 600))
+        rows.append((1, 'closed', random.randint(1, 5), created, closed if closed < now else None))
+    await repository.executemany(
+        'INSERT INTO tickets (user_id, status, assigned_admin_id, created_at, closed_at) '
+        'VALUES (?, ?, ?, ?, ?)',
+        rows
+    )
+
+async def run(sizes: list, days: int, runs: int):
+    import database
+    from reports import ReportCharts
+
+    await database.init_db()
+    charts = ReportCharts()
+
+    async def legacy():
+        rows = await database.repository.fetchall('''
+            SELECT strftime('%H', created_at) as hour, COUNT(*) as count
+            FROM tickets GROUP BY hour ORDER BY hour
+        ''')
+        return render_legacy(rows)
+
+    async def rollups():
+        await database.refresh_hourly_rollups()
+        return charts.hourly(await database.get_weekday_hour_totals(datetime(1, 1, 1)))
+
+    seeded = 0
+    for tickets in sorted(sizes):
+        await seed(database.repository, tickets - seeded, days)
+        seeded = tickets
+
+        # Тикеты добавлены задним числом, поэтому агрегаты строятся заново
+        await database.repository.execute('DELETE FROM ticket_stats_hourly')
+        started = time.perf_counter()
+        await database.refresh_hourly_rollups()
+        backfill = (time.perf_counter() - started) * 1000
+
+        print(f"\n{tickets} tickets over {days} days (rollup backfill: {backfill:.0f} ms)")
+        for label, build in (('strftime + dpi 300', legacy), ('rollups + template', rollups)):
+            # Первый вызов загружает matplotlib и шрифты
+            png = await build()
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                await build()
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"{label:<22} {statistics.median(timings):>8.0f} ms  {len(png) / 1024:>7.0f} KB")
+    await database.close_db()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Настройки читаются при импорте config, поэтому задаются до импорта database
+        os.environ['DB_BACKEND'] = 'sqlite'
+        os.environ['DB_PATH'] = os.path.join(tmp_dir, 'bench.db')
+        asyncio.run(run(args.tickets, args.days, args.runs))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Бенчмарк выгрузки тикетов: отчет Excel через pandas (export_to_csv) против
+потоковой записи страницами в XLSX, CSV, JSON Lines (gzip) и Parquet -
+время записи, размер файла и время чтения обратно.
+
+Запуск из корня проекта:
+    python benchmarks/bench_export_formats.py --tickets 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+async def seed(repository, tickets: int):
+    """Тикеты за последние 30 дней: часть закрыта, часть в работе"""
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = []
+    for _ in range(tickets):
+        created = now - timedelta(minutes=random.randint(1, 29 * 24 * 60))
+        status = random.choice(['open', 'in_progress', 'closed', 'closed', 'closed'])
+        admin_id = random.randint(1, 20) if status != 'open' else None
+        closed = created + timedelta(minutes=random.randint(5, 600)) if status == 'closed' else None
+        rows.append((
+            random.randint(1, 1000), status, random.choice(['normal', 'normal', 'vip', 'urgent']),
+            admin_id, created, closed, closed or created, int(random.random() < 0.1)
+        ))
+    await repository.executemany(
+        'INSERT INTO tickets (user_id, status, priority, assigned_admin_id, created_at, '
+        'closed_at, updated_at, missed_flag) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        rows
+    )
+    await repository.executemany(
+        'INSERT INTO users (user_id, username, full_name) VALUES (?, ?, ?)',
+        [(i, f'user{i}', f'Пользователь {i}') for i in range(1, 1001)]
+    )
+    await repository.executemany(
+        "INSERT INTO admins (admin_id, username, role) VALUES (?, ?, 'admin')",
+        [(i, f'admin{i}') for i in range(1, 21)]
+    )
+
+def read_back(filename: str) -> str:
+    """Время чтения файла обратно в таблицу pandas (мс)"""
+    import pandas as pd
+    started = time.perf_counter()
+    try:
+        if filename.endswith('.parquet'):
+            pd.read_parquet(filename)
+        elif filename.endswith('.xlsx'):
+            pd.read_excel(filename, sheet_name=None)
+        elif filename.endswith('.jsonl.gz'):
+            pd.read_json(filename, lines=True)
+        else:
+            pd.read_csv(filename)
+    except ImportError:
+        # Для чтения XLSX pandas нужен openpyxl, в зависимостях бота его нет
+        return 'n/a'
+    return f'{(time.perf_counter() - started) * 1000:.0f}'
+
+async def run(tickets: int, page_size: int):
+    import database
+    from analytics import analytics_manager, remove_export
+    from exports import export_period, EXPORT_WRITERS
+
+    await database.init_db()
+    await seed(database.repository, tickets)
+
+    cases = [('pandas report (xlsx)', lambda: analytics_manager.export_to_csv('month'))]
+    for export_format in EXPORT_WRITERS:
+        cases.append((
+            f'stream {export_format}',
+            lambda export_format=export_format: export_period('month', export_format, page_size)
+        ))
+
+    print(f"{tickets} tickets, page size {page_size}")
+    print(f"{'path':<22} {'write, ms':>10} {'size, KB':>10} {'read, ms':>10}")
+    for label, export in cases:
+        started = time.perf_counter()
+        filename = await export()
+        elapsed = (time.perf_counter() - started) * 1000
+        size = os.path.getsize(filename) / 1024
+        read_ms = read_back(filename)
+        remove_export(filename)
+        print(f"{label:<22} {elapsed:>10.0f} {size:>10.0f} {read_ms:>10}")
+    await database.close_db()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Настройки читаются при импорте config, поэтому задаются до импорта database
+        os.environ['DB_BACKEND'] = 'sqlite'
+        os.environ['DB_PATH'] = os.path.join(tmp_dir, 'bench.db')
+        os.environ['ANALYTICS_CACHE_SECONDS'] = '0'
+        asyncio.run(run(args.tickets, args.page_size))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Бенчмарк запуска бота: время импорта модулей и RSS процесса после импорта,
+с ленивой загрузкой отчетов и с принудительным импортом pandas/matplotlib
+(как было раньше при загрузке analytics).
+
+Запуск из корня проекта:
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Выполняется в отдельном процессе, чтобы каждый замер начинался с пустого sys.modules
+CHILD = '''
+import json, resource, sys, time
+started = time.perf_counter()
+import bot
+if {eager}:
+    import pandas
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    'import_ms': elapsed * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'pandas_loaded': 'pandas' in sys.modules,
+}}))
+'''
+
+def measure(eager: bool) -> dict:
+    env = dict(os.environ, BOT_TOKEN=os.environ.get('BOT_TOKEN', '123:abc'))
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(eager=eager)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<28} {'import, ms':>12} {'max RSS, MB':>12}  pandas loaded")
+    for label, eager in (('lazy reports', False), ('eager pandas+matplotlib', True)):
+        # Первый запуск прогревает кэш байткода и файловой системы
+        measure(eager)
+        results = [measure(eager) for _ in range(args.runs)]
+        import_ms = statistics.median(result['import_ms'] for result in results)
+        rss_mb = statistics.median(result['rss_mb'] for result in results)
+        print(f"{label:<28} {import_ms:>12.0f} {rss_mb:>12.1f}  {results[0]['pandas_loaded']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Бенчмарк создания тикетов при всплеске: тикетов в секунду
+с отдельной транзакцией на тикет и с групповой фиксацией.
+
+Запуск из корня проекта:
+    python benchmarks/bench_ticket_writes.py --tickets 5000 --window-ms 5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+async def run(tickets: int, concurrency: int, window_ms: float, max_size: int):
+    import database
+    from write_batcher import WriteBatcher
+
+    await database.init_db()
+    await database.add_user(1, 'bench', 'Bench User', '')
+
+    async def burst(label: str):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def create(i: int):
+            async with semaphore:
+                return await database.create_ticket(1, message_data=f'{{"text": "message {i}"}}')
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(create(i) for i in range(tickets)), return_exceptions=True
+        )
+        elapsed = time.perf_counter() - started
+        ids = [result for result in results if not isinstance(result, Exception)]
+        assert len(set(ids)) == len(ids), "ticket ids must be unique"
+        # При одновременной записи без пакетов SQLite отвечает 'database is locked'
+        failed = len(results) - len(ids)
+        print(
+            f"{label:<28} {len(ids) / elapsed:>10.0f} tickets/s  ({elapsed:.2f} s)"
+            + (f", failed: {failed}" if failed else "")
+        )
+
+    database.ticket_batcher = None
+    await burst('one commit per ticket')
+
+    database.ticket_batcher = WriteBatcher(
+        database.repository, database.CREATE_TICKET_QUERY, window_ms / 1000, max_size
+    )
+    await burst(f'group commit ({window_ms:g} ms)')
+    stats = database.ticket_batcher.get_stats()
+    print(f"batches: {stats['batches']}, avg batch: {stats['avg_batch']}")
+    await database.close_db()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=500, help='одновременных обработчиков сообщений')
+    parser.add_argument('--window-ms', type=float, default=5)
+    parser.add_argument('--max-size', type=int, default=500)
+    parser.add_argument('--synchronous', default='FULL', help='PRAGMA synchronous для SQLite')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Настройки читаются при импорте config, поэтому задаются до импорта database
+        os.environ['DB_BACKEND'] = 'sqlite'
+        os.environ['DB_PATH'] = os.path.join(tmp_dir, 'bench.db')
+        os.environ['DB_SYNCHRONOUS'] = args.synchronous
+        asyncio.run(run(args.tickets, args.concurrency, args.window_ms, args.max_size))
+
+if __name__ == '__main__':
+    main()
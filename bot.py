@@ -11,10 +11,18 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from handlers import register_all_handlers, init_managers
 from admin_panel import register_admin_handlers
 from group_commands import register_group_handlers
-from database import init_db
-from analytics import AnalyticsManager
-from missed_responses import MissedResponsesChecker
+from callbacks import callback_router
+from database import init_db, close_db, load_ticket_queue
 from init_data import init_ceo_admins
+from middlewares import throttling_middleware, inflight_middleware
+from lifecycle import lifecycle
+from macros import macro_library
+from retention import RetentionManager
+from backup import BackupManager
+from config import (
+    DB_BACKEND, DASHBOARD_REFRESH_SECONDS, RETENTION_HOUR, BACKUP_INTERVAL_HOURS,
+    MACRO_USAGE_FLUSH_SECONDS
+)
 
 # Настройка логирования
 logging.basicConfig(
@@ -30,12 +38,26 @@ load_dotenv()
 if not os.getenv('BOT_TOKEN'):
     raise ValueError("BOT_TOKEN не найден в .env файле")
 
-async def check_missed_responses(bot: Bot):
-    """Проверка пропущенных ответов"""
-    from handlers import notification_manager
-    if notification_manager:
-        checker = MissedResponsesChecker(notification_manager)
-        await checker.check_missed_responses()
+async def archive_old_tickets():
+    """Архивация старых закрытых тикетов"""
+    try:
+        await RetentionManager().run()
+    except Exception as e:
+        logger.error(f"Ошибка архивации тикетов: {e}")
+
+async def backup_database():
+    """Онлайн-бэкап базы данных"""
+    try:
+        path = await BackupManager().create_backup()
+        logger.info(f"Бэкап БД создан: {path}")
+    except Exception as e:
+        logger.error(f"Ошибка бэкапа БД: {e}")
+
+async def refresh_dashboards():
+    """Обновление живых панелей при изменении счетчиков"""
+    from handlers import dashboard_manager
+    if dashboard_manager:
+        await dashboard_manager.refresh()
 
 async def main():
     # Получаем токен бота
@@ -52,34 +74,84 @@ async def main():
 
     # Инициализация базы данных
     await init_db()
+
+    # Загрузка очереди открытых тикетов в память
+    await load_ticket_queue()
     
     # Инициализация CEO администраторов
     await init_ceo_admins()
 
+    # Загрузка шаблонов ответов в память
+    await macro_library.load()
+
     # Инициализация менеджеров
     init_managers(bot)
 
+    # Загрузка живых панелей
+    from handlers import dashboard_manager
+    await dashboard_manager.load()
+
+    # Эскалация тикетов без ответа по дедлайнам из БД
+    from handlers import escalation_manager
+    await escalation_manager.start()
+
     # Инициализация планировщика
     scheduler = AsyncIOScheduler()
     scheduler.add_job(
-        check_missed_responses,
+        lifecycle.job(refresh_dashboards),
         'interval',
-        minutes=1,
-        args=[bot]
+        seconds=DASHBOARD_REFRESH_SECONDS
     )
+    scheduler.add_job(
+        lifecycle.job(macro_library.flush),
+        'interval',
+        seconds=MACRO_USAGE_FLUSH_SECONDS
+    )
+    # Архивация и бэкапы работают с файлом SQLite; для Postgres
+    # используются штатные средства сервера (pg_dump, партиционирование)
+    if DB_BACKEND == 'sqlite':
+        scheduler.add_job(
+            lifecycle.job(archive_old_tickets),
+            'cron',
+            hour=RETENTION_HOUR
+        )
+        scheduler.add_job(
+            lifecycle.job(backup_database),
+            'interval',
+            hours=BACKUP_INTERVAL_HOURS
+        )
     scheduler.start()
 
+    # Учет апдейтов в обработке, чтобы дождаться их при остановке
+    dp.update.outer_middleware(inflight_middleware)
+    # Ограничение частоты апдейтов от одного пользователя
+    dp.message.outer_middleware(throttling_middleware)
+    dp.callback_query.outer_middleware(throttling_middleware)
+
     # Регистрация всех хендлеров
     register_all_handlers(dp)
     register_admin_handlers(dp)
     register_group_handlers(dp)
+    # Все callback-кнопки маршрутизируются одним обработчиком по префиксу
+    dp.include_router(callback_router.router)
+
+    # Шаги остановки: сначала отложенные уведомления (им нужны БД и сессия),
+    # затем дозапись в БД и закрытие сессии бота
+    from handlers import conversation_manager, notification_manager
+    lifecycle.on_shutdown('escalations', escalation_manager.close)
+    lifecycle.on_shutdown('conversations', conversation_manager.close)
+    lifecycle.on_shutdown('group digest', notification_manager.close)
+    lifecycle.on_shutdown('macro usage', macro_library.flush)
+    lifecycle.on_shutdown('database', close_db)
+    lifecycle.on_shutdown('bot session', bot.session.close)
 
-    # Запуск бота
+    # Запуск бота. По SIGTERM/SIGINT aiogram прекращает получать апдейты;
+    # начатые обработчики и задачи планировщика дорабатывают до дедлайна
     try:
-        await dp.start_polling(bot)
+        await dp.start_polling(bot, close_bot_session=False)
     finally:
-        scheduler.shutdown()
-        await bot.session.close()
+        scheduler.shutdown(wait=False)
+        await lifecycle.shutdown()
 
 if __name__ == '__main__':
     asyncio.run(main())
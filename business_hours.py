@@ -0,0 +1,182 @@
+"""
+Рабочее время для SLA и графики дежурств администраторов.
+
+Расписание задается строкой вида 'mon-fri 09:00-18:00; sat 10:00-15:00' в местном
+времени (фиксированное смещение от UTC), пустая строка - круглосуточно. Время
+переводится в "рабочие минуты" от начала отсчета по предвычисленным таблицам:
+накопленные рабочие минуты на начало каждого дня и внутри дня по минутам. Перевод
+в обе стороны - поиск по таблице, а для массивов (аналитика) - индексация numpy
+без цикла по тикетам.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import accumulate
+from typing import Iterable, List, Optional, Tuple
+
+from config import BUSINESS_HOURS, BUSINESS_UTC_OFFSET_HOURS, BUSINESS_HOLIDAYS
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MINUTES_PER_DAY = 24 * 60
+# Начало отсчета (понедельник) и число дней в таблице (до 2109 года)
+EPOCH = date(2000, 1, 3)
+DAYS = 40000
+# Вид дня для праздников (после семи дней недели)
+HOLIDAY = 7
+
+def parse_time(value: str) -> int:
+    """'09:30' -> минуты от начала суток (допускается 24:00)"""
+    hours, minutes = value.split(':')
+    result = int(hours) * 60 + int(minutes)
+    if not 0 <= result <= MINUTES_PER_DAY:
+        raise ValueError(f"Некорректное время: {value}")
+    return result
+
+def parse_days(value: str) -> List[int]:
+    """'mon-fri' или 'mon,wed,sat' -> номера дней недели"""
+    days = []
+    for part in value.split(','):
+        first, _, last = part.strip().partition('-')
+        start = WEEKDAYS.index(first)
+        end = WEEKDAYS.index(last) if last else start
+        # Диапазон может переходить через воскресенье: 'sat-mon'
+        days.extend(day % 7 for day in range(start, start + (end - start) % 7 + 1))
+    return days
+
+def parse_schedule(text: str) -> List[List[Tuple[int, int]]]:
+    """Расписание -> интервалы (начало, конец) в минутах для каждого дня недели"""
+    if not text.strip():
+        return [[(0, MINUTES_PER_DAY)] for _ in WEEKDAYS]
+    schedule = [[] for _ in WEEKDAYS]
+    for rule in text.lower().split(';'):
+        if not rule.strip():
+            continue
+        days, ranges = rule.split()
+        intervals = []
+        for interval in ranges.split(','):
+            start, end = map(parse_time, interval.split('-'))
+            if start >= end:
+                raise ValueError(f"Некорректный интервал: {interval}")
+            intervals.append((start, end))
+        for day in parse_days(days):
+            schedule[day].extend(intervals)
+    return schedule
+
+class BusinessCalendar:
+    """Недельное расписание с праздниками; время в БД - UTC без часового пояса"""
+
+    def __init__(self, schedule: str = '', utc_offset_hours: float = 0, holidays: Iterable[str] = ()):
+        self.utc_offset = timedelta(hours=utc_offset_hours)
+        self.holidays = {date.fromisoformat(day) for day in holidays}
+        # Рабочие минуты по видам дня: prefix[вид][m] - сколько рабочих минут до минуты m
+        busy = [[0] * MINUTES_PER_DAY for _ in range(HOLIDAY + 1)]
+        for day, intervals in enumerate(parse_schedule(schedule)):
+            for start, end in intervals:
+                busy[day][start:end] = [1] * (end - start)
+        self._busy = busy
+        self._prefix = [[0] + list(accumulate(minutes)) for minutes in busy]
+        # Таблица по дням строится при первом переводе в рабочие минуты
+        self._kinds: Optional[List[int]] = None
+        self._day_offsets: Optional[List[int]] = None
+        self._arrays = None
+
+    def _build_days(self):
+        """Вид каждого дня и накопленные рабочие минуты на его начало"""
+        kinds = [day % 7 for day in range(DAYS)]
+        for holiday in self.holidays:
+            index = (holiday - EPOCH).days
+            if 0 <= index < DAYS:
+                kinds[index] = HOLIDAY
+        day_minutes = [self._prefix[kind][MINUTES_PER_DAY] for kind in kinds]
+        self._kinds = kinds
+        self._day_offsets = [0] + list(accumulate(day_minutes))
+
+    def _locate(self, moment: datetime) -> Tuple[int, int, float]:
+        """(номер дня, минута дня, доля минуты) в местном времени"""
+        local = moment + self.utc_offset
+        day = (local.date() - EPOCH).days
+        if not 0 <= day < DAYS:
+            raise ValueError(f"Время вне календаря: {moment}")
+        minute = local.hour * 60 + local.minute
+        return day, minute, (local.second + local.microsecond / 1e6) / 60
+
+    def is_open(self, moment: datetime) -> bool:
+        """Рабочее ли время (для расписания дежурств таблица по дням не нужна)"""
+        local = moment + self.utc_offset
+        kind = HOLIDAY if local.date() in self.holidays else local.weekday()
+        return bool(self._busy[kind][local.hour * 60 + local.minute])
+
+    def offset(self, moment: datetime) -> float:
+        """Рабочие минуты от начала отсчета до moment (UTC)"""
+        if self._day_offsets is None:
+            self._build_days()
+        day, minute, fraction = self._locate(moment)
+        kind = self._kinds[day]
+        return (
+            self._day_offsets[day] + self._prefix[kind][minute]
+            + self._busy[kind][minute] * fraction
+        )
+
+    def at(self, offset: float) -> datetime:
+        """Самый ранний момент (UTC), к которому набирается offset рабочих минут"""
+        if self._day_offsets is None:
+            self._build_days()
+        day = max(bisect_left(self._day_offsets, offset) - 1, 0)
+        within = offset - self._day_offsets[day]
+        prefix = self._prefix[self._kinds[day]]
+        minute = max(bisect_left(prefix, within), 1)
+        local = datetime.combine(EPOCH + timedelta(days=day), datetime.min.time()) + timedelta(
+            minutes=minute - 1 + within - prefix[minute - 1]
+        )
+        return local - self.utc_offset
+
+    def add(self, moment: datetime, minutes: float) -> datetime:
+        """Момент, когда после moment пройдет minutes рабочих минут"""
+        return max(moment, self.at(self.offset(moment) + minutes))
+
+    def minutes_between(self, start: datetime, end: datetime) -> float:
+        """Рабочие минуты между двумя моментами"""
+        return self.offset(end) - self.offset(start)
+
+    def offsets(self, moments):
+        """
+        Рабочие минуты для массива моментов (numpy datetime64 или pandas Series);
+        NaT дает NaN. Вычисляется индексацией таблиц, без цикла по элементам
+        """
+        import numpy as np
+        if self._arrays is None:
+            if self._day_offsets is None:
+                self._build_days()
+            self._arrays = (
+                np.array(self._kinds, dtype=np.int8),
+                np.array(self._day_offsets, dtype=np.float64),
+                np.array(self._prefix, dtype=np.float64),
+                np.array(self._busy, dtype=np.float64),
+            )
+        kinds, day_offsets, prefix, busy = self._arrays
+
+        moments = np.asarray(moments, dtype='datetime64[us]')
+        missing = np.isnat(moments)
+        local = moments + np.timedelta64(self.utc_offset)
+        seconds = (local - np.datetime64(EPOCH, 'us')) / np.timedelta64(1, 's')
+        seconds = np.where(missing, 0, seconds)
+        day = (seconds // 86400).astype(np.int64)
+        if day.size and (day.min() < 0 or day.max() >= DAYS):
+            raise ValueError("Время вне календаря")
+        minute_of_day = seconds / 60 - day * MINUTES_PER_DAY
+        minute = minute_of_day.astype(np.int64)
+        kind = kinds[day]
+        result = day_offsets[day] + prefix[kind, minute] + busy[kind, minute] * (minute_of_day - minute)
+        return np.where(missing, np.nan, result)
+
+    def minutes_between_many(self, starts, ends):
+        """Рабочие минуты между парами моментов (массивы); NaN, если конца нет"""
+        return self.offsets(ends) - self.offsets(starts)
+
+@lru_cache(maxsize=None)
+def shift_calendar(schedule: str) -> BusinessCalendar:
+    """Календарь графика дежурства администратора (разбирается один раз)"""
+    return BusinessCalendar(schedule, BUSINESS_UTC_OFFSET_HOURS, BUSINESS_HOLIDAYS)
+
+# Рабочее время поддержки для SLA и аналитики
+business_calendar = BusinessCalendar(BUSINESS_HOURS, BUSINESS_UTC_OFFSET_HOURS, BUSINESS_HOLIDAYS)
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class LRUCache:
+    """Ограниченный LRU-кэш; отсутствующие значения (None) хранятся с коротким TTL"""
+
+    def __init__(self, maxsize: int, negative_ttl: float = 0):
+        self.maxsize = maxsize
+        self.negative_ttl = negative_ttl
+        # ключ -> (значение, время истечения или None)
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Возвращает (найдено, значение)"""
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._data[key]
+        self.misses += 1
+        return False, None
+
+    def set(self, key: Hashable, value: Any):
+        """Сохранение значения; None кэшируется только на negative_ttl"""
+        if value is None:
+            if self.negative_ttl <= 0:
+                self._data.pop(key, None)
+                return
+            expires_at = time.monotonic() + self.negative_ttl
+        else:
+            expires_at = None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Удаление значения из кэша"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Очистка кэша"""
+        self._data.clear()
+
+    def get_stats(self) -> dict:
+        """Размер кэша и доля попаданий"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 2) if total else 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class SingleFlightCache:
+    """
+    Кэш результатов асинхронных запросов с коротким TTL. Одинаковые запросы,
+    пришедшие во время выполнения первого, ждут его результат (single-flight).
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 256):
+        self.ttl = ttl
+        # ключ -> (значение, время истечения)
+        self._results = LRUCache(maxsize)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Значение из кэша или результат loader(), выполненного один раз на ключ"""
+        if self.ttl > 0:
+            found, entry = self._results.get(key)
+            if found and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: отмена одного ожидающего не отменяет запрос для остальных
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            if self.ttl > 0:
+                self._results.set(key, (value, time.monotonic() + self.ttl))
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # Помечаем исключение полученным, даже если ожидающих не было
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            # Запрос отменен - ожидающие тоже получают отмену
+            if not future.done():
+                future.cancel()
+
+    def clear(self):
+        """Очистка сохраненных результатов"""
+        self._results.clear()
+
+    def get_stats(self) -> dict:
+        """Попадания, промахи и объединенные одновременные запросы"""
+        total = self.hits + self.misses + self.coalesced
+        return {
+            'size': len(self._results),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': round((self.hits + self.coalesced) / total * 100, 2) if total else 0
+        }
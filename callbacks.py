@@ -0,0 +1,102 @@
+import inspect
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+
+from aiogram import Router
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+
+# Типизированные callback_data кнопок. Формат строк совпадает с прежним
+# ("view_ticket:5", "priority:5:vip"), поэтому старые кнопки в чатах работают
+
+class ViewTicket(CallbackData, prefix='view_ticket'):
+    ticket_id: int
+
+class TakeTicket(CallbackData, prefix='take_ticket'):
+    ticket_id: int
+
+class ReplyTicket(CallbackData, prefix='reply'):
+    ticket_id: int
+
+class CloseTicket(CallbackData, prefix='close'):
+    ticket_id: int
+
+class TicketPriority(CallbackData, prefix='priority'):
+    ticket_id: int
+    priority: str
+
+class UseMacro(CallbackData, prefix='macro'):
+    ticket_id: int
+    macro_id: int
+
+class ExportPeriod(CallbackData, prefix='export'):
+    period: str
+
+class ReportChart(CallbackData, prefix='chart'):
+    kind: str
+
+RouteKey = Union[str, Type[CallbackData]]
+
+class CallbackRouter:
+    """
+    Маршрутизация callback-запросов по префиксу callback_data через словарь:
+    вместо перебора фильтров всех обработчиков - один поиск по ключу.
+    """
+
+    def __init__(self, name: str = 'callbacks'):
+        # префикс -> (класс CallbackData или None для статической кнопки, обработчик, его параметры)
+        self._routes: Dict[str, Tuple[Optional[Type[CallbackData]], Callable, frozenset]] = {}
+        self.router = Router(name=name)
+        self.router.callback_query.register(self._dispatch, self._match)
+
+    def register(self, *keys: RouteKey):
+        """Декоратор обработчика для статических callback_data или классов CallbackData"""
+        def decorator(handler: Callable) -> Callable:
+            params = frozenset(inspect.signature(handler).parameters)
+            for key in keys:
+                if isinstance(key, str):
+                    prefix, factory = key, None
+                else:
+                    prefix, factory = key.__prefix__, key
+                if prefix in self._routes:
+                    raise ValueError(f"Callback '{prefix}' уже зарегистрирован")
+                self._routes[prefix] = (factory, handler, params)
+            return handler
+        return decorator
+
+    def resolve(self, data: Optional[str]) -> Optional[Tuple[Callable, frozenset, Optional[CallbackData]]]:
+        """Поиск обработчика и разбор callback_data"""
+        if not data:
+            return None
+        prefix, separator, _ = data.partition(':')
+        route = self._routes.get(prefix)
+        if route is None:
+            return None
+        factory, handler, params = route
+        if factory is None:
+            # Статическая кнопка должна совпадать целиком
+            return (handler, params, None) if not separator else None
+        try:
+            return handler, params, factory.unpack(data)
+        except (TypeError, ValueError):
+            return None
+
+    async def _match(self, callback: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+        """Фильтр aiogram: найденный маршрут передается в обработчик"""
+        route = self.resolve(callback.data)
+        if route is None:
+            return False
+        return {'callback_route': route}
+
+    async def _dispatch(self, callback: CallbackQuery, callback_route: tuple, **data: Any) -> Any:
+        handler, params, callback_data = callback_route
+        if 'callback_data' in params:
+            data['callback_data'] = callback_data
+        # Передаем только те зависимости (state, bot, ...), которые принимает обработчик
+        kwargs = {key: value for key, value in data.items() if key in params}
+        return await handler(callback, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+# Общий экземпляр; роутер подключается к диспетчеру в bot.main()
+callback_router = CallbackRouter()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+from datetime import timedelta
+from dotenv import load_dotenv
+
+# Загрузка переменных окружения до чтения настроек
+load_dotenv()
+
+# Хранилище: sqlite (файл DB_PATH) или postgres (DATABASE_URL, пул asyncpg)
+DB_BACKEND = os.getenv('DB_BACKEND', 'sqlite').lower()
+DB_PATH = os.getenv('DB_PATH', 'support_bot.db')
+DATABASE_URL = os.getenv('DATABASE_URL')
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+# Групповая фиксация создания тикетов: окно накопления (мс, 0 - писать сразу)
+# и максимум тикетов в транзакции; режим synchronous для SQLite (FULL, NORMAL, OFF)
+TICKET_BATCH_WINDOW_MS = float(os.getenv('TICKET_BATCH_WINDOW_MS', 5))
+TICKET_BATCH_MAX_SIZE = int(os.getenv('TICKET_BATCH_MAX_SIZE', 500))
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', '').upper()
+
+# Приоритеты тикетов в порядке убывания важности
+PRIORITY_LEVELS = ('urgent', 'vip', 'normal')
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(PRIORITY_LEVELS)}
+DEFAULT_PRIORITY = 'normal'
+
+# Таймауты SLA на первый ответ для каждого приоритета (минуты)
+SLA_TIMEOUTS = {
+    'urgent': timedelta(minutes=int(os.getenv('SLA_TIMEOUT_URGENT', 10))),
+    'vip': timedelta(minutes=int(os.getenv('SLA_TIMEOUT_VIP', 15))),
+    'normal': timedelta(minutes=int(os.getenv('SLA_TIMEOUT_NORMAL', 30))),
+}
+
+# Рабочее время поддержки: таймауты SLA и время ответа в аналитике считаются только в нем.
+# Расписание в местном времени ('mon-fri 09:00-18:00; sat 10:00-15:00', пусто - круглосуточно),
+# смещение местного времени от UTC в часах и праздничные дни через запятую (YYYY-MM-DD)
+BUSINESS_HOURS = os.getenv('BUSINESS_HOURS', '')
+BUSINESS_UTC_OFFSET_HOURS = float(os.getenv('BUSINESS_UTC_OFFSET_HOURS', 3))
+BUSINESS_HOLIDAYS = [day.strip() for day in os.getenv('BUSINESS_HOLIDAYS', '').split(',') if day.strip()]
+
+# Лестница эскалации тикета в работе без ответа: шаг -> минуты после дедлайна SLA
+# (assignee - напоминание ответственному, group - группа мониторинга, ceo - CEO,
+# reassign - передача наименее загруженному админу); отрицательное значение отключает шаг
+ESCALATION_STEPS = (
+    ('assignee', int(os.getenv('ESCALATION_ASSIGNEE_MINUTES', 0))),
+    ('group', int(os.getenv('ESCALATION_GROUP_MINUTES', 15))),
+    ('ceo', int(os.getenv('ESCALATION_CEO_MINUTES', 30))),
+    ('reassign', int(os.getenv('ESCALATION_REASSIGN_MINUTES', 60))),
+)
+
+# Шаблоны ответов: сколько самых используемых показывать кнопками при ответе
+# на тикет и как часто сохранять счетчики использования в БД (секунды)
+MACRO_BUTTONS = int(os.getenv('MACRO_BUTTONS', 5))
+MACRO_USAGE_FLUSH_SECONDS = float(os.getenv('MACRO_USAGE_FLUSH_SECONDS', 60))
+
+# Склейка сообщений пользователя в открытый тикет (секунды)
+THREAD_DEBOUNCE_SECONDS = float(os.getenv('THREAD_DEBOUNCE_SECONDS', 5))
+THREAD_MAX_DELAY_SECONDS = float(os.getenv('THREAD_MAX_DELAY_SECONDS', 30))
+# Окно сбора альбома (media group) в одно сообщение тикета (секунды)
+MEDIA_GROUP_WINDOW_SECONDS = float(os.getenv('MEDIA_GROUP_WINDOW_SECONDS', 1))
+# Ограничение частоты апдейтов от пользователя: тип апдейта -> (лимит, окно в секундах)
+RATE_LIMITS = {
+    'message': (
+        int(os.getenv('RATE_LIMIT_MESSAGES', 20)),
+        float(os.getenv('RATE_LIMIT_MESSAGES_WINDOW', 60))
+    ),
+    'callback_query': (
+        int(os.getenv('RATE_LIMIT_CALLBACKS', 60)),
+        float(os.getenv('RATE_LIMIT_CALLBACKS_WINDOW', 60))
+    ),
+}
+# Кэш зарегистрированных пользователей
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_NEGATIVE_TTL = float(os.getenv('USER_CACHE_NEGATIVE_TTL', 60))
+# Сводки событий для приватной группы: окно накопления (секунды, 0 - отключить)
+# и как долго дописывать события в одно сообщение (минуты)
+GROUP_DIGEST_SECONDS = float(os.getenv('GROUP_DIGEST_SECONDS', 60))
+GROUP_DIGEST_ROLL_MINUTES = float(os.getenv('GROUP_DIGEST_ROLL_MINUTES', 60))
+# Как часто проверять, нужно ли обновить живые панели (секунды)
+DASHBOARD_REFRESH_SECONDS = int(os.getenv('DASHBOARD_REFRESH_SECONDS', 15))
+# Сколько хранить результаты отчетов аналитики (секунды, 0 - без кэша)
+ANALYTICS_CACHE_SECONDS = float(os.getenv('ANALYTICS_CACHE_SECONDS', 30))
+# Каталог для файлов экспорта: по умолчанию tmpfs (/dev/shm), если он есть
+EXPORT_TMP_DIR = os.getenv(
+    'EXPORT_TMP_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+)
+# Инкрементальный экспорт: тикетов на страницу выборки
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', 1000))
+# Сколько ждать завершения начатой работы при остановке бота (секунды);
+# должно быть меньше таймаута остановки у оркестратора (docker stop - 10 с)
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv('SHUTDOWN_TIMEOUT_SECONDS', 8))
+# Архивация закрытых тикетов: срок хранения в основной БД (дни), архивная БД,
+# размер пакета и пауза между пакетами (секунды), час запуска задачи
+RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', 180))
+ARCHIVE_DB_PATH = os.getenv('ARCHIVE_DB_PATH', 'support_bot_archive.db')
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', 500))
+RETENTION_BATCH_PAUSE = float(os.getenv('RETENTION_BATCH_PAUSE', 0.2))
+RETENTION_HOUR = int(os.getenv('RETENTION_HOUR', 4))
+VACUUM_PAGES_PER_STEP = int(os.getenv('VACUUM_PAGES_PER_STEP', 1000))
+# Онлайн-бэкапы БД: каталог, сколько хранить, страниц за шаг и пауза между
+# шагами (секунды), сжатие gzip и период (часы)
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backups')
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', 14))
+BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', 1024))
+BACKUP_STEP_SLEEP = float(os.getenv('BACKUP_STEP_SLEEP', 0.05))
+BACKUP_COMPRESS = os.getenv('BACKUP_COMPRESS', '1') == '1'
+BACKUP_INTERVAL_HOURS = float(os.getenv('BACKUP_INTERVAL_HOURS', 6))
+
+def get_priority_rank(priority: str) -> int:
+    """Ранг приоритета (меньше - важнее), неизвестные приоритеты идут последними"""
+    return PRIORITY_RANK.get(priority, len(PRIORITY_LEVELS))
+
@@ -0,0 +1,124 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Set
+
+from config import THREAD_DEBOUNCE_SECONDS, THREAD_MAX_DELAY_SECONDS
+from database import get_ticket, get_all_admins
+from keyboards import get_ticket_actions_keyboard
+from notifications import NotificationManager
+
+class ConversationManager:
+    """Класс для склейки сообщений пользователя в один тикет с отложенными уведомлениями"""
+
+    def __init__(
+        self,
+        notification_manager: NotificationManager,
+        debounce: float = THREAD_DEBOUNCE_SECONDS,
+        max_delay: float = THREAD_MAX_DELAY_SECONDS
+    ):
+        self.notification_manager = notification_manager
+        self.debounce = debounce
+        self.max_delay = max_delay
+        # user_id -> [блокировка, число ожидающих]
+        self._locks: Dict[int, list] = {}
+        # ticket_id -> накопленные сообщения, ожидающие уведомления
+        self._pending: Dict[int, dict] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        # При остановке бота ожидающие уведомления отправляются сразу
+        self._closing = asyncio.Event()
+
+    @asynccontextmanager
+    async def user_lock(self, user_id: int):
+        """Блокировка на пользователя, чтобы параллельные сообщения не создали два тикета"""
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[user_id]
+
+    def add_message(self, ticket_id: int, user_name: str, created: bool) -> bool:
+        """
+        Учет сообщения в тикете. Уведомление админов откладывается, пока
+        пользователь продолжает писать. Возвращает True для первого сообщения серии.
+        """
+        now = asyncio.get_running_loop().time()
+        pending = self._pending.get(ticket_id)
+        if pending:
+            pending['count'] += 1
+            pending['deadline'] = min(now + self.debounce, pending['started'] + self.max_delay)
+            return False
+
+        self._pending[ticket_id] = {
+            'user_name': user_name,
+            'created': created,
+            'count': 1,
+            'started': now,
+            'deadline': now + self.debounce
+        }
+        task = asyncio.create_task(self._flush_later(ticket_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _flush_later(self, ticket_id: int):
+        """Ожидание окончания серии сообщений и отправка одного уведомления"""
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self._pending[ticket_id]['deadline'] - loop.time()
+            if delay <= 0 or self._closing.is_set():
+                break
+            try:
+                await asyncio.wait_for(self._closing.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+        pending = self._pending.pop(ticket_id)
+        try:
+            await self._notify(ticket_id, pending)
+        except Exception as e:
+            print(f"Error sending notification for ticket {ticket_id}: {e}")
+
+    async def close(self):
+        """Немедленная отправка всех отложенных уведомлений (при остановке бота)"""
+        self._closing.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _notify(self, ticket_id: int, pending: dict):
+        """Уведомление админов о новом тикете или новых сообщениях в нем"""
+        ticket = await get_ticket(ticket_id)
+        if not ticket or ticket[2] == 'closed':  # ticket[2] это status
+            return
+
+        keyboard = get_ticket_actions_keyboard(ticket_id)
+        if pending['created']:
+            admins = await get_all_admins()
+            await self.notification_manager.notify_ticket_created(
+                ticket_id=ticket_id,
+                user_name=pending['user_name'],
+                admin_ids=[admin['admin_id'] for admin in admins],
+                keyboard=keyboard,
+                messages_count=pending['count']
+            )
+        elif ticket[2] == 'in_progress':
+            # Тикет уже в работе - уведомляем только ответственного админа
+            await self.notification_manager.notify_ticket_updated(
+                ticket_id=ticket_id,
+                user_name=pending['user_name'],
+                admin_ids=[ticket[3]],  # ticket[3] это assigned_admin_id
+                messages_count=pending['count']
+            )
+        else:
+            admins = await get_all_admins()
+            await self.notification_manager.notify_ticket_updated(
+                ticket_id=ticket_id,
+                user_name=pending['user_name'],
+                admin_ids=[admin['admin_id'] for admin in admins],
+                messages_count=pending['count'],
+                keyboard=keyboard
+            )
@@ -0,0 +1,94 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from aiogram import Bot
+
+from analytics import AnalyticsManager
+from database import save_dashboard, delete_dashboard, get_dashboards
+from events import ticket_events
+
+class DashboardManager:
+    """
+    Класс живых панелей: одно закрепленное сообщение со статистикой на чат,
+    которое редактируется фоновой задачей только при изменении счетчиков событий.
+    """
+
+    def __init__(self, bot: Bot, analytics_manager: AnalyticsManager):
+        self.bot = bot
+        self.analytics_manager = analytics_manager
+        # chat_id -> message_id закрепленной панели
+        self._dashboards: Dict[int, int] = {}
+        self._rendered_version: Optional[int] = None
+        self._last_text: Optional[str] = None
+
+    async def load(self):
+        """Загрузка зарегистрированных панелей из БД"""
+        self._dashboards = {chat_id: message_id for chat_id, message_id in await get_dashboards()}
+
+    async def create(self, chat_id: int):
+        """Отправка и закрепление новой панели в чате (старая панель чата заменяется)"""
+        text = self._with_timestamp(await self._render())
+        message = await self.bot.send_message(chat_id=chat_id, text=text)
+        try:
+            await self.bot.pin_chat_message(
+                chat_id=chat_id,
+                message_id=message.message_id,
+                disable_notification=True
+            )
+        except Exception as e:
+            print(f"Не удалось закрепить панель в чате {chat_id}: {e}")
+
+        self._dashboards[chat_id] = message.message_id
+        await save_dashboard(chat_id, message.message_id)
+
+    async def refresh(self):
+        """Обновление панелей, если с прошлого обновления были события по тикетам"""
+        version = ticket_events.version
+        if version == self._rendered_version or not self._dashboards:
+            return
+
+        body = await self._render()
+        # Версия запоминается только после успешного построения текста: если запрос
+        # упал, следующий вызов повторит обновление, а не пропустит эти события
+        self._rendered_version = version
+        if body == self._last_text:
+            return
+        self._last_text = body
+        text = self._with_timestamp(body)
+
+        for chat_id, message_id in list(self._dashboards.items()):
+            try:
+                await self.bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=message_id,
+                    text=text
+                )
+            except Exception as e:
+                if "message is not modified" in str(e):
+                    continue
+                if "message to edit not found" in str(e) or "chat not found" in str(e):
+                    # Панель удалена - больше ее не обновляем
+                    del self._dashboards[chat_id]
+                    await delete_dashboard(chat_id)
+                else:
+                    print(f"Error refreshing dashboard in chat {chat_id}: {e}")
+
+    @staticmethod
+    def _with_timestamp(body: str) -> str:
+        """Добавление времени обновления к тексту панели"""
+        return f"{body}\nОбновлено: {datetime.now().strftime('%H:%M:%S')}"
+
+    async def _render(self) -> str:
+        """Текст панели без времени обновления"""
+        counters = await self.analytics_manager.get_live_counters()
+        sla = await self.analytics_manager.get_sla_metrics()
+
+        text = "📌 Живая панель\n\n"
+        text += f"Открытых тикетов: {counters['open']}\n"
+        text += f"В работе: {counters['in_progress']}\n"
+        text += f"Без ответа сверх SLA: {counters['missed']}\n"
+        text += f"Создано за 24 часа: {counters['created_day']}\n"
+        text += "\nSLA метрики:\n"
+        text += f"Закрыто вовремя: {sla['on_time_percent']}%\n"
+        text += f"Пропущено: {sla['missed_percent']}%\n"
+        return text
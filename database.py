@@ -1,220 +1,738 @@
-import aiosqlite
-import os
 from datetime import datetime
+from typing import Optional
 
-DB_PATH = 'support_bot.db'
+from config import (
+    PRIORITY_LEVELS, DEFAULT_PRIORITY, SLA_TIMEOUTS, ESCALATION_STEPS, USER_CACHE_SIZE,
+    USER_CACHE_NEGATIVE_TTL, TICKET_BATCH_WINDOW_MS, TICKET_BATCH_MAX_SIZE
+)
+from cache import LRUCache
+from repository import create_repository
+from write_batcher import WriteBatcher
+from ticket_queue import ticket_queue
+from events import ticket_events
+from deadlines import escalation_timer
+from business_hours import business_calendar
+from timeutil import utc_now, parse_timestamp
+
+# Хранилище выбирается настройкой DB_BACKEND (sqlite или postgres)
+repository = create_repository()
+
+CREATE_TICKET_QUERY = (
+    "INSERT INTO tickets (user_id, status, priority, message_data, sla_due_at, updated_at) "
+    f"VALUES (?, 'open', ?, ?, ?, {repository.now()}) RETURNING id"
+)
+
+# Каждое изменение тикета обновляет updated_at - по нему работает инкрементальный экспорт
+TOUCH_UPDATED_AT = f'updated_at = {repository.now()}'
+
+# Включенные шаги лестницы эскалации: (уровень - номер шага в ESCALATION_STEPS, минуты после SLA)
+ESCALATION_LEVELS = [
+    (level, minutes) for level, (_, minutes) in enumerate(ESCALATION_STEPS, 1) if minutes >= 0
+]
+
+
+# Групповая фиксация создания тикетов при всплесках (None - каждый тикет своей транзакцией)
+ticket_batcher = WriteBatcher(
+    repository, CREATE_TICKET_QUERY, TICKET_BATCH_WINDOW_MS / 1000, TICKET_BATCH_MAX_SIZE
+) if TICKET_BATCH_WINDOW_MS > 0 else None
+
+# Кэш записей пользователей: user_id -> строка таблицы users (или None)
+user_cache = LRUCache(USER_CACHE_SIZE, negative_ttl=USER_CACHE_NEGATIVE_TTL)
+
+# Кэш записей администраторов: admin_id -> строка таблицы admins (или None).
+# Проверка прав идет на каждый апдейт (антифлуд, обработчики)
+admin_cache = LRUCache(USER_CACHE_SIZE, negative_ttl=USER_CACHE_NEGATIVE_TTL)
+
+def priority_order_clause(column: str = 't.priority') -> str:
+    """SQL-выражение ранга приоритета для ORDER BY"""
+    # Значения берутся из настроек, а не из пользовательского ввода
+    cases = ' '.join(
+        f"WHEN '{priority}' THEN {rank}" for rank, priority in enumerate(PRIORITY_LEVELS)
+    )
+    return f'CASE {column} {cases} ELSE {len(PRIORITY_LEVELS)} END'
+
+def sla_minutes(priority: str) -> int:
+    """Таймаут SLA приоритета в минутах"""
+    timeout = SLA_TIMEOUTS.get(priority, SLA_TIMEOUTS[DEFAULT_PRIORITY])
+    return int(timeout.total_seconds() // 60)
+
+def sla_deadline(created_at: datetime, priority: str) -> datetime:
+    """Дедлайн первого ответа: таймаут SLA приоритета в рабочем времени поддержки"""
+    # Целые секунды, как у datetime('now'): в SQLite время сравнивается как текст,
+    # и дедлайн с долями секунды наступал бы для запроса на секунду позже таймера
+    return business_calendar.add(created_at, sla_minutes(priority)).replace(microsecond=0)
+
+def escalation_due_after(level: int, moment: datetime) -> Optional[datetime]:
+    """
+    Дедлайн включенного шага лестницы после уровня level: для level 0 moment - дедлайн
+    SLA, иначе - время выполнения шага level. Задержки считаются в рабочем времени
+    """
+    following = [minutes for next_level, minutes in ESCALATION_LEVELS if next_level > level]
+    if not following:
+        return None
+    current = dict(ESCALATION_LEVELS).get(level, 0)
+    return business_calendar.add(moment, max(following[0] - current, 0)).replace(microsecond=0)
+
+def escalation_advance_clause() -> str:
+    """
+    SET-фрагмент перехода к следующему включенному шагу: escalation_level - выполняемый
+    шаг, escalation_due_at - время следующего по часам (отсчитывается от текущего момента,
+    чтобы после простоя шаги не выполнялись все сразу; в рабочем времени уточняется после)
+    """
+    level_cases, due_cases = [], []
+    for current in range(len(ESCALATION_STEPS) + 1):
+        following = [(level, minutes) for level, minutes in ESCALATION_LEVELS if level > current]
+        if not following:
+            continue
+        level_cases.append(f'WHEN {current} THEN {following[0][0]}')
+        if len(following) > 1:
+            delay = max(following[1][1] - following[0][1], 0)
+            due_cases.append(f'WHEN {current} THEN {repository.add_minutes(repository.now(), str(delay))}')
+    due = f"CASE escalation_level {' '.join(due_cases)} END" if due_cases else 'NULL'
+    return (
+        f"escalation_level = CASE escalation_level {' '.join(level_cases)} ELSE escalation_level END, "
+        f'escalation_due_at = {due}'
+    )
 
 async def init_db():
-    """Инициализация базы данных и создание таблиц"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        # Создание таблицы пользователей
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER UNIQUE,
-                username TEXT,
-                full_name TEXT,
-                phone TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Создание таблицы тикетов
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS tickets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                status TEXT CHECK(status IN ('open', 'in_progress', 'closed')),
-                assigned_admin_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                closed_at TIMESTAMP,
-                priority TEXT DEFAULT 'normal',
-                first_response_time TIMESTAMP,
-                missed_flag BOOLEAN DEFAULT 0,
-                message_data TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
-            )
-        ''')
-
-        # Создание таблицы администраторов
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS admins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                admin_id INTEGER UNIQUE,
-                username TEXT,
-                role TEXT CHECK(role IN ('admin', 'CEO')),
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # Создание таблицы логов
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                action TEXT,
-                ticket_id INTEGER,
-                admin_id INTEGER,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (ticket_id) REFERENCES tickets(id),
-                FOREIGN KEY (admin_id) REFERENCES admins(admin_id)
-            )
-        ''')
+    """Инициализация базы данных и применение миграций схемы"""
+    await repository.connect()
+    await repository.migrate()
 
-        await db.commit()
+async def close_db():
+    """Дозапись отложенных вставок и закрытие подключений к базе данных"""
+    if ticket_batcher:
+        await ticket_batcher.close()
+    await repository.close()
 
 # Функции для работы с пользователями
 async def add_user(user_id: int, username: str, full_name: str, phone: str) -> bool:
     """Добавление нового пользователя"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                'INSERT INTO users (user_id, username, full_name, phone) VALUES (?, ?, ?, ?)',
-                (user_id, username, full_name, phone)
-            )
-            await db.commit()
-            return True
+        user = await repository.fetchone(
+            'INSERT INTO users (user_id, username, full_name, phone) VALUES (?, ?, ?, ?) RETURNING *',
+            (user_id, username, full_name, phone)
+        )
+        user_cache.set(user_id, user)
+        return True
     except Exception as e:
         print(f"Error adding user: {e}")
         return False
 
 async def get_user(user_id: int):
     """Получение информации о пользователе"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute(
-            'SELECT * FROM users WHERE user_id = ?',
-            (user_id,)
-        ) as cursor:
-            return await cursor.fetchone()
+    found, user = user_cache.get(user_id)
+    if found:
+        return user
+
+    user = await repository.fetchone(
+        'SELECT * FROM users WHERE user_id = ?',
+        (user_id,)
+    )
+    user_cache.set(user_id, user)
+    return user
 
 # Функции для работы с тикетами
-async def create_ticket(user_id: int, priority: str = 'normal', message_data: str = None) -> int:
+async def create_ticket(user_id: int, priority: str = DEFAULT_PRIORITY, message_data: str = None) -> int:
     """Создание нового тикета"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            'INSERT INTO tickets (user_id, status, priority, message_data) VALUES (?, "open", ?, ?)',
-            (user_id, priority, message_data)
-        )
-        await db.commit()
-        return cursor.lastrowid
+    created_at = utc_now()
+    params = (user_id, priority, message_data, sla_deadline(created_at, priority))
+    if ticket_batcher:
+        ticket_id = await ticket_batcher.submit(params)
+    else:
+        ticket_id = await repository.fetchval(CREATE_TICKET_QUERY, params)
+    ticket_queue.push(ticket_id, priority)
+    ticket_events.record('created')
+    return ticket_id
+
+async def get_active_ticket(user_id: int):
+    """Получение последнего незакрытого тикета пользователя"""
+    return await repository.fetchone(
+        '''
+        SELECT * FROM tickets
+        WHERE user_id = ? AND status IN ('open', 'in_progress')
+        ORDER BY id DESC
+        LIMIT 1
+        ''',
+        (user_id,)
+    )
+
+async def append_ticket_message(ticket_id: int, message_data: str):
+    """Добавление сообщения к тикету (message_data становится JSON-массивом)"""
+    await repository.execute(
+        f'''
+        UPDATE tickets SET message_data = {repository.json_append('message_data')}, {TOUCH_UPDATED_AT}
+        WHERE id = ?
+        ''',
+        (message_data, ticket_id)
+    )
 
 async def get_ticket(ticket_id: int):
     """Получение информации о тикете"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute(
-            'SELECT * FROM tickets WHERE id = ?',
-            (ticket_id,)
-        ) as cursor:
-            return await cursor.fetchone()
+    return await repository.fetchone(
+        'SELECT * FROM tickets WHERE id = ?',
+        (ticket_id,)
+    )
 
 async def update_ticket_status(ticket_id: int, status: str, admin_id: int = None):
     """Обновление статуса тикета"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        if status == 'closed':
-            await db.execute(
-                'UPDATE tickets SET status = ?, closed_at = ? WHERE id = ?',
-                (status, datetime.now(), ticket_id)
-            )
-        else:
-            await db.execute(
-                'UPDATE tickets SET status = ?, assigned_admin_id = ? WHERE id = ?',
-                (status, admin_id, ticket_id)
-            )
-        await db.commit()
+    if status == 'closed':
+        row = await repository.fetchone(
+            f'''
+            UPDATE tickets SET
+                status = ?, closed_at = {repository.now()}, escalation_due_at = NULL, {TOUCH_UPDATED_AT}
+            WHERE id = ? RETURNING priority
+            ''',
+            (status, ticket_id)
+        )
+    else:
+        row = await repository.fetchone(
+            f'''
+            UPDATE tickets SET
+                status = ?, assigned_admin_id = ?, escalation_level = 0, escalation_due_at = NULL,
+                {TOUCH_UPDATED_AT}
+            WHERE id = ? RETURNING priority, id, created_at, sla_due_at, first_response_time
+            ''',
+            (status, admin_id, ticket_id)
+        )
+        # Взятый в работу тикет эскалируется по SLA от создания, вернувшийся в очередь - нет
+        if row and status == 'in_progress' and row['first_response_time'] is None:
+            await start_escalations([row])
+
+    # Синхронизируем очередь: в ней находятся только открытые тикеты
+    if status == 'open':
+        if row:
+            ticket_queue.push(ticket_id, row[0])
+    else:
+        ticket_queue.remove(ticket_id)
+    ticket_events.record('taken' if status == 'in_progress' else status)
+
+async def mark_first_response(ticket_id: int):
+    """Отметка первого ответа администратора (останавливает эскалацию)"""
+    await repository.execute(
+        f'''
+        UPDATE tickets SET first_response_time = {repository.now()}, escalation_due_at = NULL, {TOUCH_UPDATED_AT}
+        WHERE id = ? AND first_response_time IS NULL
+        ''',
+        (ticket_id,)
+    )
 
 # Функции для работы с администраторами
 async def add_admin(admin_id: int, username: str, role: str = 'admin') -> bool:
     """Добавление нового администратора"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                'INSERT INTO admins (admin_id, username, role) VALUES (?, ?, ?)',
-                (admin_id, username, role)
-            )
-            await db.commit()
-            return True
+        await repository.execute(
+            'INSERT INTO admins (admin_id, username, role) VALUES (?, ?, ?)',
+            (admin_id, username, role)
+        )
+        admin_cache.invalidate(admin_id)
+        return True
     except Exception as e:
         print(f"Error adding admin: {e}")
         return False
 
 async def is_admin(user_id: int) -> bool:
     """Проверка, является ли пользователь администратором"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute(
+    found, admin = admin_cache.get(user_id)
+    if not found:
+        admin = await repository.fetchone(
             'SELECT * FROM admins WHERE admin_id = ?',
             (user_id,)
-        ) as cursor:
-            return bool(await cursor.fetchone())
+        )
+        admin_cache.set(user_id, admin)
+    return bool(admin)
 
 async def is_ceo(user_id: int) -> bool:
     """Проверка, является ли пользователь CEO"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute(
-            'SELECT * FROM admins WHERE admin_id = ? AND role = "CEO"',
-            (user_id,)
-        ) as cursor:
-            return bool(await cursor.fetchone())
+    return bool(await repository.fetchone(
+        "SELECT * FROM admins WHERE admin_id = ? AND role = 'CEO'",
+        (user_id,)
+    ))
 
 async def get_all_admins():
     """Получение списка всех администраторов"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute('SELECT * FROM admins') as cursor:
-            return await cursor.fetchall()
+    return await repository.fetchall('SELECT * FROM admins')
+
+async def get_admin_shifts():
+    """Графики дежурств администраторов"""
+    return await repository.fetchall('''
+        SELECT a.admin_id, a.username, s.schedule
+        FROM admins a
+        LEFT JOIN admin_shifts s ON s.admin_id = a.admin_id
+        ORDER BY a.admin_id
+    ''')
+
+async def set_admin_shift(admin_id: int, schedule: str):
+    """Сохранение графика дежурств администратора"""
+    await repository.execute(
+        f'''
+        INSERT INTO admin_shifts (admin_id, schedule, updated_at) VALUES (?, ?, {repository.now()})
+        ON CONFLICT (admin_id) DO UPDATE SET schedule = excluded.schedule, updated_at = excluded.updated_at
+        ''',
+        (admin_id, schedule)
+    )
+
+async def delete_admin_shift(admin_id: int):
+    """Удаление графика: администратор дежурит в рабочее время поддержки"""
+    await repository.execute('DELETE FROM admin_shifts WHERE admin_id = ?', (admin_id,))
 
 async def get_admin_tickets(admin_id: int):
     """Получение тикетов администратора"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        query = '''
-            SELECT 
-                t.*,
-                u.full_name as user_name
-            FROM tickets t
-            JOIN users u ON t.user_id = u.user_id
-            WHERE t.assigned_admin_id = ? AND t.status != 'closed'
-            ORDER BY t.created_at DESC
-        '''
-        async with db.execute(query, (admin_id,)) as cursor:
-            return await cursor.fetchall()
+    query = '''
+        SELECT
+            t.*,
+            u.full_name as user_name
+        FROM tickets t
+        JOIN users u ON t.user_id = u.user_id
+        WHERE t.assigned_admin_id = ? AND t.status != 'closed'
+        ORDER BY t.created_at DESC
+    '''
+    return await repository.fetchall(query, (admin_id,))
 
 async def get_open_tickets():
     """Получение открытых тикетов"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        query = '''
-            SELECT 
-                t.*,
-                u.full_name as user_name
-            FROM tickets t
-            JOIN users u ON t.user_id = u.user_id
-            WHERE t.status = 'open'
-            ORDER BY t.created_at DESC
-        '''
-        async with db.execute(query) as cursor:
-            return await cursor.fetchall()
+    query = f'''
+        SELECT
+            t.*,
+            u.full_name as user_name
+        FROM tickets t
+        JOIN users u ON t.user_id = u.user_id
+        WHERE t.status = 'open'
+        ORDER BY {priority_order_clause()}, t.created_at, t.id
+    '''
+    return await repository.fetchall(query)
+
+async def load_ticket_queue():
+    """Загрузка открытых тикетов из БД в очередь в памяти"""
+    ticket_queue.rebuild(await repository.fetchall(
+        "SELECT id, priority FROM tickets WHERE status = 'open'"
+    ))
+
+async def get_next_ticket():
+    """Получение следующего тикета из очереди (приоритет, затем возраст)"""
+    ticket_id = ticket_queue.peek()
+    if ticket_id is None:
+        return None
+    query = '''
+        SELECT
+            t.*,
+            u.full_name as user_name
+        FROM tickets t
+        LEFT JOIN users u ON t.user_id = u.user_id
+        WHERE t.id = ? AND t.status = 'open'
+    '''
+    ticket = await repository.fetchone(query, (ticket_id,))
+    if ticket is None:
+        # Тикет изменен в обход очереди - убираем его и берем следующий
+        ticket_queue.remove(ticket_id)
+        return await get_next_ticket()
+    return ticket
 
 async def get_closed_tickets():
     """Получение закрытых тикетов"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        query = '''
-            SELECT 
-                t.*,
-                u.full_name as user_name
-            FROM tickets t
-            JOIN users u ON t.user_id = u.user_id
-            WHERE t.status = 'closed'
-            ORDER BY t.closed_at DESC
-            LIMIT 50
-        '''
-        async with db.execute(query) as cursor:
-            return await cursor.fetchall()
+    query = '''
+        SELECT
+            t.*,
+            u.full_name as user_name
+        FROM tickets t
+        JOIN users u ON t.user_id = u.user_id
+        WHERE t.status = 'closed'
+        ORDER BY t.closed_at DESC
+        LIMIT 50
+    '''
+    return await repository.fetchall(query)
+
+# Массовые операции с тикетами (одна транзакция на операцию)
+async def close_tickets_older_than(days: int):
+    """Закрытие всех незакрытых тикетов старше N дней"""
+    tickets = await repository.fetchall(
+        f'''
+        UPDATE tickets SET
+            status = 'closed', closed_at = {repository.now()}, escalation_due_at = NULL, {TOUCH_UPDATED_AT}
+        WHERE status != 'closed' AND created_at <= {repository.days_ago()}
+        RETURNING id, user_id
+        ''',
+        (days,)
+    )
+    for ticket in tickets:
+        ticket_queue.remove(ticket['id'])
+    ticket_events.record('closed', len(tickets))
+    return tickets
+
+async def reassign_admin_tickets(from_admin_id: int, to_admin_id: int):
+    """Передача всех тикетов в работе от одного администратора другому"""
+    tickets = await repository.fetchall(
+        f'''
+        UPDATE tickets SET
+            assigned_admin_id = ?, escalation_level = 0, escalation_due_at = NULL, {TOUCH_UPDATED_AT}
+        WHERE assigned_admin_id = ? AND status = 'in_progress'
+        RETURNING id, user_id, priority, first_response_time
+        ''',
+        (to_admin_id, from_admin_id)
+    )
+    await start_escalations(
+        [ticket for ticket in tickets if ticket['first_response_time'] is None], restart=True
+    )
+    ticket_events.record('reassigned', len(tickets))
+    return tickets
+
+async def claim_next_tickets(admin_id: int, count: int):
+    """Взятие в работу следующих N тикетов из очереди (приоритет, затем возраст)"""
+    tickets = await repository.fetchall(
+        f'''
+        UPDATE tickets SET
+            status = 'in_progress', assigned_admin_id = ?, escalation_level = 0, escalation_due_at = NULL,
+            {TOUCH_UPDATED_AT}
+        WHERE id IN (
+            SELECT id FROM tickets
+            WHERE status = 'open'
+            ORDER BY {priority_order_clause('priority')}, created_at, id
+            LIMIT ?
+        )
+        RETURNING id, user_id, priority, created_at, sla_due_at, first_response_time
+        ''',
+        (admin_id, count)
+    )
+    for ticket in tickets:
+        ticket_queue.remove(ticket['id'])
+    await start_escalations([ticket for ticket in tickets if ticket['first_response_time'] is None])
+    ticket_events.record('taken', len(tickets))
+    return sorted(tickets, key=lambda ticket: ticket['id'])
 
 async def update_ticket_priority(ticket_id: int, priority: str):
     """Обновление приоритета тикета"""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            'UPDATE tickets SET priority = ? WHERE id = ?',
-            (priority, ticket_id)
+    row = await repository.fetchone(
+        f'''
+        UPDATE tickets SET priority = ?, {TOUCH_UPDATED_AT}
+        WHERE id = ? RETURNING id, created_at, escalation_level, escalation_due_at
+        ''',
+        (priority, ticket_id)
+    )
+    if row:
+        # Дедлайн SLA зависит от приоритета; начатая лестница идет по своему графику
+        sla_due_at = sla_deadline(parse_timestamp(row['created_at']), priority)
+        await repository.execute('UPDATE tickets SET sla_due_at = ? WHERE id = ?', (sla_due_at, ticket_id))
+        if row['escalation_level'] == 0 and row['escalation_due_at'] is not None:
+            await start_escalations([{'id': ticket_id, 'priority': priority, 'sla_due_at': sla_due_at}])
+    ticket_queue.update_priority(ticket_id, priority)
+    ticket_events.record('priority')
+
+# Функции эскалации тикетов без ответа
+async def schedule_escalations(updates: list):
+    """Сохранение дедлайнов эскалации [(дедлайн, id тикета, уровень)] и планирование ожидания"""
+    if not updates:
+        return
+    # Уровень в условии: шаг, выполненный параллельно, не перезаписывается
+    await repository.executemany(
+        'UPDATE tickets SET escalation_due_at = ? WHERE id = ? AND escalation_level = ?',
+        updates
+    )
+    for due, _, _ in updates:
+        escalation_timer.schedule(due)
+
+async def start_escalations(tickets: list, restart: bool = False):
+    """
+    Лестница с начала для тикетов в работе без ответа (id, priority, sla_due_at или
+    created_at); restart - отсчет SLA заново от текущего момента (передача другому админу)
+    """
+    now = utc_now()
+    updates = []
+    for ticket in tickets:
+        if restart:
+            sla_due_at = sla_deadline(now, ticket['priority'])
+        else:
+            sla_due_at = parse_timestamp(ticket['sla_due_at']) or sla_deadline(
+                parse_timestamp(ticket['created_at']), ticket['priority']
+            )
+        due = escalation_due_after(0, sla_due_at)
+        if due:
+            updates.append((due, ticket['id'], 0))
+    await schedule_escalations(updates)
+
+async def start_pending_escalations():
+    """
+    Постановка в лестницу тикетов в работе без дедлайна эскалации (взятых до ее
+    появления). Тикеты, уже отмеченные пропущенными, прежней проверкой эскалированы
+    """
+    await start_escalations(await repository.fetchall('''
+        SELECT id, priority, created_at, sla_due_at FROM tickets
+        WHERE
+            status = 'in_progress'
+            AND first_response_time IS NULL
+            AND missed_flag = 0
+            AND escalation_due_at IS NULL
+    '''))
+
+async def get_next_escalation_due():
+    """Ближайший дедлайн эскалации (по индексу) или None"""
+    return await repository.fetchval('SELECT MIN(escalation_due_at) FROM tickets')
+
+async def advance_escalations():
+    """
+    Выполнение наступивших шагов эскалации одним UPDATE ... RETURNING. Шаг фиксируется
+    до отправки уведомлений, поэтому после перезапуска не повторяется; невыполненные
+    к моменту остановки шаги остаются в БД с прошедшим дедлайном и выполняются после запуска
+    """
+    # Момент с долями секунды параметром: дедлайн, записанный с долями секунды
+    # раньше, наступает для запроса тогда же, когда и для таймера
+    now = utc_now()
+    # Тикеты, закрытые или получившие ответ в обход функций выше, из ожидания убираются
+    await repository.execute('''
+        UPDATE tickets SET escalation_due_at = NULL
+        WHERE
+            escalation_due_at <= ?
+            AND (status != 'in_progress' OR first_response_time IS NOT NULL)
+    ''', (now,))
+    if not ESCALATION_LEVELS:
+        return []
+    tickets = await repository.fetchall(f'''
+        UPDATE tickets SET {escalation_advance_clause()}, missed_flag = 1, {TOUCH_UPDATED_AT}
+        WHERE escalation_due_at <= ?
+        RETURNING
+            id, priority, assigned_admin_id, escalation_level, escalation_due_at,
+            (SELECT username FROM admins WHERE admin_id = assigned_admin_id) as admin_username
+    ''', (now,))
+    # Следующий шаг - в рабочем времени от текущего момента
+    await schedule_escalations([
+        (escalation_due_after(ticket['escalation_level'], now), ticket['id'], ticket['escalation_level'])
+        for ticket in tickets if ticket['escalation_due_at'] is not None
+    ])
+    return tickets
+
+async def get_admin_workloads():
+    """Число тикетов в работе и график дежурств каждого администратора"""
+    return await repository.fetchall('''
+        SELECT a.admin_id, a.username, s.schedule, COUNT(t.id) as tickets
+        FROM admins a
+        LEFT JOIN admin_shifts s ON s.admin_id = a.admin_id
+        LEFT JOIN tickets t ON t.assigned_admin_id = a.admin_id AND t.status = 'in_progress'
+        GROUP BY a.admin_id, a.username, s.schedule
+    ''')
+
+async def reassign_escalated_ticket(ticket_id: int, from_admin_id: int, to_admin_id: int) -> bool:
+    """Передача тикета без ответа другому админу; для него лестница начинается заново"""
+    row = await repository.fetchone(
+        f'''
+        UPDATE tickets SET
+            assigned_admin_id = ?, escalation_level = 0, escalation_due_at = NULL, {TOUCH_UPDATED_AT}
+        WHERE id = ? AND assigned_admin_id = ? AND status = 'in_progress' AND first_response_time IS NULL
+        RETURNING id, priority
+        ''',
+        (to_admin_id, ticket_id, from_admin_id)
+    )
+    if not row:
+        return False
+    await start_escalations([row], restart=True)
+    ticket_events.record('reassigned')
+    return True
+
+async def get_live_counters() -> dict:
+    """Текущие счетчики тикетов для живой панели (один проход по таблице)"""
+    row = await repository.fetchone(f'''
+        SELECT
+            SUM(CASE WHEN status = 'open' THEN 1 ELSE 0 END) as open,
+            SUM(CASE WHEN status = 'in_progress' THEN 1 ELSE 0 END) as in_progress,
+            SUM(CASE WHEN status != 'closed' AND missed_flag = 1 THEN 1 ELSE 0 END) as missed,
+            SUM(CASE WHEN created_at > {repository.days_ago()} THEN 1 ELSE 0 END) as created_day
+        FROM tickets
+    ''', (1,))
+    return {key: row[key] or 0 for key in row.keys()}
+
+# Почасовые агрегаты для графиков
+async def refresh_hourly_rollups():
+    """
+    Пересчет почасовых агрегатов начиная с последнего (возможно неполного) часа.
+    Первый вызов заполняет таблицу по всей истории тикетов.
+    """
+    last_bucket = await repository.fetchval('SELECT MAX(bucket) FROM ticket_stats_hourly')
+    since = last_bucket if last_bucket is not None else datetime(1, 1, 1)
+    await repository.execute_batch([
+        ('DELETE FROM ticket_stats_hourly WHERE bucket >= ?', (since,)),
+        (f'''
+        INSERT INTO ticket_stats_hourly (bucket, admin_id, created, closed)
+        SELECT bucket, admin_id, SUM(created), SUM(closed)
+        FROM (
+            SELECT {repository.hour_bucket('created_at')} as bucket, 0 as admin_id, 1 as created, 0 as closed
+            FROM tickets
+            WHERE created_at >= ?
+            UNION ALL
+            SELECT {repository.hour_bucket('closed_at')}, COALESCE(assigned_admin_id, 0), 0, 1
+            FROM tickets
+            WHERE closed_at >= ?
+        ) as events
+        GROUP BY bucket, admin_id
+        ''', (since, since)),
+    ])
+
+async def get_hourly_rollups(since: datetime):
+    """Почасовые агрегаты начиная с момента since (UTC)"""
+    return await repository.fetchall(
+        '''
+        SELECT bucket, SUM(created) as created, SUM(closed) as closed
+        FROM ticket_stats_hourly
+        WHERE bucket >= ?
+        GROUP BY bucket
+        ORDER BY bucket
+        ''',
+        (since,)
+    )
+
+async def get_weekday_hour_totals(since: datetime):
+    """Созданные тикеты по дню недели и часу суток начиная с момента since (UTC)"""
+    return await repository.fetchall(
+        f'''
+        SELECT
+            {repository.weekday_of('bucket')} as weekday,
+            {repository.hour_of('bucket')} as hour,
+            SUM(created) as created
+        FROM ticket_stats_hourly
+        WHERE bucket >= ? AND created > 0
+        GROUP BY 1, 2
+        ''',
+        (since,)
+    )
+
+async def get_admin_closed_totals(since: datetime):
+    """Закрытые тикеты по администраторам начиная с момента since (UTC)"""
+    return await repository.fetchall(
+        '''
+        SELECT admin_id, SUM(closed) as closed
+        FROM ticket_stats_hourly
+        WHERE bucket >= ? AND admin_id != 0
+        GROUP BY admin_id
+        ORDER BY closed
+        ''',
+        (since,)
+    )
+
+# Функции для инкрементального экспорта
+async def get_export_watermark(recipient_id: int):
+    """Позиция (updated_at, ticket_id), до которой получатель уже выгрузил тикеты"""
+    return await repository.fetchone(
+        'SELECT updated_at, ticket_id FROM export_watermarks WHERE recipient_id = ?',
+        (recipient_id,)
+    )
+
+async def save_export_watermark(recipient_id: int, updated_at, ticket_id: int):
+    """Сохранение позиции экспорта после доставки файла"""
+    await repository.execute(
+        f'''
+        INSERT INTO export_watermarks (recipient_id, updated_at, ticket_id) VALUES (?, ?, ?)
+        ON CONFLICT (recipient_id) DO UPDATE SET
+            updated_at = excluded.updated_at,
+            ticket_id = excluded.ticket_id,
+            exported_at = {repository.now()}
+        ''',
+        (recipient_id, updated_at, ticket_id)
+    )
+
+async def delete_export_watermark(recipient_id: int):
+    """Сброс позиции: следующий экспорт получателя будет полным"""
+    await repository.execute(
+        'DELETE FROM export_watermarks WHERE recipient_id = ?',
+        (recipient_id,)
+    )
+
+# Колонки тикета для выгрузок
+EXPORT_SELECT = '''
+    SELECT
+        t.id, t.user_id, u.full_name, t.status, t.priority,
+        t.assigned_admin_id, a.username as admin_username,
+        t.created_at, t.first_response_time, t.closed_at, t.updated_at, t.missed_flag
+    FROM tickets t
+    LEFT JOIN users u ON t.user_id = u.user_id
+    LEFT JOIN admins a ON t.assigned_admin_id = a.admin_id
+'''
+
+async def get_changed_tickets(after_updated_at, after_id: int, until: datetime, limit: int):
+    """Страница тикетов, измененных после позиции (updated_at, id) и не позже until"""
+    return await repository.fetchall(
+        EXPORT_SELECT + '''
+        WHERE (t.updated_at, t.id) > (?, ?) AND t.updated_at <= ?
+        ORDER BY t.updated_at, t.id
+        LIMIT ?
+        ''',
+        (after_updated_at, after_id, until, limit)
+    )
+
+async def get_tickets_created_since(since: datetime, after_id: int, limit: int):
+    """Страница тикетов, созданных после since, с id больше after_id"""
+    return await repository.fetchall(
+        EXPORT_SELECT + '''
+        WHERE t.created_at > ? AND t.id > ?
+        ORDER BY t.id
+        LIMIT ?
+        ''',
+        (since, after_id, limit)
+    )
+
+# Функции для работы с реестром загруженных файлов
+async def get_media_file_id(content_hash: str):
+    """file_id Telegram для ранее загруженного содержимого"""
+    return await repository.fetchval(
+        'SELECT file_id FROM media_registry WHERE content_hash = ?',
+        (content_hash,)
+    )
+
+async def save_media_file_id(content_hash: str, file_id: str, media_type: str):
+    """Сохранение file_id загруженного содержимого"""
+    await repository.execute(
+        '''
+        INSERT INTO media_registry (content_hash, file_id, media_type) VALUES (?, ?, ?)
+        ON CONFLICT (content_hash) DO UPDATE SET file_id = excluded.file_id
+        ''',
+        (content_hash, file_id, media_type)
+    )
+
+async def delete_media_file_id(content_hash: str):
+    """Удаление недействительного file_id"""
+    await repository.execute(
+        'DELETE FROM media_registry WHERE content_hash = ?',
+        (content_hash,)
+    )
+
+# Функции для работы с шаблонами ответов
+async def get_macros():
+    """Все шаблоны ответов"""
+    return await repository.fetchall('SELECT id, title, text, usage_count FROM macros ORDER BY id')
+
+async def add_macro(title: str, text: str, created_by: int) -> Optional[int]:
+    """Добавление шаблона. Возвращает id (None - название уже занято)"""
+    try:
+        return await repository.fetchval(
+            'INSERT INTO macros (title, text, created_by) VALUES (?, ?, ?) RETURNING id',
+            (title, text, created_by)
         )
-        await db.commit()
+    except Exception as e:
+        print(f"Error adding macro: {e}")
+        return None
+
+async def delete_macro(macro_id: int) -> bool:
+    """Удаление шаблона"""
+    return await repository.execute('DELETE FROM macros WHERE id = ?', (macro_id,)) > 0
+
+async def add_macro_usage(counts: dict):
+    """Прибавление накопленных счетчиков использования {id шаблона: сколько раз}"""
+    await repository.executemany(
+        f'UPDATE macros SET usage_count = usage_count + ?, last_used_at = {repository.now()} WHERE id = ?',
+        [(count, macro_id) for macro_id, count in counts.items()]
+    )
+
+# Функции для работы с живыми панелями
+async def save_dashboard(chat_id: int, message_id: int):
+    """Сохранение сообщения живой панели для чата"""
+    await repository.execute(
+        '''
+        INSERT INTO dashboards (chat_id, message_id) VALUES (?, ?)
+        ON CONFLICT (chat_id) DO UPDATE SET message_id = excluded.message_id
+        ''',
+        (chat_id, message_id)
+    )
+
+async def delete_dashboard(chat_id: int):
+    """Удаление живой панели чата"""
+    await repository.execute('DELETE FROM dashboards WHERE chat_id = ?', (chat_id,))
+
+async def get_dashboards():
+    """Получение всех живых панелей"""
+    return await repository.fetchall('SELECT chat_id, message_id FROM dashboards')
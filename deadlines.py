@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from timeutil import utc_now, parse_timestamp
+
+class DeadlineTimer:
+    """
+    Ожидание ближайшего дедлайна без периодического опроса: задача спит до
+    самого раннего известного времени и просыпается раньше, если запланирован
+    более ранний. Пока дедлайнов нет, ожидание ничего не стоит.
+    """
+
+    def __init__(self):
+        self._next_due: Optional[datetime] = None
+        # Создается в цикле событий при первом ожидании
+        self._changed: Optional[asyncio.Event] = None
+
+    def schedule(self, due):
+        """Учет дедлайна: время UTC из БД (SQLite возвращает строку, Postgres - datetime)"""
+        due = parse_timestamp(due)
+        if due is None:
+            return
+        if self._next_due is None or due < self._next_due:
+            self._next_due = due
+            if self._changed:
+                self._changed.set()
+
+    async def wait(self):
+        """Ожидание наступления ближайшего дедлайна (после него дедлайн сбрасывается)"""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        while True:
+            self._changed.clear()
+            if self._next_due is None:
+                await self._changed.wait()
+                continue
+            delay = (self._next_due - utc_now()).total_seconds()
+            if delay <= 0:
+                self._next_due = None
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+# Дедлайны шагов эскалации; планируются функциями database.py при изменении тикетов
+escalation_timer = DeadlineTimer()
@@ -0,0 +1,155 @@
+import asyncio
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from business_hours import business_calendar, shift_calendar
+from config import ESCALATION_STEPS
+from database import (
+    ESCALATION_LEVELS, sla_minutes, start_pending_escalations, get_next_escalation_due,
+    advance_escalations, get_all_admins, get_admin_workloads, reassign_escalated_ticket
+)
+from deadlines import DeadlineTimer, escalation_timer
+from events import ticket_events
+from keyboards import get_ticket_reply_keyboard
+from lifecycle import lifecycle
+from timeutil import utc_now
+from notifications import NotificationManager
+
+# Заголовки уведомлений шагов лестницы
+STEP_TITLES = {
+    'assignee': 'Напоминание: тикеты без ответа',
+    'group': 'Эскалация: тикеты без ответа',
+    'ceo': 'Эскалация CEO: тикеты без ответа',
+    'reassign': 'Тикеты без ответа переданы другим админам',
+}
+
+# Через сколько повторить попытку, если БД недоступна (секунды)
+RETRY_SECONDS = 60
+
+class EscalationManager:
+    """
+    Лестница эскалации тикетов в работе без ответа: напоминание ответственному,
+    группа мониторинга, CEO, передача другому админу. Дедлайны шагов хранятся
+    в БД (tickets.escalation_due_at), задача ждет ближайший без опроса.
+    """
+
+    def __init__(self, notification_manager: NotificationManager, timer: DeadlineTimer = escalation_timer):
+        self.notification_manager = notification_manager
+        self.timer = timer
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Постановка в лестницу тикетов без дедлайна и запуск ожидания дедлайнов"""
+        await start_pending_escalations()
+        self.timer.schedule(await get_next_escalation_due())
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Остановка ожидания (начатая обработка дожидается через lifecycle)"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        process_due = lifecycle.job(self.process_due)
+        while True:
+            await self.timer.wait()
+            await process_due()
+
+    async def process_due(self):
+        """Выполнение наступивших шагов и планирование следующего дедлайна"""
+        try:
+            tickets = await advance_escalations()
+        except Exception as e:
+            print(f"Error advancing escalations: {e}")
+            self._retry_later()
+            return
+
+        if tickets:
+            try:
+                await self._notify(tickets)
+            except Exception as e:
+                print(f"Error sending escalations: {e}")
+
+        try:
+            self.timer.schedule(await get_next_escalation_due())
+        except Exception as e:
+            print(f"Error loading next escalation: {e}")
+            self._retry_later()
+
+    def _retry_later(self):
+        self.timer.schedule(
+            utc_now() + timedelta(seconds=RETRY_SECONDS)
+        )
+
+    async def _notify(self, tickets: list):
+        """Одно уведомление на получателя для каждого шага"""
+        by_step: Dict[str, List[dict]] = defaultdict(list)
+        for ticket in sorted(tickets, key=lambda ticket: ticket['id']):
+            step, delay = ESCALATION_STEPS[ticket['escalation_level'] - 1]
+            by_step[step].append({
+                'id': ticket['id'],
+                'admin_id': ticket['assigned_admin_id'],
+                'admin_username': ticket['admin_username'],
+                'minutes': sla_minutes(ticket['priority']) + delay
+            })
+
+        # Первый выполненный шаг означает нарушение SLA
+        first_step = ESCALATION_STEPS[ESCALATION_LEVELS[0][0] - 1][0]
+        ticket_events.record('missed', len(by_step.get(first_step, ())))
+
+        if by_step.get('assignee'):
+            by_admin: Dict[int, List[dict]] = defaultdict(list)
+            for ticket in by_step['assignee']:
+                by_admin[ticket['admin_id']].append(ticket)
+            for admin_id, admin_tickets in by_admin.items():
+                await self.notification_manager.notify_escalation(
+                    STEP_TITLES['assignee'], admin_tickets, admin_ids=[admin_id]
+                )
+
+        if by_step.get('group'):
+            await self.notification_manager.notify_escalation(
+                STEP_TITLES['group'], by_step['group'], to_group=True
+            )
+
+        if by_step.get('ceo'):
+            ceo_ids = [admin['admin_id'] for admin in await get_all_admins() if admin['role'] == 'CEO']
+            await self.notification_manager.notify_escalation(
+                STEP_TITLES['ceo'], by_step['ceo'], admin_ids=ceo_ids
+            )
+
+        if by_step.get('reassign'):
+            await self._reassign(by_step['reassign'])
+
+    async def _reassign(self, tickets: List[dict]):
+        """Передача тикетов наименее загруженным админам на дежурстве"""
+        now = utc_now()
+        # admin_id -> [тикетов в работе, username]; без графика - дежурит в рабочее время поддержки
+        workloads = {
+            row['admin_id']: [row['tickets'], row['username']]
+            for row in await get_admin_workloads()
+            if (shift_calendar(row['schedule']) if row['schedule'] else business_calendar).is_open(now)
+        }
+        moved = []
+        for ticket in tickets:
+            candidates = [admin_id for admin_id in workloads if admin_id != ticket['admin_id']]
+            if not candidates:
+                continue
+            to_admin_id = min(candidates, key=lambda admin_id: (workloads[admin_id][0], admin_id))
+            if not await reassign_escalated_ticket(ticket['id'], ticket['admin_id'], to_admin_id):
+                continue
+
+            workloads[to_admin_id][0] += 1
+            if ticket['admin_id'] in workloads:
+                workloads[ticket['admin_id']][0] -= 1
+            moved.append(ticket)
+            await self.notification_manager.notify_admins(
+                [to_admin_id],
+                f"Вам передан тикет #{ticket['id']} без ответа {ticket['minutes']} мин. "
+                f"(был у @{ticket['admin_username']})",
+                get_ticket_reply_keyboard(ticket['id'])
+            )
+
+        await self.notification_manager.notify_escalation(STEP_TITLES['reassign'], moved, to_group=True)
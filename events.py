@@ -0,0 +1,18 @@
+from collections import Counter
+
+class TicketEventCounters:
+    """Счетчики событий по тикетам в памяти; version растет при каждом событии"""
+
+    def __init__(self):
+        self.version = 0
+        self.counts = Counter()
+
+    def record(self, event: str, count: int = 1):
+        """Учет события (created, taken, closed, missed, ...)"""
+        if count <= 0:
+            return
+        self.counts[event] += count
+        self.version += 1
+
+# Общие счетчики, обновляются функциями из database.py и escalations.py
+ticket_events = TicketEventCounters()
@@ -0,0 +1,276 @@
+"""
+Потоковый экспорт тикетов для выгрузки в BI.
+
+Тикеты читаются страницами и сразу пишутся в файл: CSV, XLSX, JSON Lines со
+сжатием gzip или Parquet (типизированные колонки времени, словарное кодирование
+статуса, приоритета и администратора).
+
+Инкрементальный экспорт хранит для каждого получателя позицию (updated_at, id)
+последнего выгруженного тикета; следующий экспорт содержит только тикеты,
+созданные или измененные после нее (страницы по индексу (updated_at, id)).
+"""
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from config import EXPORT_PAGE_SIZE, EXPORT_TMP_DIR
+from database import (
+    get_export_watermark, save_export_watermark, get_changed_tickets, get_tickets_created_since
+)
+from analytics import remove_export
+from timeutil import utc_now, parse_timestamp, period_start
+
+# Колонки выгрузки: стабильные имена для загрузки в BI
+FIELDS = [
+    'id', 'user_id', 'user_name', 'status', 'priority', 'admin_id', 'admin_username',
+    'created_at', 'first_response_at', 'closed_at', 'updated_at', 'missed',
+    'response_minutes', 'resolution_minutes',
+]
+
+# Изменения последних секунд не выгружаются: транзакция, начатая раньше,
+# может зафиксироваться позже и получить updated_at меньше уже выданной позиции
+SETTLE_SECONDS = 5
+
+def minutes_between(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    """Интервал в минутах (None, если события еще не было)"""
+    if start is None or end is None:
+        return None
+    return round((end - start).total_seconds() / 60, 1)
+
+def to_record(ticket) -> dict:
+    """Строка тикета в запись выгрузки (время - datetime)"""
+    created_at = parse_timestamp(ticket['created_at'])
+    first_response_at = parse_timestamp(ticket['first_response_time'])
+    closed_at = parse_timestamp(ticket['closed_at'])
+    updated_at = parse_timestamp(ticket['updated_at'])
+    return {
+        'id': ticket['id'],
+        'user_id': ticket['user_id'],
+        'user_name': ticket['full_name'],
+        'status': ticket['status'],
+        'priority': ticket['priority'],
+        'admin_id': ticket['assigned_admin_id'],
+        'admin_username': ticket['admin_username'],
+        'created_at': created_at,
+        'first_response_at': first_response_at,
+        'closed_at': closed_at,
+        'updated_at': updated_at,
+        'missed': bool(ticket['missed_flag']),
+        'response_minutes': minutes_between(created_at, first_response_at),
+        'resolution_minutes': minutes_between(created_at, closed_at),
+    }
+
+def to_text_record(record: dict) -> dict:
+    """Запись для текстовых форматов: время в ISO 8601"""
+    return {
+        field: value.isoformat() if isinstance(value, datetime) else value
+        for field, value in record.items()
+    }
+
+class CsvExportWriter:
+    """CSV в UTF-8 с BOM (чтобы Excel правильно открывал кириллицу)"""
+
+    extension = 'csv'
+
+    def __init__(self, filename: str):
+        self._file = open(filename, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        self._writer.writeheader()
+
+    def write(self, records: list):
+        self._writer.writerows(map(to_text_record, records))
+
+    def close(self):
+        self._file.close()
+
+class JsonlExportWriter:
+    """JSON Lines, сжатый gzip (без времени в заголовке - одинаковые данные дают одинаковые байты)"""
+
+    extension = 'jsonl.gz'
+
+    def __init__(self, filename: str):
+        self._raw = open(filename, 'wb')
+        self._gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self._raw, mtime=0)
+        self._file = io.TextIOWrapper(self._gzip, encoding='utf-8')
+
+    def write(self, records: list):
+        for record in map(to_text_record, records):
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self._file.close()
+        self._raw.close()
+
+class XlsxExportWriter:
+    """XLSX в режиме constant_memory: строки сбрасываются на диск по мере записи"""
+
+    extension = 'xlsx'
+
+    def __init__(self, filename: str):
+        import xlsxwriter
+        self._workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+        self._worksheet = self._workbook.add_worksheet('Изменения')
+        self._worksheet.write_row(0, 0, FIELDS, self._workbook.add_format({'bold': True}))
+        self._row = 1
+
+    def write(self, records: list):
+        for record in map(to_text_record, records):
+            self._worksheet.write_row(self._row, 0, [record[field] for field in FIELDS])
+            self._row += 1
+
+    def close(self):
+        self._workbook.close()
+
+class ParquetExportWriter:
+    """
+    Parquet через pyarrow: каждая страница - record batch с типизированной схемой,
+    статус, приоритет и администратор кодируются словарем
+    """
+
+    extension = 'parquet'
+    # Страницы копятся до полной группы строк: мелкие группы хуже сжимаются и медленнее читаются
+    row_group_size = 65536
+
+    def __init__(self, filename: str):
+        # pyarrow нужен только для этого формата - загружаем при первом использовании
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        labels = pa.dictionary(pa.int32(), pa.string())
+        timestamp = pa.timestamp('us')
+        self._schema = pa.schema([
+            ('id', pa.int64()),
+            ('user_id', pa.int64()),
+            ('user_name', pa.string()),
+            ('status', labels),
+            ('priority', labels),
+            ('admin_id', pa.int64()),
+            ('admin_username', labels),
+            ('created_at', timestamp),
+            ('first_response_at', timestamp),
+            ('closed_at', timestamp),
+            ('updated_at', timestamp),
+            ('missed', pa.bool_()),
+            ('response_minutes', pa.float64()),
+            ('resolution_minutes', pa.float64()),
+        ])
+        self._writer = pq.ParquetWriter(filename, self._schema, compression='zstd')
+        self._batches = []
+        self._buffered = 0
+
+    def write(self, records: list):
+        columns = [
+            self._pa.array([record[field.name] for record in records], type=field.type)
+            for field in self._schema
+        ]
+        self._batches.append(self._pa.record_batch(columns, schema=self._schema))
+        self._buffered += len(records)
+        if self._buffered >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._batches:
+            self._writer.write_table(self._pa.Table.from_batches(self._batches, schema=self._schema))
+            self._batches = []
+            self._buffered = 0
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+EXPORT_WRITERS = {
+    'csv': CsvExportWriter,
+    'xlsx': XlsxExportWriter,
+    'jsonl': JsonlExportWriter,
+    'parquet': ParquetExportWriter,
+}
+
+async def write_export(
+    name: str, export_format: str, fetch_page: Callable, position, next_position: Callable,
+    page_size: int = EXPORT_PAGE_SIZE
+) -> tuple:
+    """
+    Постраничная запись тикетов в файл name.<расширение> во временном каталоге.
+    fetch_page(position) возвращает следующую страницу, next_position(ticket) - позицию после тикета.
+    Возвращает (имя файла, число тикетов, позиция после последнего), пустой файл удаляется (None).
+    """
+    writer_class = EXPORT_WRITERS[export_format]
+    export_dir = tempfile.mkdtemp(prefix='tickets_export_', dir=EXPORT_TMP_DIR)
+    filename = os.path.join(export_dir, f'{name}.{writer_class.extension}')
+    writer = await asyncio.to_thread(writer_class, filename)
+    rows = 0
+    try:
+        try:
+            while True:
+                page = await fetch_page(position)
+                if not page:
+                    break
+                await asyncio.to_thread(writer.write, [to_record(ticket) for ticket in page])
+                rows += len(page)
+                position = next_position(page[-1])
+                if len(page) < page_size:
+                    break
+        finally:
+            await asyncio.to_thread(writer.close)
+    except BaseException:
+        remove_export(filename)
+        raise
+
+    if not rows:
+        remove_export(filename)
+        return None, 0, position
+    return filename, rows, position
+
+async def export_period(period: str, export_format: str, page_size: int = EXPORT_PAGE_SIZE) -> Optional[str]:
+    """Выгрузка тикетов, созданных за период (day, week, month). None - тикетов нет"""
+    since = period_start(period, default='month')
+    filename, _, _ = await write_export(
+        f'tickets_export_{period}_{datetime.now().strftime("%Y%m%d")}',
+        export_format,
+        lambda after_id: get_tickets_created_since(since, after_id, page_size),
+        0,
+        lambda ticket: ticket['id'],
+        page_size
+    )
+    return filename
+
+class IncrementalExporter:
+    """Экспорт тикетов, измененных после прошлой выгрузки получателя"""
+
+    def __init__(self, page_size: int = EXPORT_PAGE_SIZE):
+        self.page_size = page_size
+
+    async def export(self, recipient_id: int, export_format: str = 'csv') -> Optional[dict]:
+        """
+        Запись изменений в файл. Возвращает {'filename', 'rows', 'watermark'}
+        или None, если нового нет. Позиция сохраняется отдельно через commit()
+        после доставки: если отправка не удалась, тикеты попадут в следующий экспорт.
+        """
+        watermark = await get_export_watermark(recipient_id)
+        position = (watermark['updated_at'], watermark['ticket_id']) if watermark else (datetime(1, 1, 1), 0)
+        until = utc_now().replace(microsecond=0) - timedelta(seconds=SETTLE_SECONDS)
+
+        filename, rows, position = await write_export(
+            f'tickets_changes_{recipient_id}',
+            export_format,
+            lambda position: get_changed_tickets(*position, until, self.page_size),
+            position,
+            lambda ticket: (ticket['updated_at'], ticket['id']),
+            self.page_size
+        )
+        if filename is None:
+            return None
+        return {'filename': filename, 'rows': rows, 'watermark': position}
+
+    async def commit(self, recipient_id: int, watermark: tuple):
+        """Сохранение позиции после успешной доставки"""
+        await save_export_watermark(recipient_id, *watermark)
+
+# Общий экземпляр для обработчиков команд
+incremental_exporter = IncrementalExporter()
@@ -1,15 +1,22 @@
 from aiogram import Router, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message
-from aiogram.types.input_file import FSInputFile
 from datetime import datetime, timedelta
-import os
 
-from database import is_ceo, is_admin
-from analytics import AnalyticsManager
+from database import (
+    is_ceo, is_admin, user_cache, close_tickets_older_than,
+    reassign_admin_tickets, claim_next_tickets, delete_export_watermark,
+    get_admin_shifts, set_admin_shift, delete_admin_shift
+)
+from business_hours import business_calendar, shift_calendar, parse_schedule
+from timeutil import utc_now
+from analytics import analytics_manager, remove_export
+from exports import incremental_exporter, export_period, EXPORT_WRITERS
+from macros import macro_library
+from media import media_registry
+from middlewares import throttling_middleware
 
 router = Router()
-analytics_manager = AnalyticsManager()
 
 # Список доступных команд
 ADMIN_COMMANDS = """
@@ -17,6 +24,11 @@ ADMIN_COMMANDS = """
 /stats - Статистика по тикетам
 /my_stats - Ваша личная статистика
 /open_tickets - Список открытых тикетов
+/claim N - Взять в работу следующие N тикетов из очереди
+/shifts - Графики дежурств администраторов
+/macros - Шаблоны ответов (при ответе на тикет - кнопки и поиск @бот запрос)
+/macro_add НАЗВАНИЕ | ТЕКСТ - Добавить шаблон ответа
+/dashboard - Закрепить живую панель со статистикой в этом чате
 /help - Список команд
 
 Дополнительные команды для CEO:
@@ -24,6 +36,16 @@ ADMIN_COMMANDS = """
 /export_day - Экспорт данных за день
 /export_week - Экспорт данных за неделю
 /export_month - Экспорт данных за месяц
+(с форматом csv, xlsx, jsonl или parquet - строки тикетов без отчета, например /export_week parquet)
+/export_changes [csv|xlsx|jsonl|parquet] - Тикеты, измененные после прошлой выгрузки в этот чат
+/export_reset - Следующая выгрузка изменений будет полной
+/flood_stats - Статистика ограничения частоты запросов
+/cache_stats - Статистика кэша пользователей и отчетов
+/close_old N - Закрыть все тикеты старше N дней
+/reassign ID_ОТ ID_КОМУ - Передать тикеты в работе другому администратору
+/shift ID ГРАФИК - График дежурств администратора (например /shift 123 mon-fri 09:00-18:00),
+/shift ID off - дежурство в рабочее время поддержки
+/macro_del ID - Удалить шаблон ответа
 """
 
 @router.message(Command("help"))
@@ -55,6 +77,15 @@ async def cmd_stats(message: Message):
     
     await message.answer(text)
 
+@router.message(Command("dashboard"))
+async def cmd_dashboard(message: Message):
+    """Закрепить живую панель в текущем чате"""
+    if not await is_admin(message.from_user.id):
+        return
+    
+    from handlers import dashboard_manager
+    await dashboard_manager.create(message.chat.id)
+
 @router.message(Command("my_stats"))
 async def cmd_my_stats(message: Message):
     """Показать статистику администратора"""
@@ -98,6 +129,51 @@ async def cmd_admin_stats(message: Message):
     
     await message.answer(text)
 
+@router.message(Command("flood_stats"))
+async def cmd_flood_stats(message: Message):
+    """Показать счетчики антифлуда (только для CEO)"""
+    if not await is_ceo(message.from_user.id):
+        return
+    
+    stats = throttling_middleware.get_stats()
+    
+    text = "🛡 Антифлуд:\n\n"
+    text += f"Отслеживается пользователей: {stats['tracked_users']}\n"
+    for update_type, counters in stats['counters'].items():
+        text += f"\n{update_type}:\n"
+        text += f"• Пропущено: {counters['allowed']}\n"
+        text += f"• Отклонено: {counters['rejected']}\n"
+    
+    await message.answer(text)
+
+@router.message(Command("cache_stats"))
+async def cmd_cache_stats(message: Message):
+    """Показать статистику кэшей пользователей и отчетов (только для CEO)"""
+    if not await is_ceo(message.from_user.id):
+        return
+    
+    stats = user_cache.get_stats()
+    
+    text = "🗂 Кэш пользователей:\n\n"
+    text += f"Размер: {stats['size']} / {stats['maxsize']}\n"
+    text += f"Попаданий: {stats['hits']}\n"
+    text += f"Промахов: {stats['misses']}\n"
+    text += f"Доля попаданий: {stats['hit_rate']}%\n\n"
+
+    reports = analytics_manager.report_cache.get_stats()
+    text += "📊 Кэш отчетов:\n\n"
+    text += f"Размер: {reports['size']}\n"
+    text += f"Попаданий: {reports['hits']}\n"
+    text += f"Объединено запросов: {reports['coalesced']}\n"
+    text += f"Запросов к БД: {reports['misses']}\n\n"
+
+    media = media_registry.get_stats()
+    text += "🖼 Файлы в Telegram:\n\n"
+    text += f"Загружено: {media['uploads']}\n"
+    text += f"Отправлено по file_id: {media['reused']}"
+    
+    await message.answer(text)
+
 @router.message(Command("open_tickets"))
 async def cmd_open_tickets(message: Message):
     """Показать список открытых тикетов"""
@@ -120,22 +196,265 @@ async def cmd_open_tickets(message: Message):
     
     await message.answer(text)
 
+@router.message(Command("close_old"))
+async def cmd_close_old(message: Message, command: CommandObject):
+    """Закрыть все тикеты старше N дней (только для CEO)"""
+    if not await is_ceo(message.from_user.id):
+        return
+    
+    try:
+        days = int(command.args)
+        if days < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        await message.answer("Использование: /close_old N (N - число дней, не меньше 1)")
+        return
+    
+    tickets = await close_tickets_older_than(days)
+    
+    from handlers import notification_manager
+    if notification_manager and tickets:
+        await notification_manager.notify_users(
+            tickets, "Ваш тикет #{ticket_id} был закрыт. Спасибо за обращение!"
+        )
+        await notification_manager.notify_bulk_action(
+            f"@{message.from_user.username} закрыл тикеты старше {days} дн.",
+            [ticket['id'] for ticket in tickets]
+        )
+    
+    await message.answer(f"Закрыто тикетов: {len(tickets)}")
+
+@router.message(Command("reassign"))
+async def cmd_reassign(message: Message, command: CommandObject):
+    """Передать все тикеты в работе от одного администратора другому (только для CEO)"""
+    if not await is_ceo(message.from_user.id):
+        return
+    
+    try:
+        from_admin_id, to_admin_id = map(int, (command.args or '').split())
+    except ValueError:
+        await message.answer("Использование: /reassign ID_ОТ ID_КОМУ")
+        return
+    
+    if not await is_admin(to_admin_id):
+        await message.answer(f"Пользователь {to_admin_id} не является администратором")
+        return
+    
+    tickets = await reassign_admin_tickets(from_admin_id, to_admin_id)
+    ticket_ids = [ticket['id'] for ticket in tickets]
+    
+    from handlers import notification_manager
+    if notification_manager and tickets:
+        await notification_manager.notify_admins(
+            [to_admin_id],
+            "Вам переданы тикеты: " + ', '.join(f"#{ticket_id}" for ticket_id in ticket_ids)
+        )
+        await notification_manager.notify_bulk_action(
+            f"Тикеты администратора {from_admin_id} переданы администратору {to_admin_id}",
+            ticket_ids
+        )
+    
+    await message.answer(f"Передано тикетов: {len(tickets)}")
+
+@router.message(Command("claim"))
+async def cmd_claim(message: Message, command: CommandObject):
+    """Взять в работу следующие N тикетов из очереди"""
+    if not await is_admin(message.from_user.id):
+        return
+    
+    try:
+        count = int(command.args or 1)
+        if not 1 <= count <= 50:
+            raise ValueError
+    except ValueError:
+        await message.answer("Использование: /claim N (N от 1 до 50)")
+        return
+    
+    tickets = await claim_next_tickets(message.from_user.id, count)
+    if not tickets:
+        await message.answer("Очередь тикетов пуста")
+        return
+    
+    ticket_ids = [ticket['id'] for ticket in tickets]
+    
+    from handlers import notification_manager
+    if notification_manager:
+        await notification_manager.notify_users(
+            tickets, "Ваш тикет #{ticket_id} взят в обработку специалистом поддержки"
+        )
+        await notification_manager.notify_bulk_action(
+            f"@{message.from_user.username} взял в работу",
+            ticket_ids
+        )
+    
+    await message.answer(
+        "Вы взяли в работу тикеты: " + ', '.join(f"#{ticket_id}" for ticket_id in ticket_ids)
+    )
+
 @router.message(Command(commands=["export_day", "export_week", "export_month"]))
-async def cmd_export(message: Message):
+async def cmd_export(message: Message, command: CommandObject):
     """Экспорт данных (только для CEO)"""
     if not await is_ceo(message.from_user.id):
         return
     
-    period = message.text.split('_')[1]  # day, week или month
-    filename = await analytics_manager.export_to_csv(period)
+    period = command.command.split('_')[1]  # day, week или month
+    export_format = (command.args or '').strip().lower()
+    if export_format and export_format not in EXPORT_WRITERS:
+        await message.answer(f"Использование: /export_{period} [{'|'.join(EXPORT_WRITERS)}]")
+        return
+
+    if export_format:
+        # Потоковая выгрузка строк тикетов в выбранном формате
+        filename = await export_period(period, export_format)
+        if filename is None:
+            await message.answer("За период нет тикетов")
+            return
+    else:
+        # Отчет Excel со статистикой
+        filename = await analytics_manager.export_to_csv(period)
     
-    with open(filename, 'rb') as file:
-        await message.answer_document(
-            document=FSInputFile(filename),
+    try:
+        await media_registry.send_document(
+            message.answer_document,
+            filename,
             caption=f"Экспорт данных за {period}"
         )
-    # Удаляем временный файл
-    os.remove(filename)
+    finally:
+        # Удаляем временный файл
+        remove_export(filename)
+
+@router.message(Command("export_changes"))
+async def cmd_export_changes(message: Message, command: CommandObject):
+    """Инкрементальный экспорт изменений для этого чата (только для CEO)"""
+    if not await is_ceo(message.from_user.id):
+        return
+
+    export_format = (command.args or 'csv').strip().lower()
+    if export_format not in EXPORT_WRITERS:
+        await message.answer(f"Использование: /export_changes [{'|'.join(EXPORT_WRITERS)}]")
+        return
+
+    result = await incremental_exporter.export(message.chat.id, export_format)
+    if result is None:
+        await message.answer("Новых изменений с прошлой выгрузки нет")
+        return
+
+    try:
+        await media_registry.send_document(
+            message.answer_document,
+            result['filename'],
+            caption=f"Изменения с прошлой выгрузки: {result['rows']} тикетов"
+        )
+        # Позиция сдвигается только после доставки файла
+        await incremental_exporter.commit(message.chat.id, result['watermark'])
+    finally:
+        remove_export(result['filename'])
+
+@router.message(Command("export_reset"))
+async def cmd_export_reset(message: Message):
+    """Сброс позиции инкрементального экспорта для этого чата (только для CEO)"""
+    if not await is_ceo(message.from_user.id):
+        return
+
+    await delete_export_watermark(message.chat.id)
+    await message.answer("Следующая выгрузка /export_changes будет содержать все тикеты")
+
+@router.message(Command("shifts"))
+async def cmd_shifts(message: Message):
+    """Графики дежурств администраторов"""
+    if not await is_admin(message.from_user.id):
+        return
+
+    now = utc_now()
+    text = "🕘 Графики дежурств:\n\n"
+    for admin in await get_admin_shifts():
+        calendar = shift_calendar(admin['schedule']) if admin['schedule'] else business_calendar
+        mark = "🟢" if calendar.is_open(now) else "⚪️"
+        text += f"{mark} @{admin['username']} ({admin['admin_id']}): {admin['schedule'] or 'рабочее время поддержки'}\n"
+    await message.answer(text)
+
+@router.message(Command("shift"))
+async def cmd_shift(message: Message, command: CommandObject):
+    """Задать график дежурств администратора (только для CEO)"""
+    if not await is_ceo(message.from_user.id):
+        return
+
+    usage = "Использование: /shift ID mon-fri 09:00-18:00; sat 10:00-15:00 или /shift ID off"
+    try:
+        admin_id, schedule = (command.args or '').split(maxsplit=1)
+        admin_id = int(admin_id)
+    except ValueError:
+        await message.answer(usage)
+        return
+
+    if not await is_admin(admin_id):
+        await message.answer(f"Пользователь {admin_id} не является администратором")
+        return
+
+    schedule = schedule.strip().lower()
+    if schedule == 'off':
+        await delete_admin_shift(admin_id)
+        await message.answer(f"Администратор {admin_id} дежурит в рабочее время поддержки")
+        return
+
+    try:
+        parse_schedule(schedule)
+    except ValueError:
+        await message.answer(usage)
+        return
+    await set_admin_shift(admin_id, schedule)
+    await message.answer(f"График администратора {admin_id}: {schedule}")
+
+@router.message(Command("macros"))
+async def cmd_macros(message: Message):
+    """Список шаблонов ответов по частоте использования"""
+    if not await is_admin(message.from_user.id):
+        return
+
+    macros = macro_library.top(len(macro_library.index.macros))
+    if not macros:
+        await message.answer("Шаблонов пока нет. Добавьте: /macro_add НАЗВАНИЕ | ТЕКСТ")
+        return
+
+    text = "📝 Шаблоны ответов:\n\n"
+    for macro in macros:
+        text += f"{macro['id']}. {macro['title']} (использован {macro['usage_count']} раз)\n"
+    await message.answer(text)
+
+@router.message(Command("macro_add"))
+async def cmd_macro_add(message: Message, command: CommandObject):
+    """Добавить шаблон ответа"""
+    if not await is_admin(message.from_user.id):
+        return
+
+    title, _, text = (command.args or '').partition('|')
+    title, text = title.strip(), text.strip()
+    if not title or not text:
+        await message.answer("Использование: /macro_add НАЗВАНИЕ | ТЕКСТ")
+        return
+
+    macro_id = await macro_library.add(title, text, message.from_user.id)
+    if macro_id is None:
+        await message.answer(f"Шаблон «{title}» уже существует")
+        return
+    await message.answer(f"Шаблон #{macro_id} «{title}» добавлен")
+
+@router.message(Command("macro_del"))
+async def cmd_macro_del(message: Message, command: CommandObject):
+    """Удалить шаблон ответа (только для CEO)"""
+    if not await is_ceo(message.from_user.id):
+        return
+
+    try:
+        macro_id = int(command.args)
+    except (TypeError, ValueError):
+        await message.answer("Использование: /macro_del ID")
+        return
+
+    if await macro_library.delete(macro_id):
+        await message.answer(f"Шаблон #{macro_id} удален")
+    else:
+        await message.answer(f"Шаблон #{macro_id} не найден")
 
 def register_group_handlers(dp: Router):
     """Регистрация обработчиков групповых команд"""
@@ -1,23 +1,35 @@
-import json
 from typing import Union
 from aiogram import Router, F, Bot
-from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.filters import Command, StateFilter
+from aiogram.types import (
+    Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton,
+    InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+)
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from database import (
     add_user, get_user, create_ticket, get_ticket,
-    update_ticket_status, is_admin, is_ceo, get_all_admins,
-    add_admin
+    update_ticket_status, is_admin, is_ceo,
+    add_admin, update_ticket_priority, get_active_ticket,
+    append_ticket_message, mark_first_response
 )
 from keyboards import (
-    get_contact_keyboard, get_ticket_actions_keyboard,
-    get_admin_keyboard, get_ticket_priority_keyboard,
-    get_ticket_close_keyboard
+    get_contact_keyboard, get_admin_keyboard, get_ticket_priority_keyboard,
+    get_ticket_close_keyboard, get_ticket_reply_keyboard, get_macro_keyboard
 )
 from messages import MessageManager
 from notifications import NotificationManager
+from conversations import ConversationManager
+from dashboard import DashboardManager
+from escalations import EscalationManager
+from analytics import analytics_manager
+from macros import macro_library
+from callbacks import (
+    callback_router, ViewTicket, TakeTicket, ReplyTicket, CloseTicket, TicketPriority,
+    ExportPeriod, UseMacro
+)
+from config import PRIORITY_LEVELS, MACRO_BUTTONS
 
 # Создаем роутер
 router = Router()
@@ -28,11 +40,17 @@ from states import UserRegistration, TicketResponse, AdminManagement
 # Инициализация менеджеров
 message_manager = MessageManager()
 notification_manager: NotificationManager = None
+conversation_manager: ConversationManager = None
+dashboard_manager: DashboardManager = None
+escalation_manager: EscalationManager = None
 
 def init_managers(bot: Bot):
     """Инициализация менеджеров"""
-    global notification_manager
+    global notification_manager, conversation_manager, dashboard_manager, escalation_manager
     notification_manager = NotificationManager(bot)
+    conversation_manager = ConversationManager(notification_manager)
+    dashboard_manager = DashboardManager(bot, analytics_manager)
+    escalation_manager = EscalationManager(notification_manager)
 
 # Обработчик команды /start
 @router.message(Command("start"))
@@ -163,7 +181,7 @@ async def process_new_admin_id(message: Message, state: FSMContext):
     await state.clear()
 
 # Обработчик callback для добавления админа
-@router.callback_query(lambda c: c.data == "add_admin")
+@callback_router.register('add_admin')
 async def process_add_admin_button(callback: CallbackQuery, state: FSMContext):
     """Обработка нажатия кнопки добавления админа"""
     if not await is_ceo(callback.from_user.id):
@@ -178,17 +196,15 @@ async def process_add_admin_button(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 # Обработчик всех типов сообщений для создания тикета
-@router.message(F.content_type.in_({'text', 'photo', 'video', 'document', 'voice'}), F.chat.type == "private")
+# Только вне состояний: иначе обработчик перехватывал бы ответ администратора на тикет
+@router.message(
+    F.content_type.in_({'text', 'photo', 'video', 'document', 'audio', 'voice'}), F.chat.type == "private",
+    StateFilter(None)
+)
 async def handle_message(message: Message, state: FSMContext):
     """
     Обработка входящих сообщений для создания тикетов
     """
-    # Проверяем, не находится ли пользователь в процессе какого-либо действия
-    current_state = await state.get_state()
-    if current_state is not None:
-        # Если пользователь в каком-то состоянии, пропускаем обработку
-        return
-
     # Проверяем, не является ли отправитель админом
     if await is_admin(message.from_user.id):
         # Для админов показываем сообщение о том, что они не могут создавать тикеты
@@ -206,50 +222,73 @@ async def handle_message(message: Message, state: FSMContext):
         )
         return
 
-    # Сериализуем сообщение
-    message_data = message_manager.serialize_message(message)
-    
-    # Создаем тикет
-    ticket_id = await create_ticket(
-        user_id=message.from_user.id,
-        message_data=message_data
-    )
+    # Сериализуем сообщение (альбом собирается в одно сообщение)
+    if message.media_group_id:
+        album = await message_manager.collect_media_group(message)
+        if album is None:
+            # Часть альбома, который уже собирается другим апдейтом
+            return
+        message_data = message_manager.serialize_media_group(album)
+    else:
+        message_data = message_manager.serialize_message(message)
+    
+    # Добавляем сообщение к незакрытому тикету пользователя или создаем новый
+    async with conversation_manager.user_lock(message.from_user.id):
+        ticket = await get_active_ticket(message.from_user.id)
+        if ticket:
+            ticket_id = ticket[0]
+            await append_ticket_message(ticket_id, message_data)
+        else:
+            ticket_id = await create_ticket(
+                user_id=message.from_user.id,
+                message_data=message_data
+            )
     
     if ticket_id:
-        # Создаем клавиатуру для админов
-        keyboard = get_ticket_actions_keyboard(ticket_id)
-        
-        # Получаем список всех админов
-        admins = await get_all_admins()
-        admin_ids = [admin[1] for admin in admins]  # admin_id находится во втором столбце
-        
         # Формируем имя пользователя для уведомления
         user_name = message.from_user.username or message.from_user.first_name
         
-        # Отправляем уведомления
-        await notification_manager.notify_ticket_created(
+        # Уведомления админам отправятся одним сообщением после серии сообщений
+        new_series = conversation_manager.add_message(
             ticket_id=ticket_id,
             user_name=user_name,
-            admin_ids=admin_ids,
-            keyboard=keyboard
+            created=not ticket
         )
         
-        await message.answer(
-            f"Ваш тикет #{ticket_id} создан. Мы ответим вам в ближайшее время."
-        )
+        if not ticket:
+            await message.answer(
+                f"Ваш тикет #{ticket_id} создан. Мы ответим вам в ближайшее время."
+            )
+        elif new_series:
+            await message.answer(
+                f"Ваше сообщение добавлено к тикету #{ticket_id}."
+            )
     else:
         await message.answer(
             "Произошла ошибка при создании тикета. Пожалуйста, попробуйте позже."
         )
 
+async def answer_media(message: Message, media_type: str, media_id: str, **kwargs):
+    """Отправка одного медиафайла методом его типа"""
+    senders = {
+        'photo': message.answer_photo,
+        'video': message.answer_video,
+        'document': message.answer_document,
+        'audio': message.answer_audio,
+        'voice': message.answer_voice,
+    }
+    sender = senders.get(media_type)
+    if sender:
+        await sender(media_id, **kwargs)
+
 # Обработчик просмотра тикета
-@router.callback_query(lambda c: c.data.startswith('view_ticket:'))
-async def process_ticket_view(callback: CallbackQuery):
+@callback_router.register(ViewTicket)
+async def process_ticket_view(callback: CallbackQuery, callback_data: ViewTicket):
     if not await is_admin(callback.from_user.id):
         await callback.answer("У вас нет прав администратора")
         return
 
-    ticket_id = int(callback.data.split(':')[1])
+    ticket_id = callback_data.ticket_id
     ticket = await get_ticket(ticket_id)
     
     if not ticket:
@@ -258,7 +297,7 @@ async def process_ticket_view(callback: CallbackQuery):
     
     # Получаем информацию о пользователе
     user = await get_user(ticket[1])  # ticket[1] это user_id
-    message_data = json.loads(ticket[9]) if ticket[9] else {}  # ticket[9] это message_data
+    messages = message_manager.deserialize_messages(ticket[9])  # ticket[9] это message_data
     
     # Формируем текст сообщения
     text = (
@@ -268,50 +307,62 @@ async def process_ticket_view(callback: CallbackQuery):
         f"Создан: {ticket[4]}\n\n"  # ticket[4] это created_at
     )
 
-    # Добавляем содержимое сообщения
-    if message_data.get('text'):
-        text += f"Сообщение: {message_data['text']}\n"
+    # Добавляем содержимое сообщений
+    for message_data in messages:
+        if message_data.get('text'):
+            text += f"Сообщение: {message_data['text']}\n"
     
-    # Создаем клавиатуру с кнопкой "Взять в работу"
+    # Создаем клавиатуру с кнопкой "Взять в работу" и выбором приоритета
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
                     text="Взять в работу",
-                    callback_data=f"take_ticket:{ticket_id}"
+                    callback_data=TakeTicket(ticket_id=ticket_id).pack()
                 )
-            ]
+            ],
+            *get_ticket_priority_keyboard(ticket_id).inline_keyboard
         ]
     )
 
-    # Отправляем медиафайл, если есть
-    if message_data.get('media_type') and message_data.get('media_id'):
-        media_type = message_data['media_type']
-        media_id = message_data['media_id']
-        caption = text[:1024]  # Ограничение на длину подписи
-
-        if media_type == 'photo':
-            await callback.message.answer_photo(media_id, caption=caption, reply_markup=keyboard)
-        elif media_type == 'video':
-            await callback.message.answer_video(media_id, caption=caption, reply_markup=keyboard)
-        elif media_type == 'document':
-            await callback.message.answer_document(media_id, caption=caption, reply_markup=keyboard)
-        elif media_type == 'voice':
-            await callback.message.answer_voice(media_id, caption=caption, reply_markup=keyboard)
-    else:
-        # Если нет медиафайла, отправляем просто текст
+    # Альбомы отправляем одним send_media_group (кнопки к альбому не крепятся).
+    # Telegram принимает альбом от 2 элементов: часть альбома, пришедшая после окна
+    # сборки и сохраненная отдельно, отправляется обычным сообщением
+    for message_data in messages:
+        media_group = message_manager.build_media_group(message_data)
+        if len(media_group) > 1:
+            await callback.message.answer_media_group(media_group)
+        elif media_group:
+            item = media_group[0]
+            await answer_media(callback.message, item.type, item.media, caption=item.caption)
+
+    # Отправляем медиафайлы, если есть (клавиатура - у последнего сообщения)
+    media = [m for m in messages if m.get('media_type') and m.get('media_id')]
+    if not media:
+        # Если нет медиафайлов, отправляем просто текст
         await callback.message.answer(text, reply_markup=keyboard)
+    else:
+        caption = text[:1024]  # Ограничение на длину подписи
+        for index, message_data in enumerate(media):
+            media_type = message_data['media_type']
+            media_id = message_data['media_id']
+            is_last = index == len(media) - 1
+            await answer_media(
+                callback.message, media_type, media_id,
+                caption=caption if is_last else message_data.get('caption'),
+                reply_markup=keyboard if is_last else None
+            )
 
     await callback.answer()
 
 # Обработчик взятия тикета в работу
-@router.callback_query(lambda c: c.data.startswith('take_ticket:'))
-async def process_ticket_taken(callback: CallbackQuery):
+@callback_router.register(TakeTicket)
+async def process_ticket_taken(callback: CallbackQuery, callback_data: TakeTicket):
     if not await is_admin(callback.from_user.id):
         await callback.answer("У вас нет прав администратора")
         return
 
-    ticket_id = int(callback.data.split(':')[1])
+    ticket_id = callback_data.ticket_id
     
     # Проверяем, не взят ли уже тикет
     ticket = await get_ticket(ticket_id)
@@ -345,32 +396,41 @@ async def process_ticket_taken(callback: CallbackQuery):
         print(f"Не удалось отправить уведомление пользователю: {e}")
     
     # Обновляем сообщение с тикетом
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="Ответить",
-                    callback_data=f"reply:{ticket_id}"
-                ),
-                InlineKeyboardButton(
-                    text="Закрыть тикет",
-                    callback_data=f"close:{ticket_id}"
-                )
-            ]
-        ]
-    )
-    
-    await callback.message.edit_reply_markup(reply_markup=keyboard)
+    await callback.message.edit_reply_markup(reply_markup=get_ticket_reply_keyboard(ticket_id))
     await callback.answer("Тикет взят в работу")
 
+# Обработчик изменения приоритета тикета
+@callback_router.register(TicketPriority)
+async def process_ticket_priority(callback: CallbackQuery, callback_data: TicketPriority):
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("У вас нет прав администратора")
+        return
+
+    ticket_id, priority = callback_data.ticket_id, callback_data.priority
+    if priority not in PRIORITY_LEVELS:
+        await callback.answer("Неизвестный приоритет")
+        return
+
+    ticket = await get_ticket(ticket_id)
+    if not ticket:
+        await callback.answer("Тикет не найден")
+        return
+
+    if ticket[2] == 'closed':  # ticket[2] это status
+        await callback.answer("Тикет уже закрыт")
+        return
+
+    await update_ticket_priority(ticket_id, priority)
+    await callback.answer(f"Приоритет тикета #{ticket_id}: {priority}")
+
 # Обработчик ответа на тикет
-@router.callback_query(lambda c: c.data.startswith('reply:'))
-async def process_reply_start(callback: CallbackQuery, state: FSMContext):
+@callback_router.register(ReplyTicket)
+async def process_reply_start(callback: CallbackQuery, callback_data: ReplyTicket, state: FSMContext):
     if not await is_admin(callback.from_user.id):
         await callback.answer("У вас нет прав администратора")
         return
 
-    ticket_id = int(callback.data.split(':')[1])
+    ticket_id = callback_data.ticket_id
     ticket = await get_ticket(ticket_id)
     
     if not ticket:
@@ -385,10 +445,27 @@ async def process_reply_start(callback: CallbackQuery, state: FSMContext):
     await state.update_data(ticket_id=ticket_id)
     
     await callback.message.answer(
-        "Отправьте ваш ответ на тикет. Поддерживаются текст, фото, видео и документы."
+        "Отправьте ваш ответ на тикет. Поддерживаются текст, фото, видео и документы. "
+        "Или выберите шаблон ответа:",
+        reply_markup=get_macro_keyboard(ticket_id, macro_library.top(MACRO_BUTTONS))
     )
     await callback.answer()
 
+def format_reply_text(ticket_id: int, text: str) -> str:
+    """Текст ответа пользователю на тикет"""
+    return f"Ответ на ваш тикет #{ticket_id}:\n{text}\n\nС уважением,\nСлужба поддержки"
+
+async def complete_admin_reply(ticket_id: int, admin_username: str):
+    """Учет отправленного ответа на тикет"""
+    # Первый ответ останавливает эскалацию тикета
+    await mark_first_response(ticket_id)
+
+    # Отправляем уведомление в группу
+    await notification_manager.notify_ticket_answered(
+        ticket_id=ticket_id,
+        admin_username=admin_username
+    )
+
 # Обработчик ответа администратора
 @router.message(TicketResponse.waiting_for_response)
 async def process_admin_response(message: Message, state: FSMContext):
@@ -411,7 +488,7 @@ async def process_admin_response(message: Message, state: FSMContext):
         if message.text:
             await message.bot.send_message(
                 chat_id=ticket[1],  # user_id
-                text=f"Ответ на ваш тикет #{ticket_id}:\n{message.text}\n\nС уважением,\nСлужба поддержки"
+                text=format_reply_text(ticket_id, message.text)
             )
         elif message.photo:
             await message.bot.send_photo(
@@ -432,11 +509,13 @@ async def process_admin_response(message: Message, state: FSMContext):
                 caption=f"Ответ на ваш тикет #{ticket_id}\n\nС уважением,\nСлужба поддержки"
             )
         
-        # Отправляем уведомление в группу
-        await notification_manager.notify_ticket_answered(
-            ticket_id=ticket_id,
-            admin_username=message.from_user.username
-        )
+        await complete_admin_reply(ticket_id, message.from_user.username)
+
+        # Шаблон, выбранный в инлайн-поиске, приходит сообщением через бота
+        if message.via_bot and message.via_bot.id == message.bot.id:
+            macro_id = macro_library.find_by_text(message.text)
+            if macro_id is not None:
+                macro_library.record_usage(macro_id)
         
         await message.answer("Ваш ответ отправлен пользователю")
     except Exception as e:
@@ -444,14 +523,68 @@ async def process_admin_response(message: Message, state: FSMContext):
     
     await state.clear()
 
+# Ответ на тикет шаблоном
+@callback_router.register(UseMacro)
+async def process_macro_reply(callback: CallbackQuery, callback_data: UseMacro, state: FSMContext):
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("У вас нет прав администратора")
+        return
+
+    ticket_id = callback_data.ticket_id
+    ticket = await get_ticket(ticket_id)
+    if not ticket:
+        await callback.answer("Тикет не найден")
+        return
+
+    if ticket[2] != 'in_progress' or ticket[3] != callback.from_user.id:  # status и assigned_admin_id
+        await callback.answer("Этот тикет не находится в вашей работе")
+        return
+
+    macro = macro_library.get(callback_data.macro_id)
+    if not macro:
+        await callback.answer("Шаблон удален")
+        return
+
+    try:
+        await callback.bot.send_message(chat_id=ticket[1], text=format_reply_text(ticket_id, macro['text']))
+        await complete_admin_reply(ticket_id, callback.from_user.username)
+        macro_library.record_usage(macro['id'])
+    except Exception as e:
+        await callback.answer(f"Ошибка при отправке ответа: {e}")
+        return
+
+    # Ответ дан - ожидание своего текста больше не нужно
+    await state.clear()
+    await callback.message.answer(f"Шаблон «{macro['title']}» отправлен пользователю")
+    await callback.answer()
+
+# Поиск шаблонов ответа через инлайн-режим (@бот запрос)
+@router.inline_query()
+async def process_macro_search(inline_query: InlineQuery):
+    if not await is_admin(inline_query.from_user.id):
+        await inline_query.answer([], cache_time=60, is_personal=True)
+        return
+
+    results = [
+        InlineQueryResultArticle(
+            id=str(macro['id']),
+            title=macro['title'],
+            description=macro['text'][:100],
+            input_message_content=InputTextMessageContent(message_text=macro['text'])
+        )
+        for macro in macro_library.search(inline_query.query)
+    ]
+    # Без кэша Telegram: порядок зависит от счетчиков использования
+    await inline_query.answer(results, cache_time=0, is_personal=True)
+
 # Обработчик закрытия тикета
-@router.callback_query(lambda c: c.data.startswith('close:'))
-async def process_ticket_close(callback: CallbackQuery):
+@callback_router.register(CloseTicket)
+async def process_ticket_close(callback: CallbackQuery, callback_data: CloseTicket):
     if not await is_admin(callback.from_user.id):
         await callback.answer("У вас нет прав администратора")
         return
 
-    ticket_id = int(callback.data.split(':')[1])
+    ticket_id = callback_data.ticket_id
     ticket = await get_ticket(ticket_id)
     
     if not ticket:
@@ -493,7 +626,7 @@ async def process_ticket_close(callback: CallbackQuery):
     await callback.answer("Тикет успешно закрыт")
 
 # Обработчик меню экспорта
-@router.callback_query(lambda c: c.data == "export_menu")
+@callback_router.register('export_menu')
 async def process_export_menu(callback: CallbackQuery):
     if not await is_ceo(callback.from_user.id):
         await callback.answer("У вас нет прав CEO")
@@ -504,15 +637,15 @@ async def process_export_menu(callback: CallbackQuery):
             [
                 InlineKeyboardButton(
                     text="За день",
-                    callback_data="export:day"
+                    callback_data=ExportPeriod(period="day").pack()
                 ),
                 InlineKeyboardButton(
                     text="За неделю",
-                    callback_data="export:week"
+                    callback_data=ExportPeriod(period="week").pack()
                 ),
                 InlineKeyboardButton(
                     text="За месяц",
-                    callback_data="export:month"
+                    callback_data=ExportPeriod(period="month").pack()
                 )
             ],
             [
@@ -532,7 +665,7 @@ async def process_export_menu(callback: CallbackQuery):
 
 # Обработчик команды /admin и кнопки "Панель управления"
 @router.message(Command("admin"))
-@router.callback_query(lambda c: c.data == "admin_panel")
+@callback_router.register('admin_panel')
 async def cmd_admin(event: Union[Message, CallbackQuery]):
     # Проверяем тип события и получаем нужные данные
     if isinstance(event, Message):
@@ -1,13 +1,27 @@
+from functools import lru_cache
+
 from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     ReplyKeyboardMarkup,
     KeyboardButton
 )
+from pydantic import ConfigDict
+
+from callbacks import TakeTicket, ViewTicket, TicketPriority, CloseTicket, ReplyTicket, UseMacro
+
+# Статические клавиатуры строятся один раз и переиспользуются, поэтому
+# запрещаем изменять их поля после создания
+class FrozenInlineKeyboardMarkup(InlineKeyboardMarkup):
+    model_config = ConfigDict(frozen=True)
+
+class FrozenReplyKeyboardMarkup(ReplyKeyboardMarkup):
+    model_config = ConfigDict(frozen=True)
 
+@lru_cache(maxsize=None)
 def get_contact_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура для запроса контакта"""
-    return ReplyKeyboardMarkup(
+    return FrozenReplyKeyboardMarkup(
         keyboard=[[KeyboardButton(text="Отправить контакт", request_contact=True)]],
         resize_keyboard=True,
         one_time_keyboard=True
@@ -20,18 +34,19 @@ def get_ticket_actions_keyboard(ticket_id: int) -> InlineKeyboardMarkup:
             [
                 InlineKeyboardButton(
                     text="Взять в работу",
-                    callback_data=f"take_ticket:{ticket_id}"
+                    callback_data=TakeTicket(ticket_id=ticket_id).pack()
                 ),
                 InlineKeyboardButton(
                     text="Просмотреть",
-                    callback_data=f"view_ticket:{ticket_id}"
+                    callback_data=ViewTicket(ticket_id=ticket_id).pack()
                 )
             ]
         ]
     )
 
+@lru_cache(maxsize=None)
 def get_admin_keyboard(is_ceo: bool = False) -> InlineKeyboardMarkup:
-    """Клавиатура админ-панели"""
+    """Клавиатура админ-панели (общий неизменяемый экземпляр для каждой роли)"""
     buttons = [
         [
             InlineKeyboardButton(
@@ -52,6 +67,16 @@ def get_admin_keyboard(is_ceo: bool = False) -> InlineKeyboardMarkup:
                 text="Аналитика",
                 callback_data="analytics"
             )
+        ],
+        [
+            InlineKeyboardButton(
+                text="Следующий тикет",
+                callback_data="next_ticket"
+            ),
+            InlineKeyboardButton(
+                text="Живая панель",
+                callback_data="live_dashboard"
+            )
         ]
     ]
     
@@ -72,7 +97,7 @@ def get_admin_keyboard(is_ceo: bool = False) -> InlineKeyboardMarkup:
             ]
         ])
     
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+    return FrozenInlineKeyboardMarkup(inline_keyboard=buttons)
 
 def get_ticket_priority_keyboard(ticket_id: int) -> InlineKeyboardMarkup:
     """Клавиатура выбора приоритета тикета"""
@@ -81,15 +106,32 @@ def get_ticket_priority_keyboard(ticket_id: int) -> InlineKeyboardMarkup:
             [
                 InlineKeyboardButton(
                     text="Обычный",
-                    callback_data=f"priority:{ticket_id}:normal"
+                    callback_data=TicketPriority(ticket_id=ticket_id, priority="normal").pack()
                 ),
                 InlineKeyboardButton(
                     text="Срочный",
-                    callback_data=f"priority:{ticket_id}:urgent"
+                    callback_data=TicketPriority(ticket_id=ticket_id, priority="urgent").pack()
                 ),
                 InlineKeyboardButton(
                     text="VIP",
-                    callback_data=f"priority:{ticket_id}:vip"
+                    callback_data=TicketPriority(ticket_id=ticket_id, priority="vip").pack()
+                )
+            ]
+        ]
+    )
+
+def get_ticket_reply_keyboard(ticket_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура тикета в работе: ответ и закрытие"""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="Ответить",
+                    callback_data=ReplyTicket(ticket_id=ticket_id).pack()
+                ),
+                InlineKeyboardButton(
+                    text="Закрыть тикет",
+                    callback_data=CloseTicket(ticket_id=ticket_id).pack()
                 )
             ]
         ]
@@ -102,8 +144,20 @@ def get_ticket_close_keyboard(ticket_id: int) -> InlineKeyboardMarkup:
             [
                 InlineKeyboardButton(
                     text="Закрыть тикет",
-                    callback_data=f"close_ticket:{ticket_id}"
+                    callback_data=CloseTicket(ticket_id=ticket_id).pack()
                 )
             ]
         ]
     )
+
+def get_macro_keyboard(ticket_id: int, macros: list) -> InlineKeyboardMarkup:
+    """Кнопки шаблонов ответа на тикет и поиск шаблона через инлайн-режим"""
+    buttons = [
+        [InlineKeyboardButton(
+            text=macro['title'],
+            callback_data=UseMacro(ticket_id=ticket_id, macro_id=macro['id']).pack()
+        )]
+        for macro in macros
+    ]
+    buttons.append([InlineKeyboardButton(text="🔎 Найти шаблон", switch_inline_query_current_chat='')])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -0,0 +1,85 @@
+import asyncio
+from functools import wraps
+from typing import Awaitable, Callable, List, Set, Tuple
+
+from config import SHUTDOWN_TIMEOUT_SECONDS
+
+class LifecycleManager:
+    """
+    Учет работы в процессе (обработчики апдейтов, задачи планировщика) и
+    корректная остановка бота: дожидаемся начатой работы с общим дедлайном,
+    затем по порядку выполняем шаги остановки (отправка отложенных уведомлений,
+    дозапись в БД, закрытие сессии).
+    """
+
+    def __init__(self, timeout: float = SHUTDOWN_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self.stopping = False
+        self._tasks: Set[asyncio.Task] = set()
+        # (название, шаг остановки) в порядке выполнения
+        self._hooks: List[Tuple[str, Callable[[], Awaitable]]] = []
+
+    def track(self, task: asyncio.Task) -> asyncio.Task:
+        """Учет задачи, которую нужно дождаться при остановке"""
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def spawn(self, coro: Awaitable) -> asyncio.Task:
+        """Запуск отслеживаемой фоновой задачи"""
+        return self.track(asyncio.create_task(coro))
+
+    def job(self, func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        """
+        Обертка задачи планировщика. APScheduler при остановке отменяет выполняющиеся
+        корутины, поэтому работа идет в отдельной отслеживаемой задаче под shield
+        """
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if self.stopping:
+                return
+            try:
+                await asyncio.shield(self.spawn(func(*args, **kwargs)))
+            except asyncio.CancelledError:
+                # Планировщик остановлен: задача дорабатывает под учетом shutdown()
+                if not self.stopping:
+                    raise
+        return wrapper
+
+    def on_shutdown(self, name: str, callback: Callable[[], Awaitable]):
+        """Регистрация шага остановки (выполняются в порядке регистрации)"""
+        self._hooks.append((name, callback))
+
+    def get_stats(self) -> dict:
+        """Число задач в процессе выполнения"""
+        return {'in_flight': len(self._tasks), 'stopping': self.stopping}
+
+    async def shutdown(self):
+        """Остановка: ожидание работы в процессе, затем шаги остановки"""
+        self.stopping = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        current = asyncio.current_task()
+        pending = {task for task in self._tasks if task is not current}
+        if pending:
+            print(f"Shutdown: waiting for {len(pending)} tasks in progress")
+            _, pending = await asyncio.wait(pending, timeout=max(deadline - loop.time(), 0))
+
+        if pending:
+            print(f"Shutdown: cancelling {len(pending)} unfinished tasks")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for name, callback in self._hooks:
+            # Шаги с дозаписью данных выполняются даже после дедлайна, но коротко
+            try:
+                await asyncio.wait_for(callback(), max(deadline - loop.time(), 1))
+            except asyncio.TimeoutError:
+                print(f"Shutdown: step '{name}' timed out")
+            except Exception as e:
+                print(f"Shutdown: step '{name}' failed: {e}")
+
+# Общий экземпляр; шаги остановки регистрируются в bot.main()
+lifecycle = LifecycleManager()
@@ -0,0 +1,162 @@
+"""
+Шаблоны ответов администраторов (макросы).
+
+Все шаблоны держатся в памяти вместе с индексом для поиска: отсортированный
+список слов (поиск по префиксу бисекцией) и триграммы слов (поиск с опечатками).
+Счетчики использования растут в памяти сразу - от них зависит порядок кнопок и
+результатов поиска - и сохраняются в БД пачкой по расписанию и при остановке.
+"""
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set
+
+from database import get_macros, add_macro, delete_macro, add_macro_usage
+
+# Шаблонов в результатах инлайн-поиска (ограничение Telegram - 50)
+SEARCH_LIMIT = 20
+
+def normalize_words(text: str) -> List[str]:
+    """Слова текста в нижнем регистре (ё не отличается от е)"""
+    return re.findall(r'\w+', text.lower().replace('ё', 'е'))
+
+def trigrams(word: str) -> Set[str]:
+    """Триграммы слова с границами: 'код' -> ' ко', 'код', 'од '"""
+    padded = f' {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class MacroIndex:
+    """Индекс шаблонов для поиска по префиксам слов и триграммам"""
+
+    def __init__(self):
+        self.macros: Dict[int, dict] = {}
+        # (слово, id шаблона) по возрастанию - поиск по префиксу бисекцией
+        self._words: List[tuple] = []
+        # триграмма -> id шаблонов, в словах которых она есть
+        self._trigrams: Dict[str, Set[int]] = defaultdict(set)
+        # Текст шаблона -> id: распознавание шаблона, отправленного через инлайн-режим
+        self._by_text: Dict[str, int] = {}
+
+    def rebuild(self, macros: List[dict]):
+        """Построение индекса заново (шаблонов немного, изменения редки)"""
+        self.macros = {macro['id']: macro for macro in macros}
+        words = set()
+        grams = defaultdict(set)
+        for macro in macros:
+            for word in normalize_words(f"{macro['title']} {macro['text']}"):
+                words.add((word, macro['id']))
+                for gram in trigrams(word):
+                    grams[gram].add(macro['id'])
+        self._words = sorted(words)
+        self._trigrams = grams
+        self._by_text = {macro['text']: macro['id'] for macro in macros}
+
+    def top(self, limit: int) -> List[dict]:
+        """Самые используемые шаблоны"""
+        return sorted(self.macros.values(), key=lambda macro: (-macro['usage_count'], macro['id']))[:limit]
+
+    def find_by_text(self, text: Optional[str]) -> Optional[int]:
+        """id шаблона с точно таким текстом"""
+        return self._by_text.get(text)
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> List[dict]:
+        """
+        Шаблоны, подходящие под запрос: выше те, где нашлось больше слов запроса,
+        при равенстве - более используемые. Слово запроса ищется как префикс слов
+        шаблона, а если таких нет - по общим триграммам (опечатки)
+        """
+        tokens = normalize_words(query)
+        if not tokens:
+            return self.top(limit)
+
+        scores = Counter()
+        for token in tokens:
+            matched = self._prefix_matches(token) or self._fuzzy_matches(token)
+            scores.update(matched)
+
+        found = sorted(
+            scores,
+            key=lambda macro_id: (-scores[macro_id], -self.macros[macro_id]['usage_count'], macro_id)
+        )
+        return [self.macros[macro_id] for macro_id in found[:limit]]
+
+    def _prefix_matches(self, token: str) -> Set[int]:
+        matched = set()
+        position = bisect_left(self._words, (token,))
+        while position < len(self._words) and self._words[position][0].startswith(token):
+            matched.add(self._words[position][1])
+            position += 1
+        return matched
+
+    def _fuzzy_matches(self, token: str) -> Set[int]:
+        if len(token) < 3:
+            return set()
+        grams = trigrams(token)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._trigrams.get(gram, ()))
+        # Не меньше половины триграмм слова должны совпасть
+        return {macro_id for macro_id, count in counts.items() if count * 2 >= len(grams)}
+
+class MacroLibrary:
+    """Шаблоны ответов: индекс в памяти поверх таблицы macros и учет использования"""
+
+    def __init__(self):
+        self.index = MacroIndex()
+        # Использования, еще не сохраненные в БД: id шаблона -> сколько раз
+        self._pending: Counter = Counter()
+
+    async def load(self):
+        """Загрузка шаблонов из БД"""
+        self.index.rebuild([dict(macro) for macro in await get_macros()])
+
+    async def add(self, title: str, text: str, created_by: int) -> Optional[int]:
+        """Добавление шаблона. Возвращает id (None - название уже занято)"""
+        macro_id = await add_macro(title, text, created_by)
+        if macro_id is not None:
+            macros = list(self.index.macros.values())
+            macros.append({'id': macro_id, 'title': title, 'text': text, 'usage_count': 0})
+            self.index.rebuild(macros)
+        return macro_id
+
+    async def delete(self, macro_id: int) -> bool:
+        """Удаление шаблона"""
+        if not await delete_macro(macro_id):
+            return False
+        self._pending.pop(macro_id, None)
+        self.index.rebuild([macro for macro in self.index.macros.values() if macro['id'] != macro_id])
+        return True
+
+    def get(self, macro_id: int) -> Optional[dict]:
+        return self.index.macros.get(macro_id)
+
+    def top(self, limit: int) -> List[dict]:
+        return self.index.top(limit)
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> List[dict]:
+        return self.index.search(query, limit)
+
+    def find_by_text(self, text: Optional[str]) -> Optional[int]:
+        return self.index.find_by_text(text)
+
+    def record_usage(self, macro_id: int):
+        """Учет отправки шаблона (в БД попадет при следующем сохранении)"""
+        macro = self.index.macros.get(macro_id)
+        if macro:
+            macro['usage_count'] += 1
+            self._pending[macro_id] += 1
+
+    async def flush(self):
+        """Сохранение накопленных счетчиков использования"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, Counter()
+        try:
+            await add_macro_usage(pending)
+        except Exception as e:
+            print(f"Error saving macro usage: {e}")
+            # Счетчики вернутся в следующее сохранение
+            self._pending.update(pending)
+
+# Общая библиотека шаблонов для обработчиков и команд
+macro_library = MacroLibrary()
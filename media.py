@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import os
+from typing import Awaitable, Callable
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+
+from cache import LRUCache
+from database import get_media_file_id, save_media_file_id, delete_media_file_id
+
+class MediaRegistry:
+    """
+    Реестр загруженных в Telegram файлов: хэш содержимого -> file_id.
+    Повторная отправка того же отчета или графика идет по file_id без загрузки.
+    """
+
+    def __init__(self, cache_size: int = 1000):
+        # Кэш поверх таблицы media_registry (None - файл еще не загружался)
+        self._cache = LRUCache(cache_size)
+        self.uploads = 0
+        self.reused = 0
+
+    async def send_photo(
+        self, send: Callable[..., Awaitable[Message]], content: bytes, filename: str, **kwargs
+    ) -> Message:
+        """Отправка изображения методом send (например, message.answer_photo)"""
+        return await self._send(send, 'photo', content, filename, **kwargs)
+
+    async def send_document(
+        self, send: Callable[..., Awaitable[Message]], path: str, filename: str = None, **kwargs
+    ) -> Message:
+        """Отправка файла с диска методом send (например, message.answer_document)"""
+        content = await asyncio.to_thread(self._read, path)
+        return await self._send(send, 'document', content, filename or os.path.basename(path), **kwargs)
+
+    async def _send(
+        self, send: Callable[..., Awaitable[Message]], media_type: str,
+        content: bytes, filename: str, **kwargs
+    ) -> Message:
+        # Имя файла входит в ключ: Telegram показывает имя, с которым файл был загружен
+        content_hash = self._hash(media_type, filename, content)
+
+        found, file_id = self._cache.get(content_hash)
+        if not found:
+            file_id = await get_media_file_id(content_hash)
+            self._cache.set(content_hash, file_id)
+
+        if file_id:
+            try:
+                message = await send(**{media_type: file_id}, **kwargs)
+                self.reused += 1
+                return message
+            except TelegramBadRequest as e:
+                # file_id перестал быть действительным - загружаем заново
+                print(f"Stale file_id for {filename}: {e}")
+                self._cache.invalidate(content_hash)
+                await delete_media_file_id(content_hash)
+
+        message = await send(**{media_type: BufferedInputFile(content, filename)}, **kwargs)
+        self.uploads += 1
+        file_id = self._get_file_id(message, media_type)
+        if file_id:
+            await save_media_file_id(content_hash, file_id, media_type)
+            self._cache.set(content_hash, file_id)
+        return message
+
+    @staticmethod
+    def _hash(media_type: str, filename: str, content: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(f'{media_type}:{filename}:'.encode())
+        digest.update(content)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _get_file_id(message: Message, media_type: str):
+        """file_id из ответа Telegram на отправку"""
+        if media_type == 'photo' and message.photo:
+            # Самый большой размер - последний
+            return message.photo[-1].file_id
+        if media_type == 'document' and message.document:
+            return message.document.file_id
+        return None
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def get_stats(self) -> dict:
+        """Загрузки и повторные отправки по file_id"""
+        return {'uploads': self.uploads, 'reused': self.reused}
+
+# Общий реестр для всех модулей
+media_registry = MediaRegistry()
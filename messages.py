@@ -1,10 +1,47 @@
-from aiogram.types import Message
-from typing import Optional, List
+import asyncio
+from aiogram.types import (
+    Message, InputMediaPhoto, InputMediaVideo, InputMediaDocument, InputMediaAudio
+)
+from typing import Optional, List, Dict
 import json
 
+from config import MEDIA_GROUP_WINDOW_SECONDS
+
+# Типы медиа, которые можно отправить одним альбомом
+MEDIA_GROUP_TYPES = {
+    'photo': InputMediaPhoto,
+    'video': InputMediaVideo,
+    'document': InputMediaDocument,
+    'audio': InputMediaAudio
+}
+
 class MessageManager:
     """Класс для управления сообщениями и медиафайлами"""
     
+    def __init__(self, media_group_window: float = MEDIA_GROUP_WINDOW_SECONDS):
+        self.media_group_window = media_group_window
+        # media_group_id -> сообщения альбома, собираемые в текущем окне
+        self._media_groups: Dict[str, List[Message]] = {}
+
+    async def collect_media_group(self, message: Message) -> Optional[List[Message]]:
+        """
+        Сбор сообщений альбома. Telegram присылает альбом отдельными апдейтами
+        с общим media_group_id: первый апдейт ждет окно и возвращает весь альбом,
+        остальные возвращают None.
+        """
+        group_id = message.media_group_id
+        album = self._media_groups.get(group_id)
+        if album is not None:
+            album.append(message)
+            return None
+
+        self._media_groups[group_id] = [message]
+        try:
+            await asyncio.sleep(self.media_group_window)
+        finally:
+            album = self._media_groups.pop(group_id)
+        return sorted(album, key=lambda m: m.message_id)
+
     @staticmethod
     def serialize_message(message: Message) -> str:
         """Сериализация сообщения для сохранения в БД"""
@@ -34,6 +71,12 @@ class MessageManager:
             data['media_id'] = message.document.file_id
             data['caption'] = message.caption
 
+        # Обработка аудио (музыкальные альбомы состоят только из аудио)
+        elif message.audio:
+            data['media_type'] = 'audio'
+            data['media_id'] = message.audio.file_id
+            data['caption'] = message.caption
+
         # Обработка голосового сообщения
         elif message.voice:
             data['media_type'] = 'voice'
@@ -41,11 +84,51 @@ class MessageManager:
 
         return json.dumps(data)
 
+    @classmethod
+    def serialize_media_group(cls, messages: List[Message]) -> str:
+        """Сериализация альбома в одно сообщение тикета"""
+        items = [json.loads(cls.serialize_message(message)) for message in messages]
+        caption = next((item['caption'] for item in items if item['caption']), None)
+        data = {
+            'message_id': messages[0].message_id,
+            'text': caption,
+            'media_type': 'media_group',
+            'media_id': None,
+            'caption': caption,
+            'media_group_id': messages[0].media_group_id,
+            'media': [
+                {'media_type': item['media_type'], 'media_id': item['media_id']}
+                for item in items if item['media_type'] in MEDIA_GROUP_TYPES
+            ]
+        }
+        return json.dumps(data)
+
+    @staticmethod
+    def build_media_group(data: dict) -> list:
+        """Сборка альбома для отправки одним вызовом send_media_group"""
+        media_group = [
+            MEDIA_GROUP_TYPES[item['media_type']](media=item['media_id'])
+            for item in data.get('media', [])
+            if item['media_type'] in MEDIA_GROUP_TYPES
+        ]
+        # Telegram показывает подпись альбома по первому элементу
+        if media_group and data.get('caption'):
+            media_group[0].caption = data['caption'][:1024]
+        return media_group
+
     @staticmethod
     def deserialize_message(data: str) -> dict:
         """Десериализация сообщения из БД"""
         return json.loads(data)
 
+    @staticmethod
+    def deserialize_messages(data: str) -> List[dict]:
+        """Десериализация всех сообщений тикета (одно сообщение или массив)"""
+        if not data:
+            return []
+        messages = json.loads(data)
+        return messages if isinstance(messages, list) else [messages]
+
     @staticmethod
     def get_message_type(message: Message) -> str:
         """Определение типа сообщения"""
@@ -55,6 +138,8 @@ class MessageManager:
             return 'video'
         elif message.document:
             return 'document'
+        elif message.audio:
+            return 'audio'
         elif message.voice:
             return 'voice'
         elif message.text:
@@ -70,6 +155,8 @@ class MessageManager:
             return message.video.file_id
         elif message.document:
             return message.document.file_id
+        elif message.audio:
+            return message.audio.file_id
         elif message.voice:
             return message.voice.file_id
         return None
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+from config import RATE_LIMITS
+from database import is_admin
+from lifecycle import LifecycleManager, lifecycle
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничение частоты апдейтов от одного пользователя (скользящее окно).
+    Альбом считается одним сообщением; пользователи, для которых is_exempt
+    возвращает True (администраторы), не ограничиваются
+    """
+
+    # Как часто чистить окна неактивных пользователей (в апдейтах)
+    CLEANUP_EVERY = 1000
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[int, float]] = RATE_LIMITS,
+        is_exempt: Optional[Callable[[int], Awaitable[bool]]] = None
+    ):
+        # Тип апдейта -> (максимум событий, окно в секундах)
+        self.limits = limits
+        self.is_exempt = is_exempt
+        # (user_id, тип апдейта) -> время событий в окне
+        self._windows: Dict[Tuple[int, str], Deque[float]] = {}
+        # (user_id, тип апдейта) -> до какого времени не повторять предупреждение
+        self._warned: Dict[Tuple[int, str], float] = {}
+        # (user_id, media_group_id) пропущенного альбома -> время его первой части
+        self._media_groups: Dict[Tuple[int, str], float] = {}
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {'allowed': 0, 'rejected': 0}
+        )
+        self._events_since_cleanup = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Message):
+            # Сообщения в группах не создают тикетов и не ограничиваются
+            if event.chat.type != 'private':
+                return await handler(event, data)
+            update_type = 'message'
+        elif isinstance(event, CallbackQuery):
+            update_type = 'callback_query'
+        else:
+            return await handler(event, data)
+
+        limit = self.limits.get(update_type)
+        if not limit or not event.from_user:
+            return await handler(event, data)
+        if self.is_exempt and await self.is_exempt(event.from_user.id):
+            return await handler(event, data)
+
+        now = time.monotonic()
+        self._maybe_cleanup(now)
+
+        # Остальные части уже пропущенного альбома не считаются отдельно
+        group_key = None
+        if update_type == 'message' and event.media_group_id:
+            group_key = (event.from_user.id, event.media_group_id)
+            if group_key in self._media_groups:
+                self.counters[update_type]['allowed'] += 1
+                return await handler(event, data)
+
+        key = (event.from_user.id, update_type)
+        max_events, period = limit
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = deque()
+        while window and window[0] <= now - period:
+            window.popleft()
+
+        if len(window) >= max_events:
+            self.counters[update_type]['rejected'] += 1
+            await self._reject(event, key, now, retry_after=window[0] + period - now)
+            return None
+
+        window.append(now)
+        if group_key:
+            self._media_groups[group_key] = now
+        self.counters[update_type]['allowed'] += 1
+        return await handler(event, data)
+
+    async def _reject(self, event: TelegramObject, key: Tuple[int, str], now: float, retry_after: float):
+        """Мягкий отказ: одно предупреждение о паузе на период ожидания"""
+        try:
+            if self._warned.get(key, 0) > now:
+                # Убираем часики с кнопки без повторного предупреждения
+                if isinstance(event, CallbackQuery):
+                    await event.answer()
+                return
+
+            self._warned[key] = now + retry_after
+            # У Message и CallbackQuery одинаковый метод answer
+            await event.answer(f"Слишком много запросов. Подождите {int(retry_after) + 1} сек.")
+        except Exception as e:
+            print(f"Error sending throttling warning: {e}")
+
+    def _maybe_cleanup(self, now: float):
+        """Удаление окон пользователей, от которых давно не было апдейтов"""
+        self._events_since_cleanup += 1
+        if self._events_since_cleanup < self.CLEANUP_EVERY:
+            return
+        self._events_since_cleanup = 0
+
+        for key, window in list(self._windows.items()):
+            period = self.limits[key[1]][1]
+            if not window or window[-1] <= now - period:
+                del self._windows[key]
+        for key, until in list(self._warned.items()):
+            if until <= now:
+                del self._warned[key]
+        period = self.limits['message'][1] if 'message' in self.limits else 0
+        for key, seen_at in list(self._media_groups.items()):
+            if seen_at <= now - period:
+                del self._media_groups[key]
+
+    def get_stats(self) -> dict:
+        """Счетчики пропущенных и отклоненных апдейтов"""
+        return {
+            'tracked_users': len({user_id for user_id, _ in self._windows}),
+            'counters': {name: dict(values) for name, values in self.counters.items()}
+        }
+
+class InFlightMiddleware(BaseMiddleware):
+    """Учет обработки апдейтов, чтобы при остановке дождаться начатых"""
+
+    def __init__(self, lifecycle_manager: LifecycleManager):
+        self.lifecycle_manager = lifecycle_manager
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        # aiogram обрабатывает каждый апдейт в своей задаче
+        self.lifecycle_manager.track(asyncio.current_task())
+        return await handler(event, data)
+
+# Общие экземпляры, регистрируются в диспетчере в bot.main()
+throttling_middleware = ThrottlingMiddleware(is_exempt=is_admin)
+inflight_middleware = InFlightMiddleware(lifecycle)
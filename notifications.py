@@ -1,8 +1,120 @@
+import asyncio
 from aiogram import Bot
-from aiogram.types import InlineKeyboardMarkup
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
 import os
-from typing import List, Union
-from datetime import datetime
+from typing import List, Optional, Union
+from datetime import datetime, timedelta
+
+from config import GROUP_DIGEST_SECONDS, GROUP_DIGEST_ROLL_MINUTES
+from callbacks import ViewTicket
+
+class GroupDigest:
+    """
+    Буфер событий для приватной группы. События копятся в течение окна и
+    публикуются одной сводкой; пока сводка свежая и короткая, новые события
+    дописываются в то же сообщение через редактирование.
+    """
+
+    MAX_TEXT_LENGTH = 3500
+    MAX_BUTTONS = 8
+
+    def __init__(self, notification_manager: 'NotificationManager', window: float, roll_period: timedelta):
+        self.notification_manager = notification_manager
+        self.window = window
+        self.roll_period = roll_period
+        self._events: List[str] = []
+        self._ticket_ids: List[int] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Текущее "живое" сообщение со сводкой
+        self._live_message_id: Optional[int] = None
+        self._live_started: Optional[datetime] = None
+        self._live_events: List[str] = []
+        self._live_ticket_ids: List[int] = []
+
+    def add(self, text: str, ticket_id: Optional[int] = None):
+        """Добавление события в буфер"""
+        self._events.append(f"{datetime.now().strftime('%H:%M')} {text}")
+        if ticket_id is not None:
+            self._ticket_ids.append(ticket_id)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        await self.flush()
+
+    async def close(self):
+        """Отправка накопленных событий без ожидания окна (при остановке бота)"""
+        # Задача еще ждет окна (перед отправкой она сама сбрасывает ссылку)
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Публикация накопленных событий"""
+        async with self._lock:
+            events, self._events = self._events, []
+            ticket_ids, self._ticket_ids = self._ticket_ids, []
+            if not events:
+                return
+
+            if self._can_extend_live(events):
+                live_events = self._live_events + events
+                live_ticket_ids = self._live_ticket_ids + ticket_ids
+                text, keyboard = self._render(live_events, live_ticket_ids, self._live_started)
+                if await self.notification_manager.edit_private_group_message(
+                    self._live_message_id, text, keyboard
+                ):
+                    self._live_events = live_events
+                    self._live_ticket_ids = live_ticket_ids
+                    return
+
+            # Начинаем новое живое сообщение
+            started = datetime.now()
+            text, keyboard = self._render(events, ticket_ids, started)
+            message = await self.notification_manager.notify_private_group(text, keyboard, urgent=True)
+            if message:
+                self._live_message_id = message.message_id
+                self._live_started = started
+                self._live_events = events
+                self._live_ticket_ids = ticket_ids
+
+    def _can_extend_live(self, events: List[str]) -> bool:
+        """Можно ли дописать события в текущее живое сообщение"""
+        if not self._live_message_id:
+            return False
+        if datetime.now() - self._live_started > self.roll_period:
+            return False
+        length = sum(len(line) + 1 for line in self._live_events + events)
+        return length <= self.MAX_TEXT_LENGTH
+
+    def _render(self, events: List[str], ticket_ids: List[int], started: datetime):
+        """Текст сводки и кнопки просмотра последних тикетов"""
+        lines = list(events)
+        skipped = 0
+        while len(lines) > 1 and sum(len(line) + 1 for line in lines) > self.MAX_TEXT_LENGTH:
+            lines.pop(0)
+            skipped += 1
+
+        text = f"📋 Сводка событий с {started.strftime('%H:%M')} ({len(events)})\n\n"
+        if skipped:
+            text += f"... еще {skipped} событий\n"
+        text += '\n'.join(lines)
+
+        recent_ids = list(dict.fromkeys(reversed(ticket_ids)))[:self.MAX_BUTTONS]
+        if not recent_ids:
+            return text, None
+        buttons = [
+            InlineKeyboardButton(text=f"Просмотреть #{ticket_id}", callback_data=ViewTicket(ticket_id=ticket_id).pack())
+            for ticket_id in recent_ids
+        ]
+        keyboard = InlineKeyboardMarkup(
+            inline_keyboard=[buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+        )
+        return text, keyboard
 
 class NotificationManager:
     """Класс для управления уведомлениями"""
@@ -12,6 +124,25 @@ class NotificationManager:
         self.private_group_id = os.getenv('PRIVATE_GROUP_ID')
         # Логируем значение private_group_id для отладки
         print(f"Private group ID: {self.private_group_id}")
+        # Сводки для группы (при нулевом окне события отправляются сразу)
+        self.group_digest = GroupDigest(
+            self,
+            window=GROUP_DIGEST_SECONDS,
+            roll_period=timedelta(minutes=GROUP_DIGEST_ROLL_MINUTES)
+        ) if GROUP_DIGEST_SECONDS > 0 else None
+
+    async def close(self):
+        """Отправка отложенных сводок перед остановкой"""
+        if self.group_digest:
+            await self.group_digest.close()
+
+    def _get_group_id(self):
+        """ID приватной группы в формате супергруппы"""
+        group_id = self.private_group_id
+        # Если ID не начинается с -100, добавляем префикс для супергруппы
+        if not str(group_id).startswith('-100'):
+            group_id = int(f"-100{str(group_id).replace('-', '')}")
+        return group_id
 
     async def notify_admins(
         self,
@@ -36,21 +167,25 @@ class NotificationManager:
     async def notify_private_group(
         self,
         text: str,
-        keyboard: Union[InlineKeyboardMarkup, None] = None
-    ):
-        """Отправка уведомления в приватную группу"""
+        keyboard: Union[InlineKeyboardMarkup, None] = None,
+        urgent: bool = False,
+        ticket_id: Optional[int] = None
+    ) -> Optional[Message]:
+        """
+        Отправка уведомления в приватную группу. Несрочные события при
+        включенных сводках попадают в буфер (ticket_id - для кнопки просмотра).
+        """
         if not self.private_group_id:
             print("WARNING: PRIVATE_GROUP_ID не установлен в .env файле")
-            return
+            return None
+
+        if self.group_digest and not urgent:
+            self.group_digest.add(text, ticket_id)
+            return None
             
         try:
-            group_id = self.private_group_id
-            # Если ID не начинается с -100, добавляем префикс для супергруппы
-            if not str(group_id).startswith('-100'):
-                group_id = int(f"-100{str(group_id).replace('-', '')}")
-            
-            await self.bot.send_message(
-                chat_id=group_id,
+            return await self.bot.send_message(
+                chat_id=self._get_group_id(),
                 text=text,
                 reply_markup=keyboard
             )
@@ -60,22 +195,57 @@ class NotificationManager:
             else:
                 print(f"Error sending notification to private group: {e}")
             print(f"Attempted to send to group ID: {self.private_group_id}")
+            return None
+
+    async def edit_private_group_message(
+        self,
+        message_id: int,
+        text: str,
+        keyboard: Union[InlineKeyboardMarkup, None] = None
+    ) -> bool:
+        """Редактирование сообщения в приватной группе"""
+        try:
+            await self.bot.edit_message_text(
+                chat_id=self._get_group_id(),
+                message_id=message_id,
+                text=text,
+                reply_markup=keyboard
+            )
+            return True
+        except Exception as e:
+            print(f"Error editing private group message {message_id}: {e}")
+            return False
 
     async def notify_ticket_created(
         self,
         ticket_id: int,
         user_name: str,
         admin_ids: List[int],
-        keyboard: InlineKeyboardMarkup
+        keyboard: InlineKeyboardMarkup,
+        messages_count: int = 1
     ):
         """Уведомление о создании тикета"""
         text = f"Новый тикет #{ticket_id} от {user_name}"
+        if messages_count > 1:
+            text += f" (сообщений: {messages_count})"
         
         # Уведомляем админов
         await self.notify_admins(admin_ids, text, keyboard)
         
         # Уведомляем приватную группу
-        await self.notify_private_group(text, keyboard)
+        await self.notify_private_group(text, keyboard, ticket_id=ticket_id)
+
+    async def notify_ticket_updated(
+        self,
+        ticket_id: int,
+        user_name: str,
+        admin_ids: List[int],
+        messages_count: int,
+        keyboard: Union[InlineKeyboardMarkup, None] = None
+    ):
+        """Уведомление о новых сообщениях пользователя в существующем тикете"""
+        text = f"Новые сообщения ({messages_count}) в тикете #{ticket_id} от {user_name}"
+        await self.notify_admins(admin_ids, text, keyboard)
 
     async def notify_ticket_taken(
         self,
@@ -104,17 +274,58 @@ class NotificationManager:
         text = f"Тикет #{ticket_id} закрыт пользователем {closed_by}"
         await self.notify_private_group(text)
 
-    async def notify_missed_response(
+    async def notify_users(
         self,
-        ticket_id: int,
-        admin_ids: List[int],
-        admin_username: str
+        tickets: List[dict],
+        text: str
     ):
-        """Уведомление о пропущенном ответе"""
-        text = f"⚠️ Тикет #{ticket_id} без ответа 30 минут! Ответственный: @{admin_username}"
-        
-        # Уведомляем админов
-        await self.notify_admins(admin_ids, text)
-        
-        # Уведомляем приватную группу
+        """Уведомление владельцев тикетов (text может содержать {ticket_id})"""
+        for ticket in tickets:
+            try:
+                await self.bot.send_message(
+                    chat_id=ticket['user_id'],
+                    text=text.format(ticket_id=ticket['id'])
+                )
+            except Exception as e:
+                print(f"Не удалось отправить уведомление пользователю: {e}")
+
+    async def notify_bulk_action(
+        self,
+        action: str,
+        ticket_ids: List[int]
+    ):
+        """Одно сводное уведомление о массовой операции с тикетами"""
+        text = f"{action}: {len(ticket_ids)} тикетов"
+        if ticket_ids:
+            shown = ', '.join(f"#{ticket_id}" for ticket_id in ticket_ids[:50])
+            if len(ticket_ids) > 50:
+                shown += f" и еще {len(ticket_ids) - 50}"
+            text += f"\n{shown}"
         await self.notify_private_group(text)
+
+    async def notify_escalation(
+        self,
+        title: str,
+        tickets: List[dict],
+        admin_ids: List[int] = (),
+        to_group: bool = False
+    ):
+        """
+        Одно уведомление о тикетах шага эскалации (тикеты: id, admin_username,
+        minutes) - администраторам из списка и/или в приватную группу
+        """
+        if not tickets:
+            return
+        lines = [
+            f"#{ticket['id']} без ответа {ticket['minutes']} мин. Ответственный: @{ticket['admin_username']}"
+            for ticket in tickets[:50]
+        ]
+        if len(tickets) > 50:
+            lines.append(f"и еще {len(tickets) - 50}")
+        text = f"⚠️ {title}: {len(tickets)}\n" + '\n'.join(lines)
+
+        if admin_ids:
+            await self.notify_admins(admin_ids, text)
+        if to_group:
+            # Срочное событие, без сводки
+            await self.notify_private_group(text, urgent=True)
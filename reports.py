@@ -0,0 +1,157 @@
+"""
+Графики отчетов по почасовым агрегатам (таблица ticket_stats_hourly).
+
+Графики строятся по готовым почасовым суммам, а не по строкам тикетов:
+профиль по часам и тепловая карта сворачиваются в БД до 168 строк,
+тренд читает по 24 строки агрегатов на день периода.
+Все графики рисуются на одной переиспользуемой фигуре с умеренным DPI.
+"""
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List
+
+WEEKDAYS = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+
+def to_datetime(value) -> datetime:
+    """Начало часа из агрегата (SQLite возвращает строку, Postgres - datetime)"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+class ChartTemplate:
+    """
+    Фигура matplotlib, которая создается один раз и очищается перед каждым
+    графиком: без pyplot и повторной настройки холста на каждый отчет.
+    """
+
+    def __init__(self, figsize: tuple = (12, 6), dpi: int = 100):
+        self.figsize = figsize
+        self.dpi = dpi
+        self._figure = None
+
+    def render(self, draw: Callable) -> bytes:
+        """PNG графика, нарисованного функцией draw(figure)"""
+        if self._figure is None:
+            # matplotlib загружается только при первом графике
+            from matplotlib.figure import Figure
+            from matplotlib.figure import SubplotParams
+            # Фиксированные поля вместо tight/constrained layout: те лишь
+            # подбирают отступы, но стоят еще одной полной отрисовки
+            self._figure = Figure(
+                figsize=self.figsize, dpi=self.dpi,
+                subplotpars=SubplotParams(left=0.07, right=0.97, bottom=0.12, top=0.9)
+            )
+        figure = self._figure
+        figure.clear()
+        draw(figure)
+        buf = BytesIO()
+        figure.savefig(buf, format='png', dpi=self.dpi)
+        return buf.getvalue()
+
+# Свертка агрегатов
+def hourly_profile(rows: Iterable) -> List[int]:
+    """Созданные тикеты по часу суток из строк (weekday, hour, created)"""
+    counts = [0] * 24
+    for row in rows:
+        counts[row['hour']] += row['created']
+    return counts
+
+def weekday_hour_matrix(rows: Iterable) -> List[List[int]]:
+    """Созданные тикеты: день недели x час суток из строк (weekday, hour, created)"""
+    matrix = [[0] * 24 for _ in WEEKDAYS]
+    for row in rows:
+        matrix[row['weekday']][row['hour']] += row['created']
+    return matrix
+
+def daily_series(rows: Iterable, start: date, days: int) -> tuple:
+    """Созданные и закрытые тикеты по дням начиная с start (дни без тикетов - нули)"""
+    created = [0] * days
+    closed = [0] * days
+    for row in rows:
+        index = (to_datetime(row['bucket']).date() - start).days
+        if 0 <= index < days:
+            created[index] += row['created']
+            closed[index] += row['closed']
+    return [start + timedelta(days=i) for i in range(days)], created, closed
+
+def moving_average(values: List[int], window: int) -> List[float]:
+    """Скользящее среднее по последним window значениям (в начале - по имеющимся)"""
+    averages = []
+    total = 0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        averages.append(total / min(i + 1, window))
+    return averages
+
+class ReportCharts:
+    """Построение PNG графиков отчетов по почасовым агрегатам"""
+
+    def __init__(self, template: ChartTemplate = None):
+        self.template = template or ChartTemplate()
+
+    def hourly(self, rows: Iterable) -> bytes:
+        """Активность по часам суток"""
+        counts = hourly_profile(rows)
+
+        def draw(figure):
+            ax = figure.subplots()
+            bars = ax.bar(range(24), counts)
+            ax.bar_label(bars, fmt='%d')
+            ax.set_title('Активность по часам', pad=20, size=14)
+            ax.set_xlabel('Час', labelpad=10)
+            ax.set_ylabel('Количество тикетов', labelpad=10)
+            ax.grid(True, linestyle='--', alpha=0.7)
+            ax.set_xticks(range(24))
+
+        return self.template.render(draw)
+
+    def heatmap(self, rows: Iterable, days: int) -> bytes:
+        """Тепловая карта: день недели x час суток"""
+        matrix = weekday_hour_matrix(rows)
+
+        def draw(figure):
+            ax = figure.subplots()
+            image = ax.imshow(matrix, aspect='auto', cmap='YlOrRd')
+            figure.colorbar(image, ax=ax, label='Тикетов')
+            ax.set_title(f'Нагрузка по дням недели и часам за {days} дн.', size=14)
+            ax.set_xlabel('Час')
+            ax.set_xticks(range(24))
+            ax.set_yticks(range(len(WEEKDAYS)), WEEKDAYS)
+
+        return self.template.render(draw)
+
+    def trend(self, rows: Iterable, start: date, days: int, window: int) -> bytes:
+        """Тикеты по дням со скользящим средним"""
+        dates, created, closed = daily_series(rows, start, days)
+
+        def draw(figure):
+            ax = figure.subplots()
+            ax.bar(dates, created, color='tab:blue', alpha=0.35, label='Создано')
+            ax.plot(dates, moving_average(created, window), color='tab:blue',
+                    label=f'Создано, среднее за {window} дн.')
+            ax.plot(dates, moving_average(closed, window), color='tab:green',
+                    label=f'Закрыто, среднее за {window} дн.')
+            ax.set_title(f'Тикеты по дням за {days} дн.', size=14)
+            ax.set_ylabel('Количество тикетов')
+            ax.grid(True, linestyle='--', alpha=0.7)
+            ax.legend(loc='upper left')
+            figure.autofmt_xdate()
+
+        return self.template.render(draw)
+
+    def admins(self, rows: Iterable, names: Dict[int, str], days: int) -> bytes:
+        """Закрытые тикеты по администраторам из строк (admin_id, closed)"""
+        labels = [names.get(row['admin_id']) or str(row['admin_id']) for row in rows]
+        counts = [row['closed'] for row in rows]
+
+        def draw(figure):
+            ax = figure.subplots()
+            bars = ax.barh(labels, counts, color='tab:green')
+            ax.bar_label(bars, fmt='%d', padding=3)
+            ax.set_title(f'Закрыто тикетов за {days} дн.', size=14)
+            ax.set_xlabel('Количество тикетов')
+            ax.grid(True, axis='x', linestyle='--', alpha=0.7)
+
+        return self.template.render(draw)
@@ -0,0 +1,359 @@
+"""
+Хранилище данных бота: общий интерфейс и реализации для SQLite и PostgreSQL.
+
+Запросы пишутся один раз с плейсхолдерами `?`; различия диалектов
+(JSON, арифметика дат) вынесены в методы конкретного бэкенда.
+"""
+import sqlite3
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Tuple
+
+import aiosqlite
+
+from config import (
+    DB_BACKEND, DB_PATH, DATABASE_URL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_SYNCHRONOUS
+)
+from schema import MIGRATIONS_TABLE, get_migrations, render
+from timeutil import to_db_text
+
+# Явный формат datetime-параметров SQLite: границы периодов сравниваются с
+# CURRENT_TIMESTAMP как текст, поэтому формат должен совпадать
+sqlite3.register_adapter(datetime, to_db_text)
+
+class BaseRepository:
+    """Общий интерфейс хранилища: примитивы запросов и миграции"""
+
+    dialect: str = None
+
+    async def connect(self):
+        """Подготовка подключения (для пула соединений)"""
+
+    async def close(self):
+        """Закрытие подключений"""
+
+    async def execute(self, query: str, params: Iterable = ()) -> int:
+        """Выполнение запроса в отдельной транзакции. Возвращает число измененных строк"""
+        raise NotImplementedError
+
+    async def executemany(self, query: str, params_list: List[Iterable]):
+        """Выполнение запроса для набора параметров в одной транзакции"""
+        raise NotImplementedError
+
+    async def execute_batch(self, statements: List[Tuple[str, Iterable]]):
+        """Выполнение нескольких запросов (запрос, параметры) в одной транзакции"""
+        raise NotImplementedError
+
+    async def fetchone(self, query: str, params: Iterable = ()):
+        """Первая строка результата (или None)"""
+        raise NotImplementedError
+
+    async def fetchall(self, query: str, params: Iterable = ()) -> list:
+        """Все строки результата"""
+        raise NotImplementedError
+
+    async def fetchval(self, query: str, params: Iterable = ()) -> Any:
+        """Первое значение первой строки"""
+        row = await self.fetchone(query, params)
+        return row[0] if row is not None else None
+
+    async def fetchval_many(self, query: str, params_list: List[Iterable]) -> list:
+        """Выполнение запроса для набора параметров в одной транзакции.
+        Возвращает первое значение результата для каждого набора (например, RETURNING id)"""
+        raise NotImplementedError
+
+    async def migrate(self):
+        """Применение непримененных миграций общей схемы"""
+        await self.execute(render(MIGRATIONS_TABLE, self.dialect))
+        applied = {row[0] for row in await self.fetchall('SELECT version FROM schema_migrations')}
+        for version, description, statements in get_migrations(self.dialect, applied):
+            await self._apply_migration(version, description, statements)
+
+    async def _apply_migration(self, version: int, description: str, statements: List[str]):
+        raise NotImplementedError
+
+    # Различия диалектов
+    def now(self) -> str:
+        """Текущее время UTC (как CURRENT_TIMESTAMP в схеме)"""
+        raise NotImplementedError
+
+    def days_ago(self) -> str:
+        """Момент N дней назад; N передается одним параметром"""
+        raise NotImplementedError
+
+    def add_minutes(self, column: str, minutes: str) -> str:
+        """Время column плюс выражение minutes в минутах"""
+        raise NotImplementedError
+
+    def json_append(self, column: str) -> str:
+        """column как JSON-массив с добавленным элементом из одного параметра"""
+        raise NotImplementedError
+
+    def hour_bucket(self, column: str) -> str:
+        """Время column, усеченное до начала часа"""
+        raise NotImplementedError
+
+    def hour_of(self, column: str) -> str:
+        """Час суток времени column (0-23)"""
+        raise NotImplementedError
+
+    def weekday_of(self, column: str) -> str:
+        """День недели времени column (0 - понедельник)"""
+        raise NotImplementedError
+
+class SQLiteRepository(BaseRepository):
+    """Хранилище в файле SQLite: отдельное соединение на каждый вызов"""
+
+    dialect = 'sqlite'
+
+    # Допустимые значения PRAGMA synchronous
+    SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+    def __init__(self, db_path: str = DB_PATH, synchronous: str = DB_SYNCHRONOUS):
+        self.db_path = db_path
+        if synchronous and synchronous not in self.SYNCHRONOUS_MODES:
+            raise ValueError(f"Недопустимый DB_SYNCHRONOUS: {synchronous}")
+        self.synchronous = synchronous
+
+    @asynccontextmanager
+    async def _connect(self):
+        """Соединение с БД с настройкой надежности записи"""
+        async with aiosqlite.connect(self.db_path) as db:
+            if self.synchronous:
+                # NORMAL в режиме WAL не делает fsync на каждый коммит:
+                # быстрее, но последние транзакции могут пропасть при сбое питания
+                await db.execute(f'PRAGMA synchronous = {self.synchronous}')
+            yield db
+
+    async def execute(self, query: str, params: Iterable = ()) -> int:
+        async with self._connect() as db:
+            cursor = await db.execute(query, tuple(params))
+            await db.commit()
+            return cursor.rowcount
+
+    async def executemany(self, query: str, params_list: List[Iterable]):
+        async with self._connect() as db:
+            await db.executemany(query, [tuple(params) for params in params_list])
+            await db.commit()
+
+    async def execute_batch(self, statements: List[Tuple[str, Iterable]]):
+        async with self._connect() as db:
+            for query, params in statements:
+                await db.execute(query, tuple(params))
+            await db.commit()
+
+    async def fetchone(self, query: str, params: Iterable = ()):
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(query, tuple(params)) as cursor:
+                row = await cursor.fetchone()
+            # Запросы с RETURNING изменяют данные
+            await db.commit()
+            return row
+
+    async def fetchall(self, query: str, params: Iterable = ()) -> list:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(query, tuple(params)) as cursor:
+                rows = await cursor.fetchall()
+            await db.commit()
+            return rows
+
+    async def fetchval_many(self, query: str, params_list: List[Iterable]) -> list:
+        values = []
+        async with self._connect() as db:
+            # Все запросы выполняются в одной неявной транзакции - один коммит на пакет
+            for params in params_list:
+                async with db.execute(query, tuple(params)) as cursor:
+                    row = await cursor.fetchone()
+                values.append(row[0] if row is not None else None)
+            await db.commit()
+        return values
+
+    async def migrate(self):
+        async with aiosqlite.connect(self.db_path) as db:
+            # Для новой БД включаем incremental vacuum (существующую переводит
+            # команда retention.py enable-incremental-vacuum при остановленном боте)
+            await db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            # WAL: читатели (аналитика, бэкапы) не блокируют писателей
+            await db.execute('PRAGMA journal_mode = WAL')
+        await super().migrate()
+        async with aiosqlite.connect(self.db_path) as db:
+            # Статистика индексов для планировщика: без нее запрос за период со
+            # GROUP BY просматривает индекс целиком вместо диапазона по времени.
+            # analysis_limit ограничивает выборку, поэтому на большой БД это быстро
+            await db.execute('PRAGMA analysis_limit = 1000')
+            await db.execute('ANALYZE')
+            await db.commit()
+
+    async def _apply_migration(self, version: int, description: str, statements: List[str]):
+        async with self._connect() as db:
+            for statement in statements:
+                await db.execute(statement)
+            await db.execute(
+                'INSERT INTO schema_migrations (version, description) VALUES (?, ?)',
+                (version, description)
+            )
+            await db.commit()
+
+    def now(self) -> str:
+        return "datetime('now')"
+
+    def days_ago(self) -> str:
+        return "datetime('now', '-' || ? || ' days')"
+
+    def add_minutes(self, column: str, minutes: str) -> str:
+        return f"datetime({column}, '+' || ({minutes}) || ' minutes')"
+
+    def json_append(self, column: str) -> str:
+        return f'''json_insert(
+            CASE
+                WHEN {column} IS NULL THEN json_array()
+                WHEN json_type({column}) = 'array' THEN {column}
+                ELSE json_array(json({column}))
+            END,
+            '$[#]', json(?)
+        )'''
+
+    def hour_bucket(self, column: str) -> str:
+        return f"strftime('%Y-%m-%d %H:00:00', {column})"
+
+    def hour_of(self, column: str) -> str:
+        return f"CAST(strftime('%H', {column}) AS INTEGER)"
+
+    def weekday_of(self, column: str) -> str:
+        # %w считает от воскресенья
+        return f"(CAST(strftime('%w', {column}) AS INTEGER) + 6) % 7"
+
+class PostgresRepository(BaseRepository):
+    """Хранилище в PostgreSQL через пул соединений asyncpg"""
+
+    dialect = 'postgres'
+
+    def __init__(
+        self,
+        dsn: str = DATABASE_URL,
+        min_size: int = DB_POOL_MIN_SIZE,
+        max_size: int = DB_POOL_MAX_SIZE
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = None
+        # Кэш переведенных запросов: текст с ? -> текст с $n
+        self._queries = {}
+
+    async def connect(self):
+        if self._pool is None:
+            import asyncpg
+            self._pool = await asyncpg.create_pool(
+                self.dsn, min_size=self.min_size, max_size=self.max_size
+            )
+        return self._pool
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def execute(self, query: str, params: Iterable = ()) -> int:
+        pool = await self.connect()
+        status = await pool.execute(self._translate(query), *params)
+        # Статус вида 'UPDATE 3' или 'INSERT 0 1'
+        count = status.rsplit(' ', 1)[-1]
+        return int(count) if count.isdigit() else 0
+
+    async def executemany(self, query: str, params_list: List[Iterable]):
+        pool = await self.connect()
+        await pool.executemany(self._translate(query), [tuple(params) for params in params_list])
+
+    async def execute_batch(self, statements: List[Tuple[str, Iterable]]):
+        pool = await self.connect()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                for query, params in statements:
+                    await connection.execute(self._translate(query), *params)
+
+    async def fetchone(self, query: str, params: Iterable = ()):
+        pool = await self.connect()
+        return await pool.fetchrow(self._translate(query), *params)
+
+    async def fetchall(self, query: str, params: Iterable = ()) -> list:
+        pool = await self.connect()
+        return await pool.fetch(self._translate(query), *params)
+
+    async def fetchval_many(self, query: str, params_list: List[Iterable]) -> list:
+        pool = await self.connect()
+        query = self._translate(query)
+        values = []
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                for params in params_list:
+                    values.append(await connection.fetchval(query, *params))
+        return values
+
+    async def _apply_migration(self, version: int, description: str, statements: List[str]):
+        pool = await self.connect()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                for statement in statements:
+                    await connection.execute(statement)
+                await connection.execute(
+                    'INSERT INTO schema_migrations (version, description) VALUES ($1, $2)',
+                    version, description
+                )
+
+    def _translate(self, query: str) -> str:
+        """Замена плейсхолдеров ? на $1, $2, ... вне строковых литералов"""
+        translated = self._queries.get(query)
+        if translated is None:
+            parts = []
+            number = 0
+            quoted = False
+            for char in query:
+                if char == "'":
+                    quoted = not quoted
+                elif char == '?' and not quoted:
+                    number += 1
+                    char = f'${number}'
+                parts.append(char)
+            translated = self._queries[query] = ''.join(parts)
+        return translated
+
+    def now(self) -> str:
+        return "(now() AT TIME ZONE 'utc')"
+
+    def days_ago(self) -> str:
+        return f"{self.now()} - make_interval(days => ?::int)"
+
+    def add_minutes(self, column: str, minutes: str) -> str:
+        return f"{column} + make_interval(mins => ({minutes})::int)"
+
+    def json_append(self, column: str) -> str:
+        return f'''(
+            CASE
+                WHEN {column} IS NULL THEN '[]'::jsonb
+                WHEN jsonb_typeof({column}::jsonb) = 'array' THEN {column}::jsonb
+                ELSE jsonb_build_array({column}::jsonb)
+            END || jsonb_build_array(?::jsonb)
+        )::text'''
+
+    def hour_bucket(self, column: str) -> str:
+        return f"date_trunc('hour', {column})"
+
+    def hour_of(self, column: str) -> str:
+        return f"EXTRACT(HOUR FROM {column})::int"
+
+    def weekday_of(self, column: str) -> str:
+        return f"(EXTRACT(ISODOW FROM {column})::int - 1)"
+
+def create_repository(backend: Optional[str] = None) -> BaseRepository:
+    """Создание хранилища по настройке DB_BACKEND"""
+    backend = (backend or DB_BACKEND).lower()
+    if backend == 'sqlite':
+        return SQLiteRepository()
+    if backend in ('postgres', 'postgresql'):
+        if not DATABASE_URL:
+            raise ValueError("DATABASE_URL не задан для DB_BACKEND=postgres")
+        return PostgresRepository()
+    raise ValueError(f"Неизвестный DB_BACKEND: {backend}")
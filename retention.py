@@ -0,0 +1,213 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+from typing import List
+
+import aiosqlite
+import click
+
+from config import (
+    DB_PATH, RETENTION_DAYS, ARCHIVE_DB_PATH, RETENTION_BATCH_SIZE,
+    RETENTION_BATCH_PAUSE, VACUUM_PAGES_PER_STEP
+)
+from events import ticket_events
+from timeutil import utc_now
+
+# Значение PRAGMA auto_vacuum для режима INCREMENTAL
+INCREMENTAL_MODE = 2
+
+class RetentionManager:
+    """
+    Класс для архивации старых закрытых тикетов: статистика сворачивается в
+    ticket_stats_daily, тикеты и их логи переносятся в архивную БД (ATTACH)
+    небольшими транзакциями, после чего освободившиеся страницы возвращаются
+    через incremental vacuum.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        archive_path: str = ARCHIVE_DB_PATH,
+        retention_days: int = RETENTION_DAYS,
+        batch_size: int = RETENTION_BATCH_SIZE
+    ):
+        self.db_path = db_path
+        self.archive_path = archive_path
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+
+    async def run(self) -> int:
+        """Архивация тикетов, закрытых раньше срока хранения. Возвращает число перенесенных"""
+        cutoff = utc_now() - timedelta(days=self.retention_days)
+        archived = 0
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+            await self._sync_archive_table(db, 'tickets')
+            await self._sync_archive_table(db, 'logs')
+            await db.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS retention_batch (id INTEGER PRIMARY KEY)'
+            )
+            await db.commit()
+
+            while True:
+                moved = await self._archive_batch(db, cutoff)
+                if not moved:
+                    break
+                archived += moved
+                # Даем поработать другим писателям между пакетами
+                await asyncio.sleep(RETENTION_BATCH_PAUSE)
+
+            await db.execute('DETACH DATABASE archive')
+            await self._vacuum(db)
+
+        if archived:
+            ticket_events.record('archived', archived)
+        print(f"Retention: archived {archived} tickets closed before {cutoff}")
+        return archived
+
+    async def _archive_batch(self, db: aiosqlite.Connection, cutoff: datetime) -> int:
+        """Перенос одного пакета тикетов в одной транзакции"""
+        await db.execute('DELETE FROM retention_batch')
+        cursor = await db.execute(
+            '''
+            INSERT INTO retention_batch (id)
+            SELECT id FROM tickets
+            WHERE status = 'closed' AND closed_at < ?
+            ORDER BY id
+            LIMIT ?
+            ''',
+            (cutoff, self.batch_size)
+        )
+        if not cursor.rowcount:
+            await db.commit()
+            return 0
+
+        # Сначала сворачиваем статистику, чтобы аналитика не потеряла историю
+        await db.execute('''
+            INSERT INTO ticket_stats_daily (
+                day, priority, admin_id, tickets, missed,
+                responded, response_seconds, resolved, resolution_seconds
+            )
+            SELECT
+                date(created_at),
+                COALESCE(priority, 'normal'),
+                COALESCE(assigned_admin_id, 0),
+                COUNT(*),
+                SUM(CASE WHEN missed_flag = 1 THEN 1 ELSE 0 END),
+                SUM(CASE WHEN first_response_time IS NOT NULL THEN 1 ELSE 0 END),
+                SUM(CASE
+                    WHEN first_response_time IS NOT NULL
+                    THEN (julianday(first_response_time) - julianday(created_at)) * 86400
+                    ELSE 0
+                END),
+                SUM(CASE WHEN closed_at IS NOT NULL THEN 1 ELSE 0 END),
+                SUM(CASE
+                    WHEN closed_at IS NOT NULL
+                    THEN (julianday(closed_at) - julianday(created_at)) * 86400
+                    ELSE 0
+                END)
+            FROM tickets
+            WHERE id IN (SELECT id FROM retention_batch)
+            GROUP BY 1, 2, 3
+            ON CONFLICT (day, priority, admin_id) DO UPDATE SET
+                tickets = tickets + excluded.tickets,
+                missed = missed + excluded.missed,
+                responded = responded + excluded.responded,
+                response_seconds = response_seconds + excluded.response_seconds,
+                resolved = resolved + excluded.resolved,
+                resolution_seconds = resolution_seconds + excluded.resolution_seconds
+        ''')
+
+        # В режиме WAL транзакция атомарна для каждого файла отдельно, поэтому
+        # копирование идемпотентно (OR REPLACE): повтор после сбоя не создаст дублей
+        for table, key in (('tickets', 'id'), ('logs', 'ticket_id')):
+            columns = ', '.join(await self._get_columns(db, 'main', table))
+            await db.execute(
+                f'''
+                INSERT OR REPLACE INTO archive.{table} ({columns})
+                SELECT {columns} FROM main.{table}
+                WHERE {key} IN (SELECT id FROM retention_batch)
+                '''
+            )
+        await db.execute('DELETE FROM logs WHERE ticket_id IN (SELECT id FROM retention_batch)')
+        await db.execute('DELETE FROM tickets WHERE id IN (SELECT id FROM retention_batch)')
+        await db.commit()
+        return cursor.rowcount
+
+    async def _sync_archive_table(self, db: aiosqlite.Connection, table: str):
+        """Создание архивной таблицы и добавление в нее новых колонок основной"""
+        await db.execute(
+            f'CREATE TABLE IF NOT EXISTS archive.{table} AS SELECT * FROM main.{table} WHERE 0'
+        )
+        archive_columns = set(await self._get_columns(db, 'archive', table))
+        for column in await self._get_columns(db, 'main', table):
+            if column not in archive_columns:
+                await db.execute(f'ALTER TABLE archive.{table} ADD COLUMN {column}')
+        await db.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS archive.idx_{table}_id ON {table} (id)'
+        )
+
+    @staticmethod
+    async def _get_columns(db: aiosqlite.Connection, schema: str, table: str) -> List[str]:
+        """Список колонок таблицы"""
+        async with db.execute(f'PRAGMA {schema}.table_info({table})') as cursor:
+            return [row[1] for row in await cursor.fetchall()]
+
+    async def _vacuum(self, db: aiosqlite.Connection):
+        """Возврат свободных страниц файлу БД небольшими шагами"""
+        async with db.execute('PRAGMA auto_vacuum') as cursor:
+            mode = (await cursor.fetchone())[0]
+
+        if mode != INCREMENTAL_MODE:
+            # Полный VACUUM переписывает весь файл под блокировкой - в работающем
+            # боте его не делаем, перевод выполняется отдельной командой
+            print(
+                "Retention: incremental vacuum is off, run "
+                "'python retention.py enable-incremental-vacuum' with the bot stopped"
+            )
+            return
+
+        previous = None
+        while True:
+            async with db.execute('PRAGMA freelist_count') as cursor:
+                free_pages = (await cursor.fetchone())[0]
+            if not free_pages or free_pages == previous:
+                break
+            previous = free_pages
+            # Прагму нужно дочитать до конца, иначе выполнится только один шаг
+            async with db.execute(f'PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})') as cursor:
+                await cursor.fetchall()
+            await db.commit()
+            await asyncio.sleep(RETENTION_BATCH_PAUSE)
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Однократный перевод существующей БД в режим incremental vacuum (бот должен
+        быть остановлен: VACUUM переписывает файл целиком). Возвращает, был ли перевод
+        """
+        db = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            if db.execute('PRAGMA auto_vacuum').fetchone()[0] == INCREMENTAL_MODE:
+                return False
+            db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            db.execute('VACUUM')
+            return True
+        finally:
+            db.close()
+
+@click.group()
+def cli():
+    """Обслуживание базы данных бота"""
+
+@cli.command('enable-incremental-vacuum')
+@click.confirmation_option(prompt="БД будет переписана целиком. Бот остановлен?")
+def enable_incremental_vacuum_command():
+    """Перевести существующую БД в режим incremental vacuum (только при остановленном боте)"""
+    if RetentionManager().enable_incremental_vacuum():
+        click.echo("Режим incremental vacuum включен")
+    else:
+        click.echo("Режим incremental vacuum уже включен")
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,232 @@
+"""
+Единое описание схемы БД для всех бэкендов.
+
+Миграции записаны один раз; различия диалектов подставляются из DIALECT_TYPES
+по плейсхолдерам {pk}, {bigint}, {real}, {flag}, {now}, {closed_at_utc}.
+"""
+import time
+from typing import List
+
+# Смещение местного времени процесса от UTC (секунды): до миграции 7 closed_at
+# записывался местным временем
+LOCAL_UTC_OFFSET_SECONDS = time.localtime().tm_gmtoff
+
+DIALECT_TYPES = {
+    'sqlite': {
+        'pk': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+        'bigint': 'INTEGER',
+        'real': 'REAL',
+        'flag': 'BOOLEAN',
+        'now': 'CURRENT_TIMESTAMP',
+        # Перевод местного времени в UTC по правилам часового пояса процесса (с учетом DST)
+        'closed_at_utc': "datetime(closed_at, 'utc')",
+    },
+    'postgres': {
+        'pk': 'BIGSERIAL PRIMARY KEY',
+        'bigint': 'BIGINT',
+        'real': 'DOUBLE PRECISION',
+        'flag': 'INTEGER',
+        # CURRENT_TIMESTAMP в SQLite - это UTC, держим то же в Postgres
+        'now': "(now() AT TIME ZONE 'utc')",
+        # Часовой пояс бота серверу неизвестен - вычитается текущее смещение процесса
+        'closed_at_utc': f"closed_at - make_interval(secs => {LOCAL_UTC_OFFSET_SECONDS})",
+    },
+}
+
+# Таблица учета примененных миграций
+MIGRATIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT {now}
+    )
+'''
+
+# Миграции: (версия, описание, список SQL-выражений)
+MIGRATIONS = [
+    (1, 'initial schema', [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id {pk},
+            user_id {bigint} UNIQUE,
+            username TEXT,
+            full_name TEXT,
+            phone TEXT,
+            created_at TIMESTAMP DEFAULT {now}
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS tickets (
+            id {pk},
+            user_id {bigint},
+            status TEXT CHECK(status IN ('open', 'in_progress', 'closed')),
+            assigned_admin_id {bigint},
+            created_at TIMESTAMP DEFAULT {now},
+            closed_at TIMESTAMP,
+            priority TEXT DEFAULT 'normal',
+            first_response_time TIMESTAMP,
+            missed_flag {flag} DEFAULT 0,
+            message_data TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS admins (
+            id {pk},
+            admin_id {bigint} UNIQUE,
+            username TEXT,
+            role TEXT CHECK(role IN ('admin', 'CEO')),
+            added_at TIMESTAMP DEFAULT {now}
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS logs (
+            id {pk},
+            action TEXT,
+            ticket_id {bigint},
+            admin_id {bigint},
+            timestamp TIMESTAMP DEFAULT {now},
+            FOREIGN KEY (ticket_id) REFERENCES tickets(id),
+            FOREIGN KEY (admin_id) REFERENCES admins(admin_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS dashboards (
+            chat_id {bigint} PRIMARY KEY,
+            message_id {bigint},
+            created_at TIMESTAMP DEFAULT {now}
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS ticket_stats_daily (
+            day TEXT,
+            priority TEXT,
+            admin_id {bigint},
+            tickets INTEGER DEFAULT 0,
+            missed INTEGER DEFAULT 0,
+            responded INTEGER DEFAULT 0,
+            response_seconds {real} DEFAULT 0,
+            resolved INTEGER DEFAULT 0,
+            resolution_seconds {real} DEFAULT 0,
+            PRIMARY KEY (day, priority, admin_id)
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_tickets_queue
+        ON tickets (status, priority, created_at)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_tickets_user_status
+        ON tickets (user_id, status)
+        ''',
+    ]),
+    (2, 'media registry', [
+        '''
+        CREATE TABLE IF NOT EXISTS media_registry (
+            content_hash TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            media_type TEXT,
+            created_at TIMESTAMP DEFAULT {now}
+        )
+        ''',
+    ]),
+    (3, 'hourly rollups', [
+        # Созданные тикеты учитываются с admin_id = 0, закрытые - по исполнителю
+        '''
+        CREATE TABLE IF NOT EXISTS ticket_stats_hourly (
+            bucket TIMESTAMP,
+            admin_id {bigint},
+            created INTEGER DEFAULT 0,
+            closed INTEGER DEFAULT 0,
+            PRIMARY KEY (bucket, admin_id)
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_tickets_created_at
+        ON tickets (created_at)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_tickets_closed_at
+        ON tickets (closed_at)
+        ''',
+    ]),
+    (4, 'incremental export', [
+        'ALTER TABLE tickets ADD COLUMN updated_at TIMESTAMP',
+        'UPDATE tickets SET updated_at = COALESCE(closed_at, created_at)',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_tickets_updated
+        ON tickets (updated_at, id)
+        ''',
+        # Докуда получатель уже выгрузил изменения: (updated_at, id) последнего тикета
+        '''
+        CREATE TABLE IF NOT EXISTS export_watermarks (
+            recipient_id {bigint} PRIMARY KEY,
+            updated_at TIMESTAMP,
+            ticket_id {bigint},
+            exported_at TIMESTAMP DEFAULT {now}
+        )
+        ''',
+    ]),
+    (5, 'escalation ladder', [
+        # escalation_level - последний выполненный шаг лестницы (0 - ни одного),
+        # escalation_due_at - когда выполнить следующий (NULL - ждать нечего)
+        'ALTER TABLE tickets ADD COLUMN escalation_level INTEGER DEFAULT 0',
+        'ALTER TABLE tickets ADD COLUMN escalation_due_at TIMESTAMP',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_tickets_escalation_due
+        ON tickets (escalation_due_at)
+        ''',
+    ]),
+    (6, 'business hours', [
+        # Дедлайн первого ответа в рабочем времени (считается при создании тикета)
+        'ALTER TABLE tickets ADD COLUMN sla_due_at TIMESTAMP',
+        # График дежурств администратора в формате BUSINESS_HOURS
+        '''
+        CREATE TABLE IF NOT EXISTS admin_shifts (
+            admin_id {bigint} PRIMARY KEY,
+            schedule TEXT,
+            updated_at TIMESTAMP DEFAULT {now}
+        )
+        ''',
+    ]),
+    (7, 'utc closed_at', [
+        # Все время в БД - UTC: closed_at раньше писался местным временем. updated_at,
+        # заполненный миграцией 4 из closed_at, переводится вместе с ним (правые части
+        # SET вычисляются по старым значениям строки)
+        '''
+        UPDATE tickets SET
+            updated_at = CASE WHEN updated_at = closed_at THEN {closed_at_utc} ELSE updated_at END,
+            closed_at = {closed_at_utc}
+        WHERE closed_at IS NOT NULL
+        ''',
+        # Почасовые агрегаты закрытий пересчитываются по исправленному времени
+        # (агрегаты архивированных тикетов, которых уже нет в tickets, сохраняются)
+        'DELETE FROM ticket_stats_hourly WHERE bucket >= (SELECT MIN(created_at) FROM tickets)',
+    ]),
+    (8, 'macros', [
+        # Шаблоны ответов администраторов; usage_count - сколько раз отправлен
+        '''
+        CREATE TABLE IF NOT EXISTS macros (
+            id {pk},
+            title TEXT UNIQUE,
+            text TEXT,
+            usage_count INTEGER DEFAULT 0,
+            created_by {bigint},
+            created_at TIMESTAMP DEFAULT {now},
+            last_used_at TIMESTAMP
+        )
+        ''',
+    ]),
+]
+
+def render(statement: str, dialect: str) -> str:
+    """Подстановка типов диалекта в SQL-выражение схемы"""
+    return statement.format(**DIALECT_TYPES[dialect])
+
+def get_migrations(dialect: str, applied: set) -> List[tuple]:
+    """Непримененные миграции в порядке версий с SQL для диалекта"""
+    return [
+        (version, description, [render(statement, dialect) for statement in statements])
+        for version, description, statements in sorted(MIGRATIONS)
+        if version not in applied
+    ]
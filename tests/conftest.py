@@ -0,0 +1,75 @@
+"""
+Общие фикстуры тестов.
+
+Модули бота читают настройки хранилища при импорте, поэтому для каждого теста
+они импортируются заново с нужным DB_BACKEND: SQLite - временный файл,
+PostgreSQL - отдельная схема в базе DATABASE_URL (без DATABASE_URL пропускается).
+"""
+import asyncio
+import importlib
+import os
+import sys
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BACKENDS = ('sqlite', 'postgres')
+
+def _forget_bot_modules():
+    """Выгрузка модулей бота: следующий импорт прочитает окружение заново"""
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+        if os.path.dirname(os.path.abspath(path)) == ROOT:
+            del sys.modules[name]
+
+async def _pg_execute(dsn: str, query: str):
+    import asyncpg
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.execute(query)
+    finally:
+        await connection.close()
+
+@pytest.fixture(params=BACKENDS)
+def database(request, tmp_path, monkeypatch):
+    """Модуль database поверх пустой БД выбранного бэкенда"""
+    backend = request.param
+    monkeypatch.setenv('DB_BACKEND', backend)
+    monkeypatch.setenv('DB_PATH', str(tmp_path / 'support_bot.db'))
+    # Тикеты пишутся сразу, без группового окна
+    monkeypatch.setenv('TICKET_BATCH_WINDOW_MS', '0')
+
+    schema = None
+    if backend == 'postgres':
+        dsn = os.getenv('DATABASE_URL')
+        if not dsn:
+            pytest.skip('DATABASE_URL не задан')
+        schema = f'test_{uuid.uuid4().hex[:12]}'
+        asyncio.run(_pg_execute(dsn, f'CREATE SCHEMA {schema}'))
+        # Неизвестные asyncpg параметры DSN передаются серверу как настройки сессии
+        separator = '&' if '?' in dsn else '?'
+        monkeypatch.setenv('DATABASE_URL', f'{dsn}{separator}search_path={schema}')
+
+    _forget_bot_modules()
+    module = importlib.import_module('database')
+    yield module
+    _forget_bot_modules()
+
+    if schema:
+        asyncio.run(_pg_execute(dsn, f'DROP SCHEMA {schema} CASCADE'))
+
+@pytest.fixture
+def run(database):
+    """Выполнение сценария в своем цикле событий с подключенной и мигрированной БД"""
+    def runner(scenario):
+        async def main():
+            await database.init_db()
+            try:
+                return await scenario()
+            finally:
+                await database.close_db()
+        return asyncio.run(main())
+    return runner
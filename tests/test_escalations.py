@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime, timedelta
+
+def test_deadlines_are_whole_seconds(database):
+    moment = datetime(2026, 10, 19, 12, 0, 0, 654321)
+    assert database.sla_deadline(moment, 'normal').microsecond == 0
+    assert database.escalation_due_after(1, moment).microsecond == 0
+
+class RecordingNotifier:
+    """Уведомления эскалации без Telegram"""
+
+    def __init__(self):
+        self.escalations = []
+
+    async def notify_escalation(self, title, tickets, admin_ids=None, to_group=False):
+        self.escalations.append((title, [ticket['id'] for ticket in tickets]))
+
+async def _taken_ticket(database):
+    await database.add_user(100, 'user', 'User', '+100')
+    await database.add_admin(1, 'admin')
+    ticket_id = await database.create_ticket(100)
+    await database.update_ticket_status(ticket_id, 'in_progress', 1)
+    return ticket_id
+
+def test_passed_deadline_fires_once(database, run):
+    """Наступивший дедлайн с долями секунды выполняется один раз, таймер не крутится вхолостую"""
+    from deadlines import DeadlineTimer
+    from escalations import EscalationManager
+
+    notifier = RecordingNotifier()
+    manager = EscalationManager(notifier, timer=DeadlineTimer())
+    calls = []
+    process_due = manager.process_due
+
+    async def counted_process_due():
+        calls.append(1)
+        await process_due()
+    manager.process_due = counted_process_due
+
+    async def scenario():
+        ticket_id = await _taken_ticket(database)
+        # Дедлайн в прошлом, но в пределах текущей секунды datetime('now')
+        due = database.utc_now() - timedelta(microseconds=1)
+        await database.schedule_escalations([(due, ticket_id, 0)])
+        await manager.start()
+        await asyncio.sleep(1.2)
+        await manager.close()
+        return ticket_id, await database.get_ticket(ticket_id)
+
+    ticket_id, ticket = run(scenario)
+    assert len(calls) == 1
+    assert notifier.escalations == [('Напоминание: тикеты без ответа', [ticket_id])]
+    assert ticket['escalation_level'] == 1
@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime
+
+from aiogram.types import CallbackQuery, Chat, Message, PhotoSize, User
+
+def private_message(user_id: int, message_id: int, media_group_id: str = None) -> Message:
+    photo = [PhotoSize(file_id=f'p{message_id}', file_unique_id=f'u{message_id}', width=1, height=1)]
+    return Message(
+        message_id=message_id, date=datetime(2026, 10, 19), chat=Chat(id=user_id, type='private'),
+        from_user=User(id=user_id, is_bot=False, first_name='User'),
+        text=None if media_group_id else 'текст',
+        photo=photo if media_group_id else None, media_group_id=media_group_id
+    )
+
+def button_press(user_id: int, number: int) -> CallbackQuery:
+    return CallbackQuery(
+        id=str(number), chat_instance='chat', data='ticket:1',
+        from_user=User(id=user_id, is_bot=False, first_name='User')
+    )
+
+async def feed(middleware, events) -> list:
+    """Прогон апдейтов через middleware; возвращает дошедшие до обработчика"""
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event)
+
+    for event in events:
+        await middleware(handler, event, {})
+    return handled
+
+def throttling(**kwargs):
+    from middlewares import ThrottlingMiddleware
+    return ThrottlingMiddleware({'message': (2, 60), 'callback_query': (2, 60)}, **kwargs)
+
+def test_admins_not_throttled(database, run):
+    middleware = throttling(is_exempt=database.is_admin)
+
+    async def scenario():
+        await database.add_admin(10, 'admin')
+        admin = await feed(middleware, [private_message(10, n) for n in range(5)])
+        admin += await feed(middleware, [button_press(10, n) for n in range(5)])
+        user = await feed(middleware, [private_message(20, n) for n in range(5)])
+        user += await feed(middleware, [button_press(20, n) for n in range(5)])
+        return len(admin), len(user)
+
+    assert run(scenario) == (10, 4)
+
+def test_album_counted_once():
+    middleware = throttling()
+    albums = [
+        private_message(20, group * 10 + part, media_group_id=f'group{group}')
+        for group in range(2) for part in range(10)
+    ]
+    handled = asyncio.run(feed(middleware, albums + [private_message(20, 100)]))
+    # Оба альбома целиком, третье сообщение сверх лимита отклонено
+    assert len(handled) == 20
+    assert middleware.get_stats()['counters']['message'] == {'allowed': 20, 'rejected': 1}
@@ -0,0 +1,132 @@
+import json
+from datetime import timedelta
+
+def test_translate_placeholders():
+    from repository import PostgresRepository
+
+    repository = PostgresRepository(dsn='postgresql://unused')
+    assert repository._translate(
+        "SELECT * FROM tickets WHERE id = ? AND status = '?' AND user_id = ?"
+    ) == "SELECT * FROM tickets WHERE id = $1 AND status = '?' AND user_id = $2"
+    assert repository._translate('SELECT 1') == 'SELECT 1'
+
+def test_migrations_applied_once(database, run):
+    from schema import MIGRATIONS
+
+    async def scenario():
+        # Повторный запуск не применяет миграции второй раз
+        await database.repository.migrate()
+        return await database.repository.fetchall(
+            'SELECT version FROM schema_migrations ORDER BY version'
+        )
+
+    rows = run(scenario)
+    assert [row['version'] for row in rows] == sorted(version for version, _, _ in MIGRATIONS)
+
+async def _add_users(database, *user_ids):
+    for user_id in user_ids:
+        await database.add_user(user_id, f'user{user_id}', f'User {user_id}', f'+{user_id}')
+
+def test_open_tickets_ordered_by_priority(database, run):
+    async def scenario():
+        await _add_users(database, 1, 2, 3, 4)
+        normal = await database.create_ticket(1, 'normal')
+        urgent = await database.create_ticket(2, 'urgent')
+        vip = await database.create_ticket(3, 'vip')
+        urgent_later = await database.create_ticket(4, 'urgent')
+        tickets = await database.get_open_tickets()
+        return [ticket['id'] for ticket in tickets], [urgent, urgent_later, vip, normal]
+
+    ordered, expected = run(scenario)
+    assert ordered == expected
+
+def test_append_ticket_message(database, run):
+    async def scenario():
+        await _add_users(database, 1)
+        first = await database.create_ticket(1, message_data=json.dumps({'text': 'привет'}))
+        await database.append_ticket_message(first, json.dumps({'text': 'еще'}))
+        await database.append_ticket_message(first, json.dumps({'text': 'и еще'}))
+        empty = await database.create_ticket(1)
+        await database.append_ticket_message(empty, json.dumps({'text': 'первое'}))
+        return (
+            (await database.get_ticket(first))['message_data'],
+            (await database.get_ticket(empty))['message_data']
+        )
+
+    first, empty = run(scenario)
+    assert json.loads(first) == [{'text': 'привет'}, {'text': 'еще'}, {'text': 'и еще'}]
+    assert json.loads(empty) == [{'text': 'первое'}]
+
+def test_dashboard_upsert(database, run):
+    async def scenario():
+        await database.save_dashboard(-100, 1)
+        await database.save_dashboard(-200, 5)
+        await database.save_dashboard(-100, 2)
+        return await database.get_dashboards()
+
+    dashboards = run(scenario)
+    assert sorted((row['chat_id'], row['message_id']) for row in dashboards) == [(-200, 5), (-100, 2)]
+
+def test_close_tickets_older_than(database, run):
+    async def scenario():
+        await _add_users(database, 1, 2, 3)
+        old = await database.create_ticket(1)
+        old_taken = await database.create_ticket(2)
+        fresh = await database.create_ticket(3)
+        await database.update_ticket_status(old_taken, 'in_progress', 10)
+        await database.repository.execute(
+            'UPDATE tickets SET created_at = ? WHERE id IN (?, ?)',
+            (database.utc_now() - timedelta(days=10), old, old_taken)
+        )
+        closed = await database.close_tickets_older_than(7)
+        statuses = {
+            ticket_id: (await database.get_ticket(ticket_id))['status']
+            for ticket_id in (old, old_taken, fresh)
+        }
+        return sorted(ticket['id'] for ticket in closed), [old, old_taken], statuses, fresh
+
+    closed, expected, statuses, fresh = run(scenario)
+    assert closed == expected
+    assert statuses[fresh] == 'open'
+    assert all(statuses[ticket_id] == 'closed' for ticket_id in expected)
+
+def test_reassign_admin_tickets(database, run):
+    async def scenario():
+        await database.add_admin(10, 'first')
+        await database.add_admin(20, 'second')
+        await _add_users(database, 1, 2, 3)
+        taken = await database.create_ticket(1)
+        closed = await database.create_ticket(2)
+        other = await database.create_ticket(3)
+        await database.update_ticket_status(taken, 'in_progress', 10)
+        await database.update_ticket_status(closed, 'in_progress', 10)
+        await database.update_ticket_status(closed, 'closed')
+        await database.update_ticket_status(other, 'in_progress', 30)
+        moved = await database.reassign_admin_tickets(10, 20)
+        return [ticket['id'] for ticket in moved], taken, await database.get_ticket(taken)
+
+    moved, taken, ticket = run(scenario)
+    assert moved == [taken]
+    assert ticket['assigned_admin_id'] == 20
+    assert ticket['escalation_due_at'] is not None
+
+def test_claim_next_tickets(database, run):
+    async def scenario():
+        await database.add_admin(10, 'admin')
+        await _add_users(database, 1, 2, 3, 4)
+        normal = await database.create_ticket(1, 'normal')
+        vip = await database.create_ticket(2, 'vip')
+        urgent = await database.create_ticket(3, 'urgent')
+        await database.create_ticket(4, 'normal')
+        claimed = await database.claim_next_tickets(10, 3)
+        left = await database.get_open_tickets()
+        return (
+            [ticket['id'] for ticket in claimed], sorted([normal, vip, urgent]),
+            [ticket['id'] for ticket in left],
+            await database.get_admin_tickets(10)
+        )
+
+    claimed, expected, left, admin_tickets = run(scenario)
+    assert claimed == expected
+    assert len(left) == 1 and left[0] not in claimed
+    assert sorted(ticket['id'] for ticket in admin_tickets) == expected
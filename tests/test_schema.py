@@ -0,0 +1,67 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """Часовой пояс процесса с ненулевым смещением от UTC (до импорта модулей бота)"""
+    monkeypatch.setenv('TZ', 'Europe/Moscow')
+    time.tzset()
+    yield timedelta(hours=3)
+    monkeypatch.undo()
+    time.tzset()
+
+def test_utc_migration_converts_updated_at(local_timezone, database):
+    """Миграция 7 переводит в UTC и closed_at, и updated_at, заполненный из него миграцией 4"""
+    from schema import MIGRATIONS, MIGRATIONS_TABLE, get_migrations, render
+    from timeutil import parse_timestamp
+
+    repository = database.repository
+    created_at = datetime(2026, 10, 1, 9, 0, 0)
+    closed_utc = datetime(2026, 10, 1, 10, 0, 0)
+    touched_at = datetime(2026, 10, 2, 12, 0, 0)
+
+    async def scenario():
+        await repository.connect()
+        try:
+            # БД версии 6: closed_at и updated_at закрытых тикетов - местное время
+            await repository.execute(render(MIGRATIONS_TABLE, repository.dialect))
+            later = {version for version, _, _ in MIGRATIONS if version >= 7}
+            for version, description, statements in get_migrations(repository.dialect, later):
+                await repository._apply_migration(version, description, statements)
+
+            await repository.execute(
+                "INSERT INTO users (user_id, full_name) VALUES (1, 'User')"
+            )
+            closed_local = closed_utc + local_timezone
+            rows = [
+                # Закрыт до миграции 4: updated_at взят из closed_at
+                (1, 'closed', created_at, closed_local, closed_local),
+                # Изменен после миграции 4: updated_at уже UTC
+                (2, 'closed', created_at, closed_local, touched_at),
+                # Открытый: updated_at взят из created_at
+                (3, 'open', created_at, None, created_at),
+            ]
+            for row in rows:
+                await repository.execute(
+                    '''
+                    INSERT INTO tickets (id, user_id, status, created_at, closed_at, updated_at)
+                    VALUES (?, 1, ?, ?, ?, ?)
+                    ''',
+                    row
+                )
+
+            await repository.migrate()
+            return {
+                row['id']: (parse_timestamp(row['closed_at']), parse_timestamp(row['updated_at']))
+                for row in await repository.fetchall('SELECT id, closed_at, updated_at FROM tickets')
+            }
+        finally:
+            await repository.close()
+
+    tickets = asyncio.run(scenario())
+    assert tickets[1] == (closed_utc, closed_utc)
+    assert tickets[2] == (closed_utc, touched_at)
+    assert tickets[3] == (None, created_at)
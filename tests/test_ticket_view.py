@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+class RecordingMessage:
+    """Сообщение, записывающее вызовы answer_* вместо отправки в Telegram"""
+
+    def __init__(self):
+        self.sent = []
+
+    def __getattr__(self, name):
+        if not name.startswith('answer'):
+            raise AttributeError(name)
+
+        async def answer(*args, **kwargs):
+            self.sent.append((name, args, kwargs))
+        return answer
+
+class RecordingCallback:
+    def __init__(self, user_id: int):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = RecordingMessage()
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+def album(*media):
+    return json.dumps({
+        'message_id': 1, 'text': 'Подпись', 'media_type': 'media_group', 'media_id': None,
+        'caption': 'Подпись', 'media_group_id': 'group',
+        'media': [{'media_type': media_type, 'media_id': media_id} for media_type, media_id in media]
+    })
+
+def view_ticket(database, run, message_data):
+    import handlers
+    from callbacks import ViewTicket
+
+    callback = RecordingCallback(10)
+
+    async def scenario():
+        await database.add_admin(10, 'admin')
+        await database.add_user(1, 'user', 'User', '+1')
+        ticket_id = await database.create_ticket(1, message_data=message_data)
+        await handlers.process_ticket_view(callback, ViewTicket(ticket_id=ticket_id))
+
+    run(scenario)
+    return [name for name, _, _ in callback.message.sent], callback.message.sent
+
+def test_album_sent_as_media_group(database, run):
+    names, sent = view_ticket(database, run, album(('photo', 'p1'), ('video', 'v1')))
+    assert names == ['answer_media_group', 'answer']
+    assert sent[0][1][0][0].caption == 'Подпись'
+
+def test_single_item_album_sent_as_media(database, run):
+    """Часть альбома после окна сборки - один элемент: send_media_group его не примет"""
+    names, sent = view_ticket(database, run, album(('video', 'v1')))
+    assert names == ['answer_video', 'answer']
+    assert sent[0][1] == ('v1',) and sent[0][2]['caption'] == 'Подпись'
+
+def test_audio_album_kept():
+    from datetime import datetime
+    from aiogram.types import Audio, Chat, Message
+    from messages import MessageManager
+
+    parts = [
+        Message(
+            message_id=message_id, date=datetime(2026, 10, 19), chat=Chat(id=1, type='private'),
+            media_group_id='group', caption='Записи' if message_id == 1 else None,
+            audio=Audio(file_id=f'a{message_id}', file_unique_id=f'u{message_id}', duration=60)
+        )
+        for message_id in (1, 2)
+    ]
+    data = json.loads(MessageManager.serialize_media_group(parts))
+    assert data['media'] == [
+        {'media_type': 'audio', 'media_id': 'a1'}, {'media_type': 'audio', 'media_id': 'a2'}
+    ]
+    media_group = MessageManager.build_media_group(data)
+    assert [item.type for item in media_group] == ['audio', 'audio']
+    assert media_group[0].caption == 'Записи'
@@ -0,0 +1,74 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import get_priority_rank
+
+
+class TicketQueue:
+    """Очередь открытых тикетов в памяти: сначала по приоритету, затем по возрасту"""
+
+    def __init__(self):
+        # Элементы кучи: [ранг приоритета, id тикета, активен]
+        self._heap: List[list] = []
+        self._entries: Dict[int, list] = {}
+
+    def rebuild(self, tickets: Iterable[Tuple[int, str]]):
+        """Полная перестройка очереди по парам (id тикета, приоритет) из БД"""
+        self._entries = {
+            ticket_id: [get_priority_rank(priority), ticket_id, True]
+            for ticket_id, priority in tickets
+        }
+        self._heap = list(self._entries.values())
+        heapq.heapify(self._heap)
+
+    def push(self, ticket_id: int, priority: str):
+        """Добавление тикета в очередь (или обновление его приоритета)"""
+        self.remove(ticket_id)
+        # Id тикетов растут монотонно, поэтому совпадают с порядком по возрасту
+        entry = [get_priority_rank(priority), ticket_id, True]
+        self._entries[ticket_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, ticket_id: int):
+        """Удаление тикета из очереди (ленивое, за O(1))"""
+        entry = self._entries.pop(ticket_id, None)
+        if entry is not None:
+            entry[2] = False
+            # Сжимаем кучу, если удаленных записей стало больше живых
+            if len(self._heap) > 2 * len(self._entries) + 32:
+                self._heap = list(self._entries.values())
+                heapq.heapify(self._heap)
+
+    def update_priority(self, ticket_id: int, priority: str):
+        """Изменение приоритета тикета, если он находится в очереди"""
+        if ticket_id in self._entries:
+            self.push(ticket_id, priority)
+
+    def peek(self) -> Optional[int]:
+        """Id следующего тикета без удаления из очереди"""
+        self._discard_removed()
+        return self._heap[0][1] if self._heap else None
+
+    def pop(self) -> Optional[int]:
+        """Извлечение следующего тикета из очереди"""
+        self._discard_removed()
+        if not self._heap:
+            return None
+        entry = heapq.heappop(self._heap)
+        del self._entries[entry[1]]
+        return entry[1]
+
+    def _discard_removed(self):
+        """Удаление с вершины кучи записей, помеченных как удаленные"""
+        while self._heap and not self._heap[0][2]:
+            heapq.heappop(self._heap)
+
+    def __contains__(self, ticket_id: int) -> bool:
+        return ticket_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Общая очередь тикетов, синхронизируется функциями из database.py
+ticket_queue = TicketQueue()
@@ -0,0 +1,31 @@
+"""
+Время в БД и запросах за период.
+
+Все моменты хранятся в UTC без часового пояса (как CURRENT_TIMESTAMP в SQLite
+и now() AT TIME ZONE 'utc' в Postgres). Границы периодов считаются в Python и
+передаются параметром, а колонка в условии не оборачивается в функции -
+запрос за период остается диапазоном по индексу.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# Периоды отчетов и выгрузок (дни)
+PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 30}
+
+def utc_now() -> datetime:
+    """Текущее время UTC без часового пояса - в формате колонок БД"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Время из БД (SQLite возвращает строку, Postgres - datetime)"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+def period_start(period: str, default: str = 'day') -> datetime:
+    """Начало периода day/week/month, отсчитанного от текущего момента (UTC)"""
+    return utc_now() - timedelta(days=PERIOD_DAYS.get(period, PERIOD_DAYS[default]))
+
+def to_db_text(moment: datetime) -> str:
+    """Время для SQLite: тот же текстовый формат, что у CURRENT_TIMESTAMP (с долями секунды)"""
+    return moment.isoformat(' ')
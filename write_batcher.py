@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Iterable, List, Optional, Tuple
+
+from repository import BaseRepository
+
+class WriteBatcher:
+    """
+    Групповая фиксация вставок: запросы копятся несколько миллисекунд
+    и записываются одной транзакцией (один fsync на пакет).
+    Каждый вызывающий получает свое значение из RETURNING.
+    """
+
+    def __init__(self, repository: BaseRepository, query: str, window: float, max_size: int):
+        self.repository = repository
+        self.query = query
+        # Сколько ждать попутных вставок перед записью (секунды)
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[tuple, asyncio.Future]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._full = asyncio.Event()
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, params: Iterable) -> Any:
+        """Постановка вставки в очередь; возвращает результат после фиксации пакета"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((tuple(params), future))
+        if len(self._pending) >= self.max_size:
+            self._full.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        """Ожидание окна (или заполнения пакета) и запись накопленного"""
+        try:
+            await asyncio.wait_for(self._full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        await self.flush()
+
+    async def flush(self):
+        """Запись всех накопленных вставок"""
+        # Вставки, пришедшие во время записи, уходят следующим пакетом без ожидания
+        while self._pending:
+            batch = self._pending[:self.max_size]
+            del self._pending[:self.max_size]
+            self._full.clear()
+            await self._write(batch)
+
+    async def close(self):
+        """Дозапись очереди при остановке бота"""
+        if self._task is not None and not self._task.done():
+            self._full.set()
+            await self._task
+        await self.flush()
+
+    async def _write(self, batch: List[Tuple[tuple, asyncio.Future]]):
+        try:
+            values = await self.repository.fetchval_many(
+                self.query, [params for params, _ in batch]
+            )
+        except Exception as e:
+            if len(batch) > 1:
+                # Ошибочная строка не должна откатывать чужие тикеты: пишем по одной
+                print(f"Error writing batch of {len(batch)}, retrying one by one: {e}")
+                for item in batch:
+                    await self._write([item])
+                return
+            future = batch[0][1]
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), value in zip(batch, values):
+            if not future.done():
+                future.set_result(value)
+
+    def get_stats(self) -> dict:
+        """Число пакетов и средний размер пакета"""
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'avg_batch': round(self.rows / self.batches, 2) if self.batches else 0,
+            'pending': len(self._pending)
+        }